@@ -0,0 +1,202 @@
+"""Vectorized cohort, retention, signal and streak analytics over daily_checkins"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+CURSOR_BATCH_SIZE = 50000
+SIGNALS = ["stressed", "low_energy", "cravings", "digestion", "normal"]
+CATEGORIES = ["B", "A", "S", "E"]
+MISSING = "unknown"
+
+
+class CodeBook:
+    """Assigns stable integer codes to strings, one dict lookup per distinct value per batch"""
+
+    def __init__(self, values: Optional[List[str]] = None):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+        for value in values or []:
+            self.code(value)
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode(self, values: List[str]) -> np.ndarray:
+        values = np.asarray(values, dtype=object)
+        values[pd.isna(values)] = MISSING
+        inverse, uniques = pd.factorize(values)
+        mapping = np.fromiter((self.code(u) for u in uniques), dtype=np.int64, count=len(uniques))
+        return mapping[inverse]
+
+
+@dataclass
+class CheckinArrays:
+    user: np.ndarray      # user code per check-in
+    day: np.ndarray       # days since 1970-01-01
+    signal: np.ndarray    # index into signals.values
+    category: np.ndarray  # index into categories.values
+    users: CodeBook
+    signals: CodeBook
+    categories: CodeBook
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+
+async def load_checkins(db, since: Optional[str] = None) -> CheckinArrays:
+    """Stream check-ins in large cursor batches into integer-coded NumPy arrays"""
+    users, signals, categories = CodeBook(), CodeBook(SIGNALS), CodeBook(CATEGORIES)
+    chunks: Dict[str, List[np.ndarray]] = {"user": [], "day": [], "signal": [], "category": []}
+    query = {"date": {"$gte": since}} if since else {}
+    cursor = db.daily_checkins.find(
+        query, {"_id": 0, "user_id": 1, "date": 1, "signal": 1, "base_category": 1}
+    ).batch_size(CURSOR_BATCH_SIZE)
+
+    batch: List[Dict] = []
+
+    def flush():
+        chunks["user"].append(users.encode([d.get("user_id") for d in batch]))
+        chunks["day"].append(np.array([d.get("date") for d in batch], dtype="datetime64[D]").astype(np.int64))
+        chunks["signal"].append(signals.encode([d.get("signal") for d in batch]))
+        chunks["category"].append(categories.encode([d.get("base_category") for d in batch]))
+        batch.clear()
+
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= CURSOR_BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+
+    def join(name):
+        return np.concatenate(chunks[name]) if chunks[name] else np.empty(0, dtype=np.int64)
+
+    return CheckinArrays(join("user"), join("day"), join("signal"), join("category"), users, signals, categories)
+
+
+def _distinct(values: np.ndarray) -> np.ndarray:
+    # Sort-based; np.unique's hash path is several times slower on millions of keys
+    values = np.sort(values)
+    keep = np.ones(len(values), dtype=bool)
+    keep[1:] = values[1:] != values[:-1]
+    return values[keep]
+
+
+def _week(day: np.ndarray) -> np.ndarray:
+    # 1970-01-01 was a Thursday; shifting by 3 makes weeks start on Monday
+    return (day + 3) // 7
+
+
+def _week_start(week: int) -> str:
+    return str(np.datetime64(int(week) * 7 - 3, "D"))
+
+
+def weekly_retention(data: CheckinArrays, max_weeks: int = 12) -> Dict[str, Any]:
+    """Share of each weekly signup cohort that checked in N weeks after their first week"""
+    if not len(data):
+        return {"cohorts": [], "max_weeks": max_weeks}
+
+    week = _week(data.day)
+    n_users = len(data.users.values)
+    first = np.full(n_users, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first, data.user, week)
+    seen = first[first != np.iinfo(np.int64).max]
+    min_week = int(seen.min())
+
+    offset = week - first[data.user]
+    keep = offset < max_weeks
+    # One entry per (user, week offset) the user was active in
+    active = _distinct(data.user[keep] * max_weeks + offset[keep])
+    active_user, active_offset = active // max_weeks, active % max_weeks
+    cohort = first[active_user] - min_week
+
+    n_cohorts = int(seen.max()) - min_week + 1
+    n_weeks = int(week.max()) - min_week + 1
+    counts = np.bincount(cohort * max_weeks + active_offset, minlength=n_cohorts * max_weeks)
+    counts = counts.reshape(n_cohorts, max_weeks)
+    sizes = np.bincount(seen - min_week, minlength=n_cohorts)
+
+    cohorts = []
+    for index in np.flatnonzero(sizes):
+        # Offsets that lie in the future for this cohort are left out
+        weeks_observed = min(max_weeks, n_weeks - index)
+        cohorts.append({
+            "cohort_week": _week_start(min_week + index),
+            "users": int(sizes[index]),
+            "retention": np.round(counts[index, :weeks_observed] / sizes[index], 4).tolist()
+        })
+    return {"cohorts": cohorts, "max_weeks": max_weeks}
+
+
+def signal_trends(data: CheckinArrays) -> Dict[str, Any]:
+    """Weekly check-in counts for every signal → BASE category pair"""
+    if not len(data):
+        return {"weeks": [], "series": []}
+
+    week = _week(data.day)
+    min_week = int(week.min())
+    n_weeks = int(week.max()) - min_week + 1
+    n_signals, n_categories = len(data.signals.values), len(data.categories.values)
+
+    key = ((week - min_week) * n_signals + data.signal) * n_categories + data.category
+    counts = np.bincount(key, minlength=n_weeks * n_signals * n_categories)
+    counts = counts.reshape(n_weeks, n_signals, n_categories)
+
+    series = []
+    for s, c in zip(*np.nonzero(counts.sum(axis=0))):
+        series.append({
+            "signal": data.signals.values[s],
+            "base_category": data.categories.values[c],
+            "total": int(counts[:, s, c].sum()),
+            "counts": counts[:, s, c].tolist()
+        })
+    series.sort(key=lambda item: -item["total"])
+    return {"weeks": [_week_start(min_week + i) for i in range(n_weeks)], "series": series}
+
+
+def streak_distribution(data: CheckinArrays, today: Optional[int] = None, cap: int = 60) -> Dict[str, Any]:
+    """Distribution of users' longest and current consecutive-day check-in streaks"""
+    if not len(data):
+        return {"longest": [], "current": []}
+    if today is None:
+        today = int(np.datetime64(datetime.now(timezone.utc).date(), "D").astype(np.int64))
+
+    min_day = int(data.day.min())
+    span = int(data.day.max()) - min_day + 1
+    pairs = _distinct(data.user * span + (data.day - min_day))
+    user, day = pairs // span, pairs % span + min_day
+
+    # A run starts wherever the user changes or a day is skipped
+    starts = np.ones(len(pairs), dtype=bool)
+    starts[1:] = (user[1:] != user[:-1]) | (np.diff(day) != 1)
+    run_start = np.flatnonzero(starts)
+    run_length = np.diff(np.append(run_start, len(pairs)))
+    run_user = user[run_start]
+    run_end_day = day[run_start + run_length - 1]
+
+    user_first_run = np.flatnonzero(np.r_[True, run_user[1:] != run_user[:-1]])
+    longest = np.maximum.reduceat(run_length, user_first_run)
+    user_last_run = np.append(user_first_run[1:], len(run_start)) - 1
+    # A streak is still current if it includes today or yesterday
+    current = np.where(run_end_day[user_last_run] >= today - 1, run_length[user_last_run], 0)
+
+    def histogram(values):
+        counts = np.bincount(np.minimum(values, cap))
+        return [
+            {"days": f"{k}+" if k == cap else k, "users": int(n)}
+            for k, n in enumerate(counts) if k > 0 and n
+        ]
+
+    return {
+        "users": int(len(longest)),
+        "longest": histogram(longest),
+        "current": histogram(current),
+        "median_longest": float(np.median(longest))
+    }
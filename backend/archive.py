@@ -0,0 +1,190 @@
+"""Archive old check-ins and payment transactions to partitioned Parquet files"""
+import asyncio
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = Path(os.environ.get('ARCHIVE_DIR', Path(__file__).parent / 'archive'))
+
+# Columns kept per collection, with the field used for the cutoff and the
+# monthly partition. Both fields hold ISO dates, which sort lexicographically.
+ARCHIVE_SPECS = {
+    "daily_checkins": {
+        "date_field": "date",
+        "filter": {},
+        "columns": {
+            "check_in_id": "string", "user_id": "string", "date": "string", "signal": "string",
+            "base_category": "string", "action_id": "string", "verse_id": "string", "created_at": "string",
+        },
+    },
+    "payment_transactions": {
+        "date_field": "created_at",
+        # Pending rows may still be resolved by the reconciler
+        "filter": {"payment_status": {"$ne": "pending"}},
+        "columns": {
+            "transaction_id": "string", "session_id": "string", "user_id": "string", "email": "string",
+            "amount": "float64", "currency": "string", "plan": "string", "payment_status": "string",
+            "status": "string", "created_at": "string", "updated_at": "string",
+        },
+    },
+}
+
+
+def _schema(collection: str):
+    import pyarrow as pa
+
+    types = {"string": pa.string(), "float64": pa.float64()}
+    return pa.schema([(name, types[kind]) for name, kind in ARCHIVE_SPECS[collection]["columns"].items()])
+
+
+def _write_partition(collection: str, month: str, rows: List[Dict]) -> Path:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _schema(collection)
+    table = pa.Table.from_pylist([{name: row.get(name) for name in schema.names} for row in rows], schema=schema)
+    directory = ARCHIVE_DIR / collection / f"month={month}"
+    directory.mkdir(parents=True, exist_ok=True)
+    # Named after the rows it holds, so re-archiving a batch whose delete never
+    # happened overwrites its file instead of adding a second copy
+    ids = hashlib.sha1("\n".join(str(row["_id"]) for row in rows).encode()).hexdigest()[:20]
+    name = f"part-{ids}.parquet"
+    path = directory / name
+    tmp = directory / f".{name}.tmp"  # dot-prefixed files are skipped by readers
+    pq.write_table(table, tmp, compression="zstd")
+    # Rows are deleted from Mongo only once their file is complete
+    os.replace(tmp, path)
+    return path
+
+
+def _write_batch(collection: str, rows: List[Dict]) -> List[Path]:
+    date_field = ARCHIVE_SPECS[collection]["date_field"]
+    by_month: Dict[str, List[Dict]] = {}
+    for row in rows:
+        by_month.setdefault(str(row.get(date_field, ""))[:7] or "unknown", []).append(row)
+    return [_write_partition(collection, month, month_rows) for month, month_rows in by_month.items()]
+
+
+async def archive_collection(db, collection: str, cutoff: str, batch_size: int = 5000) -> Dict[str, Any]:
+    """
+    Move rows older than `cutoff` (an ISO date) from Mongo into the archive.
+
+    Rows are streamed in batches; each batch is written as Parquet and then
+    removed with one delete_many. A crash between the two leaves rows in both
+    places, never in neither; batches follow (date, _id) order, so a re-run
+    rebuilds the same batches and overwrites their files.
+    """
+    spec = ARCHIVE_SPECS[collection]
+    query = {**spec["filter"], spec["date_field"]: {"$lt": cutoff}}
+    projection = {"_id": 1, **{name: 1 for name in spec["columns"]}}
+    cursor = db[collection].find(query, projection).sort([(spec["date_field"], 1), ("_id", 1)]).batch_size(batch_size)
+
+    archived, files = 0, 0
+    batch: List[Dict] = []
+
+    async def flush():
+        nonlocal archived, files
+        written = await asyncio.to_thread(_write_batch, collection, batch)
+        await db[collection].delete_many({"_id": {"$in": [row["_id"] for row in batch]}})
+        archived += len(batch)
+        files += len(written)
+        batch.clear()
+
+    async for row in cursor:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    logger.info("Archived %s %s rows older than %s into %s files", archived, collection, cutoff, files)
+    return {"collection": collection, "cutoff": cutoff, "archived": archived, "files": files}
+
+
+def _dataset(collection: str):
+    import pyarrow.dataset as ds
+
+    directory = ARCHIVE_DIR / collection
+    if not directory.exists():
+        return None
+    return ds.dataset(directory, format="parquet", partitioning="hive")
+
+
+def _expression(collection: str, start: Optional[str], end: Optional[str], filters: Optional[Dict[str, Any]]):
+    """Filter for rows in [start, end) of the date field that match equality `filters`"""
+    import pyarrow.dataset as ds
+
+    date = ds.field(ARCHIVE_SPECS[collection]["date_field"])
+    month = ds.field("month")
+    expression = None
+
+    def both(a, b):
+        return b if a is None else a & b
+
+    if start:
+        expression = both(expression, (month >= start[:7]) & (date >= start))
+    if end:
+        expression = both(expression, (month <= end[:7]) & (date < end))
+    for name, value in (filters or {}).items():
+        expression = both(expression, ds.field(name) == value)
+    return expression
+
+
+def read_archive(
+    collection: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    columns: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+):
+    """
+    Query archived rows as a pandas DataFrame.
+
+    `start`/`end` bound the date field (inclusive start, exclusive end) and prune
+    monthly partitions; `filters` are equality matches on other columns. With a
+    `limit` the scan stops once that many rows are found.
+    """
+    columns = columns or list(ARCHIVE_SPECS[collection]["columns"])
+    dataset = _dataset(collection)
+    if dataset is None:
+        import pandas as pd
+        return pd.DataFrame(columns=columns)
+
+    expression = _expression(collection, start, end, filters)
+    if limit is not None:
+        return dataset.head(limit, columns=columns, filter=expression).to_pandas()
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+def count_archive(
+    collection: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> int:
+    """Number of archived rows read_archive would return without a limit"""
+    dataset = _dataset(collection)
+    if dataset is None:
+        return 0
+    return dataset.count_rows(filter=_expression(collection, start, end, filters))
+
+
+def iter_archive(
+    collection: str,
+    filters: Optional[Dict[str, Any]] = None,
+    batch_size: int = 1000,
+) -> Iterator[List[Dict]]:
+    """Archived rows matching equality `filters`, one record batch at a time"""
+    dataset = _dataset(collection)
+    if dataset is None:
+        return
+    expression = _expression(collection, None, None, filters)
+    columns = list(ARCHIVE_SPECS[collection]["columns"])
+    for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=batch_size):
+        if batch.num_rows:
+            yield batch.to_pylist()
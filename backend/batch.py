@@ -0,0 +1,124 @@
+"""In-process execution of batched /api sub-requests"""
+import asyncio
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', '10'))
+
+# Routes that may be called through /api/batch. Payment, webhook, auth and admin
+# routes are deliberately left out.
+BATCHABLE_ROUTES = [
+    ("GET", "/api/auth/me"),
+    ("GET", "/api/bootstrap"),
+    ("GET", "/api/subscription/status"),
+    ("GET", "/api/checkin/today"),
+    ("POST", "/api/checkin"),
+    ("GET", "/api/triggers"),
+    ("GET", "/api/triggers/{trigger_type}"),
+]
+
+# Headers forwarded from the batch request to each sub-request
+FORWARDED_HEADERS = {b"authorization", b"cookie", b"user-agent"}
+
+# Connection-level scope keys copied from the batch request
+SCOPE_KEYS = ("type", "asgi", "http_version", "scheme", "server", "client", "root_path", "extensions")
+
+_ROUTE_PATTERNS = [
+    (method, re.compile("^" + re.sub(r"\{[^}]+\}", "[^/]+", path) + "$"))
+    for method, path in BATCHABLE_ROUTES
+]
+
+
+def is_batchable(method: str, path: str) -> bool:
+    path = path.split("?", 1)[0]
+    return any(method == m and pattern.match(path) for m, pattern in _ROUTE_PATTERNS)
+
+
+async def _call(app, parent: Request, method: str, path: str, body: Any) -> Dict:
+    """Run one sub-request through the ASGI app, sharing the parent's request state"""
+    path, _, query = path.partition("?")
+    payload = b"" if body is None else json.dumps(body).encode()
+    headers = [(k, v) for k, v in parent.scope["headers"] if k in FORWARDED_HEADERS]
+    if payload:
+        headers += [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+    scope = {
+        **{k: parent.scope[k] for k in SCOPE_KEYS if k in parent.scope},
+        "method": method,
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": headers,
+        # The same dict backs request.state, so the authenticated user and the
+        # request loader are shared with every sub-request
+        "state": parent.scope["state"],
+    }
+
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            await asyncio.Event().wait()  # nothing more; block like an idle client
+        sent = True
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    status = 500
+    content_type = ""
+    chunks: List[bytes] = []
+
+    async def send(message):
+        nonlocal status, content_type
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            for k, v in message.get("headers", []):
+                if k.lower() == b"content-type":
+                    content_type = v.decode()
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    except Exception as e:
+        # The app has already sent its 500 response; don't fail the whole batch
+        logger.error("Batched %s %s failed: %s", method, path, e)
+        status = 500
+
+    raw = b"".join(chunks)
+    result: Any = raw.decode("utf-8", errors="replace")
+    if content_type.startswith("application/json") and raw:
+        result = json.loads(raw)
+    return {"status": status, "body": result}
+
+
+async def run_batch(app, parent: Request, items: List[Tuple[str, str, Optional[Any]]]) -> List[Dict]:
+    """
+    Execute sub-requests and return their results in order.
+
+    Consecutive GETs run concurrently; any other method is a barrier that runs
+    on its own after everything before it has finished.
+    """
+    parent.scope.setdefault("state", {})
+    results: List[Optional[Dict]] = [None] * len(items)
+    reads: List[int] = []
+
+    async def flush_reads():
+        responses = await asyncio.gather(*(_call(app, parent, *items[i]) for i in reads))
+        for i, response in zip(reads, responses):
+            results[i] = response
+        reads.clear()
+
+    for index, (method, _, _) in enumerate(items):
+        if method == "GET":
+            reads.append(index)
+            continue
+        await flush_reads()
+        results[index] = await _call(app, parent, *items[index])
+    await flush_reads()
+    return results
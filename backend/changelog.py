@@ -0,0 +1,186 @@
+"""Sequenced change log of the content catalog, for clients that sync deltas"""
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import DeleteMany, ReturnDocument
+
+from leases import acquire_lease, release_lease
+
+logger = logging.getLogger(__name__)
+
+# Collections tracked by the log and the field identifying their documents
+CONTENT_ID_FIELDS = {
+    "baseline_actions": "action_id",
+    "trigger_cards": "trigger_id",
+    "verses": "verse_id",
+}
+
+COUNTER_ID = "content_changes"
+# Compaction drops tombstones older than this; clients further behind must resync
+TOMBSTONE_RETENTION = timedelta(days=int(os.environ.get('CONTENT_TOMBSTONE_DAYS', '30')))
+# Entries younger than this are held back in case a lower sequence number is still in flight
+GAP_GRACE = timedelta(seconds=float(os.environ.get('CONTENT_CHANGES_GAP_GRACE_SECONDS', '5')))
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+
+async def reserve(db, count: int, session=None) -> int:
+    """Reserve `count` consecutive sequence numbers and return the first"""
+    counter = await db.counters.find_one_and_update(
+        {"_id": COUNTER_ID},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+        session=session,
+    )
+    return counter["seq"] - count + 1
+
+
+async def record(db, collection: str, changes: List[Tuple[str, str, Optional[Dict]]], session=None) -> int:
+    """
+    Append (op, doc_id, doc) changes of one collection; returns the last sequence number.
+
+    `doc` is the document as clients should store it for an upsert and None
+    for a delete (a tombstone). Pass the session of the transaction that made
+    the changes so they and their log entries commit together.
+    """
+    if not changes:
+        return 0
+    first = await reserve(db, len(changes), session)
+    now = datetime.now(timezone.utc)
+    entries = []
+    for seq, (op, doc_id, doc) in enumerate(changes, start=first):
+        entry = {"seq": seq, "collection": collection, "doc_id": doc_id, "op": op, "at": now}
+        if op == UPSERT:
+            entry["doc"] = {k: v for k, v in doc.items() if k != "_id"}
+        entries.append(entry)
+    await db.content_changes.insert_many(entries, ordered=True, session=session)
+    return first + len(changes) - 1
+
+
+async def record_upserts(db, collection: str, docs: List[Dict], session=None) -> int:
+    id_field = CONTENT_ID_FIELDS[collection]
+    return await record(db, collection, [(UPSERT, doc[id_field], doc) for doc in docs], session)
+
+
+async def record_deletes(db, collection: str, doc_ids: List[str], session=None) -> int:
+    return await record(db, collection, [(DELETE, doc_id, None) for doc_id in doc_ids], session)
+
+
+async def latest_seq(db) -> Tuple[int, int]:
+    """(last reserved sequence number, compaction floor)"""
+    counter = await db.counters.find_one({"_id": COUNTER_ID}, {"_id": 0, "seq": 1, "floor": 1}) or {}
+    return counter.get("seq", 0), counter.get("floor", 0)
+
+
+def _settled(entries: List[Dict], now: datetime) -> List[Dict]:
+    """
+    Entries up to the first one written less than GAP_GRACE ago.
+
+    Sequence numbers are reserved before the entry is written, so a higher
+    number can become visible before a lower one. Holding back recent entries
+    keeps a client's cursor from moving past one that is still in flight.
+    """
+    horizon = now - GAP_GRACE
+    for index, entry in enumerate(entries):
+        at = entry["at"] if entry["at"].tzinfo else entry["at"].replace(tzinfo=timezone.utc)
+        if at > horizon:
+            return entries[:index]
+    return entries
+
+
+async def changes_since(db, since: int, limit: int = 500) -> Dict[str, Any]:
+    """Upserts and tombstones after `since`; since=0 yields every live document"""
+    latest, floor = await latest_seq(db)
+    if 0 < since < floor:
+        # Tombstones this client still needs were compacted away
+        return {"reset": True, "changes": [], "next": 0, "has_more": True, "latest": latest}
+
+    entries = await db.content_changes.find(
+        {"seq": {"$gt": since}}, {"_id": 0}
+    ).sort("seq", 1).limit(limit + 1).to_list(limit + 1)
+    has_more = len(entries) > limit
+    entries = _settled(entries[:limit], datetime.now(timezone.utc))
+    if since == 0:
+        # A full snapshot needs no tombstones, nor the documents they delete:
+        # only the latest entry per document counts, and only if it's an upsert
+        latest_entries = {(e["collection"], e["doc_id"]): e for e in entries}
+        entries_out = [e for e in latest_entries.values() if e["op"] == UPSERT]
+        entries_out.sort(key=lambda e: e["seq"])
+    else:
+        entries_out = entries
+    changes = [
+        {"seq": e["seq"], "collection": e["collection"], "op": e["op"], "id": e["doc_id"], "doc": e.get("doc")}
+        for e in entries_out
+    ]
+    next_seq = entries[-1]["seq"] if entries else since
+    return {
+        "reset": False,
+        "changes": changes,
+        "next": next_seq,
+        "has_more": has_more or next_seq < latest,
+        "latest": latest,
+    }
+
+
+async def compact(db, now: Optional[datetime] = None) -> Dict[str, int]:
+    """Keep only the latest entry per document and drop tombstones past retention"""
+    pipeline = [
+        {"$group": {
+            "_id": {"collection": "$collection", "doc_id": "$doc_id"},
+            "latest": {"$max": "$seq"},
+            "count": {"$sum": 1},
+        }},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    superseded = [
+        DeleteMany({"collection": group["_id"]["collection"], "doc_id": group["_id"]["doc_id"],
+                    "seq": {"$lt": group["latest"]}})
+        async for group in db.content_changes.aggregate(pipeline, allowDiskUse=True)
+    ]
+    removed = 0
+    if superseded:
+        result = await db.content_changes.bulk_write(superseded, ordered=False)
+        removed = result.deleted_count
+
+    cutoff = (now or datetime.now(timezone.utc)) - TOMBSTONE_RETENTION
+    expired = await db.content_changes.find_one(
+        {"op": DELETE, "at": {"$lt": cutoff}}, {"_id": 0, "seq": 1}, sort=[("seq", -1)]
+    )
+    tombstones = 0
+    if expired:
+        # Raise the floor first so no client can be served a history missing them
+        await db.counters.update_one({"_id": COUNTER_ID}, {"$max": {"floor": expired["seq"]}})
+        result = await db.content_changes.delete_many({"op": DELETE, "seq": {"$lte": expired["seq"]}})
+        tombstones = result.deleted_count
+
+    logger.info("Compacted content changes: %s superseded entries, %s tombstones", removed, tombstones)
+    return {"superseded": removed, "tombstones": tombstones}
+
+
+async def backfill(db) -> int:
+    """Log every existing content document once, so since=0 is a full snapshot"""
+    if await db.content_changes.find_one({}, {"_id": 1}):
+        return 0
+    # Workers start together; only one of them fills the log
+    owner = uuid.uuid4().hex
+    if not await acquire_lease(db, "content_changes_backfill", owner, timedelta(minutes=5)):
+        return 0
+    total = 0
+    try:
+        if await db.content_changes.find_one({}, {"_id": 1}):
+            return 0
+        for collection in CONTENT_ID_FIELDS:
+            docs = await db[collection].find({}, {"_id": 0}).to_list(None)
+            if docs:
+                await record_upserts(db, collection, docs)
+                total += len(docs)
+    finally:
+        await release_lease(db, "content_changes_backfill", owner)
+    if total:
+        logger.info("Backfilled content change log with %s documents", total)
+    return total
@@ -0,0 +1,85 @@
+"""Response bodies compressed once and served from memory with Accept-Encoding negotiation"""
+import asyncio
+import gzip
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Bodies smaller than this are sent as-is; compressing them saves nothing worthwhile
+MIN_COMPRESS_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+
+
+def _compress(body: bytes) -> Dict[str, bytes]:
+    encodings = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encodings["br"] = brotli.compress(body, quality=11)
+    return encodings
+
+
+def parse_accept_encoding(header: str) -> List[Tuple[str, float]]:
+    """Parse an Accept-Encoding header into (coding, q) pairs"""
+    codings = []
+    for part in header.split(","):
+        fields = part.strip().split(";")
+        coding = fields[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings.append((coding, q))
+    return codings
+
+
+def negotiate(header: str, available) -> Optional[str]:
+    """Pick the best available encoding the client accepts, preferring brotli"""
+    accepted = dict(parse_accept_encoding(header or ""))
+    best, best_q = None, 0.0
+    for coding in ("br", "gzip"):
+        if coding not in available:
+            continue
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class PrecompressedBody:
+    """A JSON body serialized and compressed once, for content that changes rarely"""
+
+    def __init__(self, content: Any):
+        self.identity = json.dumps(
+            jsonable_encoder(content),
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        self.encodings = _compress(self.identity) if len(self.identity) >= MIN_COMPRESS_BYTES else {}
+
+    @classmethod
+    async def build(cls, content: Any) -> "PrecompressedBody":
+        """Serialize and compress in a worker thread, off the event loop"""
+        # Brotli 11 on a whole catalog takes long enough to stall every other request
+        return await asyncio.to_thread(cls, content)
+
+    def response(self, accept_encoding: str) -> Response:
+        headers = {"Vary": "Accept-Encoding"}
+        coding = negotiate(accept_encoding, self.encodings)
+        body = self.identity
+        if coding is not None:
+            body = self.encodings[coding]
+            headers["Content-Encoding"] = coding
+        return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,128 @@
+"""Maintained document counts, so dashboards read one small document instead of scanning"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from leases import acquire_lease, release_lease
+
+logger = logging.getLogger(__name__)
+
+# Collections whose size is tracked; each has a `count:<name>` document in `counters`
+COUNTED_COLLECTIONS = ("users", "subscriptions", "daily_checkins")
+COUNTER_RECONCILE_SECONDS = float(os.environ.get('COUNTER_RECONCILE_SECONDS', '3600'))
+
+LEASE_NAME = "counter_reconciler"
+
+
+def counter_id(collection: str) -> str:
+    return f"count:{collection}"
+
+
+async def increment(db, collection: str, by: int = 1) -> None:
+    """
+    Adjust a collection's count after inserting (or deleting) `by` documents.
+
+    Counters are only ever created by reconciliation, which sets them from an
+    exact count; until then this is a no-op and reads fall back to an estimate.
+    """
+    if by:
+        await db.counters.update_one({"_id": counter_id(collection)}, {"$inc": {"value": by}})
+
+
+async def get_counts(db) -> Dict[str, Dict[str, Any]]:
+    """Count per tracked collection, from its counter or, without one, the collection metadata"""
+    docs = {
+        doc["_id"]: doc async for doc in
+        db.counters.find({"_id": {"$in": [counter_id(c) for c in COUNTED_COLLECTIONS]}})
+    }
+    counts = {}
+    for collection in COUNTED_COLLECTIONS:
+        doc = docs.get(counter_id(collection))
+        if doc is not None:
+            counts[collection] = {"value": doc["value"], "source": "counter", "reconciled_at": doc.get("reconciled_at")}
+        else:
+            value = await db[collection].estimated_document_count()
+            counts[collection] = {"value": value, "source": "estimate", "reconciled_at": None}
+    return counts
+
+
+async def reconcile(db, collection: str) -> Optional[int]:
+    """
+    Reset a counter to an exact count; returns the drift corrected, None if skipped.
+
+    The counter is read before and after counting and only replaced if no
+    increment landed in between, so concurrent writes are never overwritten;
+    a busy collection is simply retried on the next pass.
+    """
+    key = counter_id(collection)
+    before = await db.counters.find_one({"_id": key}, {"value": 1})
+    exact = await db[collection].count_documents({})
+    now = datetime.now(timezone.utc).isoformat()
+    if before is None:
+        result = await db.counters.update_one(
+            {"_id": key}, {"$setOnInsert": {"value": exact, "reconciled_at": now}}, upsert=True
+        )
+        return exact if result.upserted_id is not None else None
+    result = await db.counters.update_one(
+        {"_id": key, "value": before["value"]}, {"$set": {"value": exact, "reconciled_at": now}}
+    )
+    return exact - before["value"] if result.matched_count else None
+
+
+class CounterReconciler:
+    """Periodically corrects counter drift (failed $inc after a write, manual DB edits) on one worker"""
+
+    def __init__(self, db, interval: float = COUNTER_RECONCILE_SECONDS):
+        self.db = db
+        self.interval = interval
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.metrics: Dict[str, Any] = {"runs": 0, "corrected": 0, "skipped": 0, "last_run_at": None, "drift": {}}
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> Dict[str, Any]:
+        drift = {}
+        for collection in COUNTED_COLLECTIONS:
+            corrected = await reconcile(self.db, collection)
+            if corrected is None:
+                self.metrics["skipped"] += 1
+                continue
+            drift[collection] = corrected
+            if corrected:
+                self.metrics["corrected"] += 1
+                logger.info("Corrected %s counter by %s", collection, corrected)
+        self.metrics["runs"] += 1
+        self.metrics["last_run_at"] = datetime.now(timezone.utc).isoformat()
+        self.metrics["drift"] = drift
+        return self.metrics
+
+    async def _run(self) -> None:
+        lease_ttl = timedelta(seconds=self.interval * 2)
+        while True:
+            try:
+                if await acquire_lease(self.db, LEASE_NAME, self.owner, lease_ttl):
+                    await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Counter reconciliation failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await release_lease(self.db, LEASE_NAME, self.owner)
+        except Exception as e:
+            logger.warning("Could not release counter reconciler lease: %s", e)
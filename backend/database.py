@@ -0,0 +1,122 @@
+"""Motor client configuration, pool monitoring and warm-up"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from pymongo import ReadPreference, monitoring
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Tracks open and checked-out connections across all pools of a client"""
+
+    def __init__(self):
+        self.open = 0
+        self.in_use = 0
+        self.checkout_failures = 0
+
+    def snapshot(self, max_pool_size: int) -> Dict:
+        return {
+            "max_size": max_pool_size,
+            "open": self.open,
+            "in_use": self.in_use,
+            "saturation": round(self.in_use / max_pool_size, 3) if max_pool_size else None,
+            "checkout_failures": self.checkout_failures,
+        }
+
+    def connection_created(self, event):
+        self.open += 1
+
+    def connection_closed(self, event):
+        self.open = max(0, self.open - 1)
+
+    def connection_checked_out(self, event):
+        self.in_use += 1
+
+    def connection_checked_in(self, event):
+        self.in_use = max(0, self.in_use - 1)
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def read_preference(name: str):
+    try:
+        return READ_PREFERENCES[name]
+    except KeyError:
+        raise ValueError(f"Unknown read preference {name!r}; expected one of {sorted(READ_PREFERENCES)}")
+
+
+def client_options(pool_monitor: Optional[PoolMonitor] = None) -> Dict:
+    """AsyncIOMotorClient keyword arguments from MONGO_* environment settings"""
+    options = {
+        "maxPoolSize": _env_int("MONGO_MAX_POOL_SIZE", 100),
+        "minPoolSize": _env_int("MONGO_MIN_POOL_SIZE", 0),
+        "waitQueueTimeoutMS": _env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000),
+        "serverSelectionTimeoutMS": _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        "read_preference": read_preference(os.environ.get("MONGO_READ_PREFERENCE", "primary")),
+    }
+    # e.g. "zstd,snappy,zlib"; zstd and snappy need their optional packages installed
+    compressors = os.environ.get("MONGO_COMPRESSORS")
+    if compressors:
+        options["compressors"] = compressors
+    if pool_monitor is not None:
+        options["event_listeners"] = [pool_monitor]
+    return options
+
+
+def content_read_preference():
+    """Read preference for baseline_actions, verses and trigger_cards reads; secondaries are opt-in"""
+    return read_preference(os.environ.get("MONGO_CONTENT_READ_PREFERENCE", "primary"))
+
+
+async def ping(db) -> float:
+    """Round-trip a ping command and return its latency in milliseconds"""
+    start = time.perf_counter()
+    await db.command("ping")
+    return (time.perf_counter() - start) * 1000
+
+
+async def warm_up(db, connections: int) -> None:
+    """Open `connections` pool connections up front so the first requests skip the handshake"""
+    if connections <= 0:
+        return
+    try:
+        await asyncio.gather(*(db.command("ping") for _ in range(connections)))
+    except PyMongoError as e:
+        logger.warning("MongoDB warm-up failed: %s", e)
@@ -0,0 +1,124 @@
+"""Streaming export of everything stored about one user, for support and privacy requests"""
+import asyncio
+import json
+import os
+import zipfile
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import archive
+
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '500'))
+# Output is flushed to the client in chunks of about this many bytes
+EXPORT_CHUNK_BYTES = int(os.environ.get('EXPORT_CHUNK_BYTES', str(64 * 1024)))
+FORMAT_VERSION = 1
+
+# Section name -> (collection, sort field, projection); every section is matched on user_id
+EXPORT_SECTIONS = {
+    "profile": ("users", None, {"_id": 0, "password_hash": 0}),
+    "subscriptions": ("subscriptions", None, {"_id": 0}),
+    "daily_checkins": ("daily_checkins", "date", {"_id": 0}),
+    "payment_transactions": ("payment_transactions", "created_at", {"_id": 0}),
+}
+
+
+async def _archived(collection: str, user_id: str) -> AsyncIterator[Dict]:
+    """Rows of `user_id` already moved to the Parquet archive, read off the event loop"""
+    batches = archive.iter_archive(collection, {"user_id": user_id}, EXPORT_BATCH_SIZE)
+    while True:
+        rows: Optional[List[Dict]] = await asyncio.to_thread(next, batches, None)
+        if rows is None:
+            return
+        for row in rows:
+            yield row
+
+
+async def records(db, user_id: str) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    (section, document) pairs for one user, section by section.
+
+    Documents come straight off Motor cursors in batches of EXPORT_BATCH_SIZE,
+    so memory use does not depend on how much history the user has. Archived
+    rows of a section come before the live ones, since they are older.
+    """
+    for section, (collection, sort_field, projection) in EXPORT_SECTIONS.items():
+        if collection in archive.ARCHIVE_SPECS:
+            async for row in _archived(collection, user_id):
+                yield section, row
+        cursor = db[collection].find({"user_id": user_id}, projection).batch_size(EXPORT_BATCH_SIZE)
+        if sort_field:
+            cursor = cursor.sort(sort_field, 1)
+        async for doc in cursor:
+            yield section, doc
+
+
+def _line(section: str, doc: Dict) -> bytes:
+    return (json.dumps({"type": section, "data": doc}, default=str) + "\n").encode()
+
+
+def _header(user_id: str) -> Dict:
+    return {
+        "user_id": user_id,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "format_version": FORMAT_VERSION,
+        "sections": list(EXPORT_SECTIONS),
+    }
+
+
+async def ndjson_stream(db, user_id: str) -> AsyncIterator[bytes]:
+    """One JSON object per line: an `export` header, then `{"type": section, "data": doc}`"""
+    buffer = bytearray(_line("export", _header(user_id)))
+    async for section, doc in records(db, user_id):
+        buffer += _line(section, doc)
+        # The response only asks for the next chunk once the client has taken
+        # this one, so a slow reader holds back the cursors rather than memory
+        if len(buffer) >= EXPORT_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+class _ChunkSink:
+    """Write-only file object for ZipFile; zipfile falls back to data descriptors since it cannot seek"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self.buffer += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+async def zip_stream(db, user_id: str) -> AsyncIterator[bytes]:
+    """A zip with export.json and one NDJSON file per section, compressed as it is produced"""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        bundle.writestr("export.json", json.dumps(_header(user_id), indent=2))
+        section, member = None, None
+        async for doc_section, doc in records(db, user_id):
+            if doc_section != section:
+                if member is not None:
+                    member.close()
+                section = doc_section
+                member = bundle.open(f"{section}.ndjson", mode="w", force_zip64=True)
+            member.write((json.dumps(doc, default=str) + "\n").encode())
+            if len(sink.buffer) >= EXPORT_CHUNK_BYTES:
+                yield sink.take()
+        if member is not None:
+            member.close()
+    yield sink.take()
+
+
+EXPORT_FORMATS = {
+    "ndjson": (ndjson_stream, "application/x-ndjson", "ndjson"),
+    "zip": (zip_stream, "application/zip", "zip"),
+}
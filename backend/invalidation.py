@@ -0,0 +1,322 @@
+"""Cross-worker cache invalidation over a Mongo capped collection"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from pymongo import CursorType, ReturnDocument, UpdateOne
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+MESSAGES_COLLECTION = "cache_invalidations"
+VERSIONS_COLLECTION = "cache_versions"
+# Keys per cache_versions query during a resync
+RESYNC_BATCH_KEYS = 1000
+
+
+class VersionedCache:
+    """In-process LRU cache whose entries remember the key version they were read at"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        value, _, stored_at = entry
+        if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, version: int) -> None:
+        self._entries[key] = (value, version, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def version_of(self, key: str) -> Optional[int]:
+        entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+    def invalidate(self, key: str, version: Optional[int] = None) -> bool:
+        """Drop key if it was cached at an older version (or unconditionally if version is None)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        if version is not None and entry[1] >= version:
+            return False
+        del self._entries[key]
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def keys(self) -> List[str]:
+        return list(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class InvalidationBus:
+    """
+    Broadcasts keyed, versioned invalidations between workers.
+
+    Every key has an authoritative version in `cache_versions`; publishing bumps it
+    with $inc and appends a message to the capped `cache_invalidations` collection,
+    which every worker tails. Messages can be missed (listener restart, capped
+    collection wrapping), so whenever the tail is (re)opened and every
+    `resync_interval` seconds the locally cached keys are checked against
+    `cache_versions` and anything older is dropped.
+
+    Versions this worker has seen are kept for the `max_versions` most recently
+    used keys. While the tail is open every bump is applied here, so a key that
+    is missing has not changed since `synced_since` and needs no lookup for a
+    comparison against something observed after that.
+    """
+
+    def __init__(
+        self,
+        caches: Iterable[VersionedCache],
+        capped_size_bytes: int = 1024 * 1024,
+        capped_max_documents: int = 10000,
+        resync_interval: float = 30.0,
+        retry_delay: float = 1.0,
+        max_versions: int = 100000,
+        clock_skew: float = 2.0,
+    ):
+        self.caches = list(caches)
+        self.capped_size_bytes = capped_size_bytes
+        self.capped_max_documents = capped_max_documents
+        self.resync_interval = resync_interval
+        self.retry_delay = retry_delay
+        self.max_versions = max_versions
+        self.clock_skew = clock_skew
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.versions: "OrderedDict[str, int]" = OrderedDict()
+        # Wall time since which no bump has been missed; None while not tailing
+        self.synced_since: Optional[float] = None
+        self.listeners: List[Callable[[str, int], Any]] = []
+        self.stats = {
+            "received": 0,
+            "published": 0,
+            "resyncs": 0,
+            "last_lag_ms": None,
+            "max_lag_ms": 0.0,
+        }
+        self.db = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_id = None
+        self._needs_resync = True
+
+    def version(self, key: str) -> int:
+        """Latest version of key seen by this worker; capture before reading the source"""
+        return self.versions.get(key, 0)
+
+    async def fetch_version(self, key: str) -> int:
+        """Authoritative version of key, read from cache_versions"""
+        if self.db is not None:
+            doc = await self.db[VERSIONS_COLLECTION].find_one({"_id": key})
+            # Known from now on; later bumps arrive as messages or through resync
+            self._apply(key, doc["version"] if doc else 0)
+        return self.version(key)
+
+    async def is_current(self, key: str, version: int, observed_at: Optional[float] = None) -> bool:
+        """
+        Whether version (observed at wall time observed_at, if known) is still key's latest.
+
+        Keys this worker has not seen are read from cache_versions, unless the
+        version was observed after the worker was already following every bump.
+        """
+        if key in self.versions:
+            self.versions.move_to_end(key)
+            return version >= self.versions[key]
+        if (
+            observed_at is not None
+            and self.synced_since is not None
+            and observed_at > self.synced_since + self.clock_skew
+        ):
+            return True
+        return version >= await self.fetch_version(key)
+
+    def _remember(self, key: str, version: int) -> None:
+        self.versions[key] = version
+        self.versions.move_to_end(key)
+        while len(self.versions) > self.max_versions:
+            self.versions.popitem(last=False)
+            # The forgotten key may have been bumped since synced_since
+            if self.synced_since is not None:
+                self.synced_since = time.time()
+
+    def _apply(self, key: str, version: int) -> None:
+        previous = self.versions.get(key, 0)
+        self._remember(key, max(version, previous))
+        for cache in self.caches:
+            cache.invalidate(key, version)
+        if version > previous:
+            for listener in self.listeners:
+                listener(key, version)
+
+    async def publish(self, key: str) -> int:
+        """Bump key's version, invalidate it locally and broadcast to other workers"""
+        if self.db is None:
+            version = self.version(key) + 1
+            self._apply(key, version)
+            return version
+
+        doc = await self.db[VERSIONS_COLLECTION].find_one_and_update(
+            {"_id": key},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        version = doc["version"]
+        self._apply(key, version)
+        await self.db[MESSAGES_COLLECTION].insert_one({
+            "key": key,
+            "version": version,
+            "origin": self.origin,
+            "published_at": time.time(),
+        })
+        self.stats["published"] += 1
+        return version
+
+    async def publish_many(self, keys: Iterable[str]) -> Dict[str, int]:
+        """Bump several keys with one version write and broadcast them as one message"""
+        keys = sorted(set(keys))
+        if not keys:
+            return {}
+        if self.db is None:
+            return {key: await self.publish(key) for key in keys}
+
+        versions = self.db[VERSIONS_COLLECTION]
+        await versions.bulk_write(
+            [UpdateOne({"_id": key}, {"$inc": {"version": 1}}, upsert=True) for key in keys],
+            ordered=False,
+        )
+        # May already include a concurrent publisher's bump, which is just as valid
+        bumped = {doc["_id"]: doc["version"] async for doc in versions.find({"_id": {"$in": keys}})}
+        for key, version in bumped.items():
+            self._apply(key, version)
+        await self.db[MESSAGES_COLLECTION].insert_one({
+            "keys": [{"key": key, "version": version} for key, version in bumped.items()],
+            "origin": self.origin,
+            "published_at": time.time(),
+        })
+        self.stats["published"] += 1
+        return bumped
+
+    async def ensure_collection(self) -> None:
+        try:
+            await self.db.create_collection(
+                MESSAGES_COLLECTION,
+                capped=True,
+                size=self.capped_size_bytes,
+                max=self.capped_max_documents,
+            )
+        except CollectionInvalid:
+            pass  # already exists
+
+    async def resync(self) -> int:
+        """
+        Catch up on versions of cached and known keys; returns the number of cache entries dropped.
+
+        Known keys include ones that are compared rather than cached (e.g. the
+        entitlement version in access tokens), which would otherwise stay stale;
+        there are at most `max_versions` of them.
+        """
+        keys = {key for cache in self.caches for key in cache.keys()} | set(self.versions)
+        self.stats["resyncs"] += 1
+        if not keys:
+            return 0
+        dropped = 0
+        keys = sorted(keys)
+        for start in range(0, len(keys), RESYNC_BATCH_KEYS):
+            batch = keys[start:start + RESYNC_BATCH_KEYS]
+            async for doc in self.db[VERSIONS_COLLECTION].find({"_id": {"$in": batch}}):
+                key, version = doc["_id"], doc["version"]
+                self._remember(key, max(version, self.versions.get(key, 0)))
+                for cache in self.caches:
+                    if cache.invalidate(key, version):
+                        dropped += 1
+        return dropped
+
+    def _handle(self, message: Dict) -> None:
+        self._last_id = message["_id"]
+        self.stats["received"] += 1
+        lag_ms = max(0.0, (time.time() - message.get("published_at", time.time())) * 1000)
+        self.stats["last_lag_ms"] = lag_ms
+        self.stats["max_lag_ms"] = max(self.stats["max_lag_ms"], lag_ms)
+        if "keys" in message:
+            for entry in message["keys"]:
+                self._apply(entry["key"], entry["version"])
+        else:
+            self._apply(message["key"], message["version"])
+
+    async def _open_tail(self):
+        collection = self.db[MESSAGES_COLLECTION]
+        if self._last_id is None:
+            # Start at the current end; anything older is covered by the resync
+            latest = await collection.find_one({}, sort=[("$natural", -1)])
+            self._last_id = latest["_id"] if latest else None
+        else:
+            # If our last message has been evicted the capped collection wrapped
+            # while we were away, and messages in between may be lost
+            oldest = await collection.find_one({}, sort=[("$natural", 1)])
+            if oldest is not None and oldest["_id"] > self._last_id:
+                self._needs_resync = True
+        query = {"_id": {"$gt": self._last_id}} if self._last_id is not None else {}
+        return collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+
+    async def _run(self) -> None:
+        last_resync = time.monotonic()
+        while True:
+            try:
+                cursor = await self._open_tail()
+                # Bumps from here on are in the tail, earlier ones are in the resync
+                self.synced_since = time.time()
+                while True:
+                    if self._needs_resync or time.monotonic() - last_resync > self.resync_interval:
+                        await self.resync()
+                        self._needs_resync = False
+                        last_resync = time.monotonic()
+                    if not cursor.alive:
+                        break
+                    async for message in cursor:
+                        self._handle(message)
+                    await asyncio.sleep(0.05)
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logger.warning("Invalidation listener error, reconnecting: %s", e)
+                self.synced_since = None
+                self._needs_resync = True
+            await asyncio.sleep(self.retry_delay)
+
+    async def start(self, db) -> None:
+        self.db = db
+        try:
+            await self.ensure_collection()
+        except PyMongoError as e:
+            logger.warning("Could not create invalidation collection: %s", e)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self.synced_since = None
+        self.db = None
@@ -0,0 +1,25 @@
+"""Time-limited leases so only one worker runs a background job at a time"""
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+LEASES_COLLECTION = "job_leases"
+
+
+async def acquire_lease(db, name: str, owner: str, ttl: timedelta) -> bool:
+    """Take or renew the lease `name` for `owner`; False if another owner holds it"""
+    now = datetime.now(timezone.utc)
+    try:
+        result = await db[LEASES_COLLECTION].update_one(
+            {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": owner, "expires_at": now + ttl}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # The lease exists and is held by someone else, so the upsert collided
+        return False
+    return result.matched_count > 0 or result.upserted_id is not None
+
+
+async def release_lease(db, name: str, owner: str) -> None:
+    await db[LEASES_COLLECTION].delete_one({"_id": name, "owner": owner})
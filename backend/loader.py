@@ -0,0 +1,74 @@
+"""Request-scoped identity map that deduplicates and batches Mongo lookups"""
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class RequestLoader:
+    """
+    Memoizes single-document lookups for the lifetime of one request.
+
+    Lookups of the same collection, key field, projection and filter issued in the
+    same event-loop tick are batched into one `find({field: {"$in": [...]}})`, and
+    repeated lookups of the same key are answered from memory.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._memo: Dict[Tuple, asyncio.Future] = {}
+        self._pending: Dict[Tuple, Dict[Any, asyncio.Future]] = {}
+        # The event loop holds tasks only weakly, so flushes in flight are kept here
+        self._flushes: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _batch_key(collection: str, field: str, fields: Tuple[str, ...], where: Optional[Dict]) -> Tuple:
+        return (collection, field, tuple(sorted(fields)), tuple(sorted((where or {}).items())))
+
+    def load(
+        self,
+        collection: str,
+        field: str,
+        value: Any,
+        fields: Tuple[str, ...],
+        where: Optional[Dict] = None,
+    ) -> "asyncio.Future[Optional[Dict]]":
+        """Awaitable for the document with `field == value`, projected to `fields`"""
+        batch_key = self._batch_key(collection, field, fields, where)
+        memo_key = batch_key + (value,)
+        future = self._memo.get(memo_key)
+        if future is not None:
+            return future
+
+        future = asyncio.get_running_loop().create_future()
+        self._memo[memo_key] = future
+        pending = self._pending.get(batch_key)
+        if pending is None:
+            pending = self._pending[batch_key] = {}
+            asyncio.get_running_loop().call_soon(self._start_flush, batch_key)
+        pending[value] = future
+        return future
+
+    def _start_flush(self, batch_key: Tuple) -> None:
+        task = asyncio.ensure_future(self._flush(batch_key))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch_key: Tuple) -> None:
+        pending = self._pending.pop(batch_key)
+        collection, field, fields, where = batch_key
+        query = dict(where)
+        values: List[Any] = list(pending)
+        query[field] = values[0] if len(values) == 1 else {"$in": values}
+        projection = {"_id": 0, field: 1, **{f: 1 for f in fields}}
+        try:
+            docs = await self.db[collection].find(query, projection).to_list(None)
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        found = {}
+        for doc in docs:
+            found.setdefault(doc.get(field), doc)
+        for value, future in pending.items():
+            if not future.done():
+                future.set_result(found.get(value))
@@ -0,0 +1,147 @@
+"""Event-loop lag monitoring with stack capture of blocking calls"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Heartbeat period; 0 disables the monitor
+LOOP_MONITOR_INTERVAL_MS = float(os.environ.get('LOOP_MONITOR_INTERVAL_MS', '100'))
+# A heartbeat this late counts as a stall and gets its stack captured
+LOOP_LAG_THRESHOLD_MS = float(os.environ.get('LOOP_LAG_THRESHOLD_MS', '100'))
+
+# Upper bounds (ms) of the lag histogram buckets; the last bucket is open-ended
+LAG_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class LoopMonitor:
+    """
+    Measures how late a periodic heartbeat task wakes up on the event loop.
+
+    A watchdog thread notices when the heartbeat is overdue by more than the
+    threshold, i.e. while the loop is still blocked, and captures the loop
+    thread's stack at that moment so the blocking call can be identified.
+    """
+
+    def __init__(
+        self,
+        interval_ms: float = LOOP_MONITOR_INTERVAL_MS,
+        threshold_ms: float = LOOP_LAG_THRESHOLD_MS,
+        max_stalls: int = 20,
+    ):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.buckets = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.beats = 0
+        self.max_lag_ms = 0.0
+        self.total_lag_ms = 0.0
+        self.stalls: deque = deque(maxlen=max_stalls)
+        self._last_beat = time.monotonic()
+        self._captured_beat = -1
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def record(self, lag_ms: float) -> None:
+        self.beats += 1
+        self.total_lag_ms += lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        for index, bound in enumerate(LAG_BUCKETS_MS):
+            if lag_ms <= bound:
+                self.buckets[index] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bucket bound below which a fraction `q` of heartbeats fell"""
+        if not self.beats:
+            return None
+        target, seen = q * self.beats, 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return float(LAG_BUCKETS_MS[index]) if index < len(LAG_BUCKETS_MS) else self.max_lag_ms
+        return self.max_lag_ms
+
+    def summary(self) -> Dict:
+        return {
+            "beats": self.beats,
+            "mean_ms": round(self.total_lag_ms / self.beats, 2) if self.beats else None,
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_lag_ms, 2),
+            "stalls": len(self.stalls),
+        }
+
+    def stats(self) -> Dict:
+        labels = [f"le_{bound}ms" for bound in LAG_BUCKETS_MS] + [f"gt_{LAG_BUCKETS_MS[-1]}ms"]
+        return {
+            **self.summary(),
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "histogram": dict(zip(labels, self.buckets)),
+            "recent_stalls": list(self.stalls),
+        }
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - scheduled - self.interval) * 1000)
+            self._last_beat = time.monotonic()
+            self.record(lag_ms)
+            if lag_ms >= self.threshold * 1000 and self._captured_beat == self.beats - 1:
+                # The watchdog caught this stall while it was happening
+                self.stalls[-1]["lag_ms"] = round(lag_ms, 1)
+
+    def capture_stack(self) -> List[str]:
+        frame = sys._current_frames().get(self._loop_thread)
+        return traceback.format_stack(frame) if frame is not None else []
+
+    def _watch(self) -> None:
+        while not self._stopping.wait(self.interval / 2):
+            overdue = time.monotonic() - self._last_beat - self.interval
+            if overdue < self.threshold or self._captured_beat == self.beats:
+                continue
+            self._captured_beat = self.beats
+            stack = self.capture_stack()
+            self.stalls.append({
+                "at": datetime.now(timezone.utc).isoformat(),
+                "lag_ms": round(overdue * 1000, 1),
+                "stack": stack,
+            })
+            logger.warning(
+                "Event loop blocked for over %.0fms; loop thread stack:\n%s", overdue * 1000, "".join(stack)
+            )
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
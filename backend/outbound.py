@@ -0,0 +1,216 @@
+"""
+Guarded calls to external services.
+
+Each upstream is a Dependency with its own policy: a per-attempt timeout and
+an overall deadline, bounded retries with full jitter, a cap on calls in
+flight and a circuit breaker. When an upstream is slow or down, requests fail
+fast with DependencyUnavailable instead of holding workers and connections.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass, fields, replace
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class UpstreamError(Exception):
+    """An upstream answered, but with an error worth retrying (e.g. a 5xx)"""
+
+
+class DependencyUnavailable(Exception):
+    """The call was not made or did not succeed within its budget"""
+
+    def __init__(self, name: str, reason: str, retry_after: Optional[float] = None):
+        super().__init__(f"{name} unavailable: {reason}")
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class Policy:
+    timeout: float = 5.0  # seconds per attempt
+    deadline: float = 10.0  # seconds for the call including retries and backoff
+    retries: int = 2
+    backoff: float = 0.2  # base of the exponential backoff, in seconds
+    max_concurrency: int = 20
+    queue_timeout: float = 0.5  # how long a call may wait for a free slot
+    failure_threshold: int = 5  # consecutive failed attempts that open the circuit
+    reset_timeout: float = 30.0  # seconds open before a trial call is let through
+
+
+def policy_from_env(name: str, **defaults) -> Policy:
+    """A Policy with `defaults`, each field overridable as OUTBOUND_<NAME>_<FIELD>"""
+    policy = Policy(**defaults)
+    overrides = {}
+    for field in fields(Policy):
+        value = os.environ.get(f"OUTBOUND_{name.upper()}_{field.name.upper()}")
+        if value is not None:
+            overrides[field.name] = type(getattr(policy, field.name))(value)
+    return replace(policy, **overrides)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds. Then it lets one trial call through (half-open):
+    success closes it, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - self.clock())
+
+    def allow(self) -> bool:
+        if self.state == OPEN and self.retry_after() == 0:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+        return self.state == CLOSED
+
+    def release_trial(self) -> None:
+        """The trial call was never made; let the next caller try"""
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+            self.state = OPEN
+            self.opened_at = self.clock()
+
+
+class Dependency:
+    """One external service and the policy its calls run under"""
+
+    def __init__(self, name: str, policy: Policy = Policy(), clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.policy = policy
+        self.breaker = CircuitBreaker(policy.failure_threshold, policy.reset_timeout, clock)
+        self._slots = asyncio.Semaphore(policy.max_concurrency)
+        self.in_flight = 0
+        self.metrics: Dict[str, Any] = {
+            "calls": 0,
+            "attempts": 0,
+            "successes": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "retries": 0,
+            "rejected_open": 0,
+            "rejected_saturated": 0,
+            "latency_total_ms": 0.0,
+            "latency_max_ms": 0.0,
+            "last_error": None,
+        }
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]], timeout: float) -> T:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), min(self.policy.queue_timeout, timeout))
+        except asyncio.TimeoutError:
+            self.metrics["rejected_saturated"] += 1
+            raise DependencyUnavailable(self.name, "too many calls in flight")
+        self.in_flight += 1
+        self.metrics["attempts"] += 1
+        started = time.monotonic()
+        try:
+            return await asyncio.wait_for(fn(), timeout)
+        finally:
+            elapsed_ms = (time.monotonic() - started) * 1000
+            self.metrics["latency_total_ms"] += elapsed_ms
+            self.metrics["latency_max_ms"] = max(self.metrics["latency_max_ms"], elapsed_ms)
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        retries: Optional[int] = None,
+        retry_on: Tuple[type, ...] = (),
+    ) -> T:
+        """
+        Run `fn()` under the policy and return its result.
+
+        Timeouts, ConnectionError, UpstreamError and `retry_on` exceptions count
+        as upstream failures and are retried (pass retries=0 for calls that are
+        not safe to repeat). Any other exception is the upstream's answer and is
+        raised unchanged. Raises DependencyUnavailable when the budget runs out.
+        """
+        retries = self.policy.retries if retries is None else retries
+        failure_types = (asyncio.TimeoutError, ConnectionError, UpstreamError) + tuple(retry_on)
+        deadline = time.monotonic() + self.policy.deadline
+        self.metrics["calls"] += 1
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.metrics["rejected_open"] += 1
+                raise DependencyUnavailable(self.name, "circuit open", self.breaker.retry_after())
+            remaining = deadline - time.monotonic()
+            try:
+                result = await self._attempt(fn, min(self.policy.timeout, remaining))
+            except (DependencyUnavailable, asyncio.CancelledError):
+                # Neither says anything about the upstream's health
+                self.breaker.release_trial()
+                raise
+            except failure_types as e:
+                self.breaker.record_failure()
+                if isinstance(e, asyncio.TimeoutError):
+                    self.metrics["timeouts"] += 1
+                self.metrics["last_error"] = f"{type(e).__name__}: {e}"
+                # Full jitter keeps retrying clients from moving in lockstep
+                delay = random.uniform(0, self.policy.backoff * 2 ** attempt)
+                if attempt >= retries or time.monotonic() + delay >= deadline:
+                    self.metrics["failures"] += 1
+                    logger.warning("%s call failed after %d attempts: %s", self.name, attempt + 1, e)
+                    raise DependencyUnavailable(self.name, self.metrics["last_error"]) from e
+                attempt += 1
+                self.metrics["retries"] += 1
+                await asyncio.sleep(delay)
+                continue
+            except Exception:
+                # The upstream answered; its error is the caller's business
+                self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+            self.metrics["successes"] += 1
+            return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        attempts = self.metrics["attempts"]
+        return {
+            **{k: v for k, v in self.metrics.items() if k != "latency_total_ms"},
+            "latency_mean_ms": round(self.metrics["latency_total_ms"] / attempts, 2) if attempts else None,
+            "latency_max_ms": round(self.metrics["latency_max_ms"], 2),
+            "state": self.breaker.state,
+            "times_opened": self.breaker.times_opened,
+            "in_flight": self.in_flight,
+            "policy": {field.name: getattr(self.policy, field.name) for field in fields(Policy)},
+        }
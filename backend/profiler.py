@@ -0,0 +1,263 @@
+"""Sampling profiler for a fraction of requests, keeping flame data for the slow ones"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Fraction of requests to profile; 0 (the default) turns profiling off
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+# Profiled requests faster than this are discarded
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', '500'))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '5'))
+PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', Path(__file__).parent / 'profiles'))
+# Only the newest captures are kept
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '200'))
+
+# Pseudo-frames for samples taken while the request was not running on the loop
+IDLE = "(waiting on I/O)"
+OTHER = "(other tasks)"
+
+
+class Capture:
+    """Stack samples and Mongo command timings collected for one request"""
+
+    def __init__(self, method: str, path: str, task: Optional[asyncio.Task]):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.task = task
+        self.started_at = datetime.now(timezone.utc)
+        self.stacks: Counter = Counter()
+        self.mongo: Dict[str, Dict[str, float]] = {}
+        self.duration_ms = 0.0
+        self.status: Optional[int] = None
+
+    def record_command(self, name: str, duration_micros: int, failed: bool = False) -> None:
+        stats = self.mongo.setdefault(name, {"count": 0, "total_ms": 0.0, "failed": 0})
+        stats["count"] += 1
+        stats["total_ms"] += duration_micros / 1000
+        stats["failed"] += int(failed)
+
+    def folded(self) -> str:
+        """Collapsed stacks, one `frame;frame;frame count` line each (flamegraph.pl, speedscope)"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> Dict:
+        return {
+            "capture_id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration_ms, 1),
+            "samples": sum(self.stacks.values()),
+            "interval_ms": PROFILE_INTERVAL_MS,
+            "mongo": {name: {**s, "total_ms": round(s["total_ms"], 2)} for name, s in self.mongo.items()},
+        }
+
+
+current_capture: contextvars.ContextVar[Optional[Capture]] = contextvars.ContextVar("profile_capture", default=None)
+
+
+class MongoCommandProfiler(monitoring.CommandListener):
+    """
+    Attributes Mongo commands to the capture of the request that issued them.
+
+    Motor runs commands on executor threads with a copy of the caller's
+    context, so the context variable is visible here.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        capture = current_capture.get()
+        if capture is not None:
+            capture.record_command(event.command_name, event.duration_micros)
+
+    def failed(self, event):
+        capture = current_capture.get()
+        if capture is not None:
+            capture.record_command(event.command_name, event.duration_micros, failed=True)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse(frame) -> str:
+    names: List[str] = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """
+    Samples the event-loop thread's stack while any capture is active.
+
+    Each sample goes to the capture whose task is running on the loop at that
+    moment; the others record that they were waiting on I/O or on other tasks.
+    """
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self._captures: Dict[int, List[Capture]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._loops: Dict[int, asyncio.AbstractEventLoop] = {}
+
+    def add(self, capture: Capture) -> None:
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._loops[thread_id] = asyncio.get_running_loop()
+            self._captures.setdefault(thread_id, []).append(capture)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def remove(self, capture: Capture) -> None:
+        with self._lock:
+            for thread_id, captures in list(self._captures.items()):
+                if capture in captures:
+                    captures.remove(capture)
+                if not captures:
+                    del self._captures[thread_id]
+                    self._loops.pop(thread_id, None)
+
+    def sample(self) -> None:
+        with self._lock:
+            active = [(t, list(c), self._loops[t]) for t, c in self._captures.items()]
+        if not active:
+            return
+        frames = sys._current_frames()
+        for thread_id, captures, loop in active:
+            frame = frames.get(thread_id)
+            if frame is None:
+                continue
+            running = asyncio.current_task(loop)
+            stack = None
+            for capture in captures:
+                if running is capture.task:
+                    stack = stack or collapse(frame)
+                    capture.stacks[stack] += 1
+                else:
+                    capture.stacks[IDLE if running is None else OTHER] += 1
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._captures:
+                    self._thread = None
+                    return
+            try:
+                self.sample()
+            except Exception as e:  # never let a sampling hiccup kill the thread
+                logger.debug("Profiler sample failed: %s", e)
+
+
+class CaptureStore:
+    """Captures on disk as <id>.json (summary) and <id>.folded (collapsed stacks)"""
+
+    def __init__(self, directory: Path = PROFILE_DIR, keep: int = PROFILE_KEEP):
+        self.directory = directory
+        self.keep = keep
+
+    def write(self, capture: Capture) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = f"{capture.started_at.strftime('%Y%m%dT%H%M%S%f')}-{capture.id}"
+        (self.directory / f"{stem}.folded").write_text(capture.folded())
+        tmp = self.directory / f".{stem}.json.tmp"
+        tmp.write_text(json.dumps(capture.summary()))
+        os.replace(tmp, self.directory / f"{stem}.json")
+        self.rotate()
+
+    def rotate(self) -> None:
+        summaries = sorted(self.directory.glob("*.json"))
+        for path in summaries[:max(0, len(summaries) - self.keep)]:
+            path.unlink(missing_ok=True)
+            path.with_suffix(".folded").unlink(missing_ok=True)
+
+    def list(self, limit: int = 50) -> List[Dict]:
+        if not self.directory.exists():
+            return []
+        captures = []
+        for path in sorted(self.directory.glob("*.json"), reverse=True)[:limit]:
+            try:
+                captures.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue  # rotated away or half-written
+        return captures
+
+    def folded(self, capture_id: str) -> Optional[str]:
+        if not capture_id.isalnum() or not self.directory.exists():
+            return None
+        for path in self.directory.glob(f"*-{capture_id}.folded"):
+            return path.read_text()
+        return None
+
+
+class ProfilerMiddleware:
+    """Profile a random PROFILE_SAMPLE_RATE of requests; keep those slower than PROFILE_SLOW_MS"""
+
+    def __init__(
+        self,
+        app,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        slow_ms: float = PROFILE_SLOW_MS,
+        sampler: Optional[StackSampler] = None,
+        store: Optional[CaptureStore] = None,
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.sampler = sampler or StackSampler()
+        self.store = store or CaptureStore()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= self.sample_rate or current_capture.get() is not None:
+            await self.app(scope, receive, send)
+            return
+
+        capture = Capture(scope["method"], scope["path"], asyncio.current_task())
+        token = current_capture.set(capture)
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                capture.status = message["status"]
+            await send(message)
+
+        self.sampler.add(capture)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            capture.duration_ms = (time.perf_counter() - start) * 1000
+            self.sampler.remove(capture)
+            current_capture.reset(token)
+            route = scope.get("route")
+            capture.route = getattr(route, "path", None)
+            if capture.duration_ms >= self.slow_ms:
+                try:
+                    await asyncio.to_thread(self.store.write, capture)
+                except OSError as e:
+                    logger.warning("Could not save profile %s: %s", capture.id, e)
@@ -0,0 +1,264 @@
+"""
+Bulk user provisioning from CSV.
+
+Rows are streamed, validated, checked against existing accounts, hashed across
+a process pool and inserted with unordered insert_many in chunks. Run as a
+script from the backend directory:
+
+    python provisioning.py users.csv [--chunk-size 500] [--workers N]
+
+The CSV needs a header row with `email`, `name` and `password` columns.
+"""
+import argparse
+import asyncio
+import codecs
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import bcrypt
+from email_validator import EmailNotValidError, validate_email
+from pymongo.errors import BulkWriteError
+
+import counters
+
+logger = logging.getLogger(__name__)
+
+PROVISION_CHUNK_SIZE = int(os.environ.get('PROVISION_CHUNK_SIZE', '500'))
+# Hashing processes; defaults to one per core
+PROVISION_WORKERS = int(os.environ.get('PROVISION_WORKERS', '0')) or os.cpu_count() or 1
+# Per-row problems listed in a report beyond this many are only counted
+PROVISION_REPORT_LIMIT = int(os.environ.get('PROVISION_REPORT_LIMIT', '1000'))
+BCRYPT_ROUNDS = 12  # bcrypt.gensalt() default, as used by hash_password
+DUPLICATE_KEY = 11000
+
+
+def hash_passwords(passwords: List[str], rounds: int = BCRYPT_ROUNDS) -> List[str]:
+    """Hash a slice of passwords; runs in a pool process"""
+    return [bcrypt.hashpw(p.encode(), bcrypt.gensalt(rounds)).decode() for p in passwords]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def hash_pool() -> ProcessPoolExecutor:
+    """Shared hashing pool, started on first use"""
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the server process has Motor and executor threads running
+        _pool = ProcessPoolExecutor(PROVISION_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+async def decode_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Split a streamed UTF-8 body into lines without buffering all of it"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def csv_rows(lines: AsyncIterable[str]) -> AsyncIterator[Tuple[int, Dict[str, str]]]:
+    """(line number, row) pairs keyed by the header; fields may not contain newlines"""
+    header: Optional[List[str]] = None
+    number = 0
+    async for line in lines:
+        number += 1
+        line = line.rstrip("\r")
+        if not line.strip():
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        yield number, dict(zip(header, (v.strip() for v in values)))
+
+
+class ProvisionReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.counts = {"duplicate": 0, "invalid": 0, "failed": 0}
+        self.problems: List[Dict] = []
+        self.started = time.perf_counter()
+
+    def problem(self, kind: str, row: int, email: Optional[str], reason: str) -> None:
+        self.counts[kind] += 1
+        if len(self.problems) < PROVISION_REPORT_LIMIT:
+            self.problems.append({"row": row, "email": email, "status": kind, "reason": reason})
+
+    def as_dict(self) -> Dict:
+        seconds = time.perf_counter() - self.started
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "duplicates": self.counts["duplicate"],
+            "invalid": self.counts["invalid"],
+            "failed": self.counts["failed"],
+            "problems": self.problems,
+            "problems_truncated": sum(self.counts.values()) > len(self.problems),
+            "seconds": round(seconds, 2),
+            "users_per_second": round(self.created / seconds, 1) if seconds else None,
+        }
+
+
+async def provision_users(
+    db,
+    rows: AsyncIterable[Tuple[int, Dict[str, str]]],
+    admin_emails: Iterable[str] = (),
+    executor: Optional[Executor] = None,
+    workers: int = PROVISION_WORKERS,
+    chunk_size: int = PROVISION_CHUNK_SIZE,
+    rounds: int = BCRYPT_ROUNDS,
+) -> Dict:
+    """Create accounts for CSV rows, reporting invalid and duplicate rows by line number"""
+    executor = executor or hash_pool()
+    admin_emails = set(admin_emails)
+    report = ProvisionReport()
+    seen: set = set()
+    chunk: List[Tuple[int, Dict]] = []
+
+    async def flush():
+        emails = [row["email"] for _, row in chunk]
+        existing = {
+            user["email"] for user in
+            await db.users.find({"email": {"$in": emails}}, {"_id": 0, "email": 1}).to_list(None)
+        }
+        fresh = []
+        for number, row in chunk:
+            if row["email"] in existing:
+                report.problem("duplicate", number, row["email"], "Email already registered")
+            else:
+                fresh.append((number, row))
+        chunk.clear()
+        if not fresh:
+            return
+
+        # One task per worker, so each process hashes a contiguous slice
+        loop = asyncio.get_running_loop()
+        size = -(-len(fresh) // workers)
+        slices = [fresh[i:i + size] for i in range(0, len(fresh), size)]
+        hashed = await asyncio.gather(*(
+            loop.run_in_executor(executor, hash_passwords, [row["password"] for _, row in part], rounds)
+            for part in slices
+        ))
+        now = datetime.now(timezone.utc).isoformat()
+        docs = [
+            {
+                "user_id": f"user_{uuid.uuid4().hex[:12]}",
+                "email": row["email"],
+                "name": row["name"],
+                "password_hash": password_hash,
+                "picture": None,
+                "role": "admin" if row["email"] in admin_emails else "user",
+                "created_at": now,
+            }
+            for part, hashes in zip(slices, hashed)
+            for (_, row), password_hash in zip(part, hashes)
+        ]
+        try:
+            result = await db.users.insert_many(docs, ordered=False)
+            inserted = len(result.inserted_ids)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            inserted = e.details.get("nInserted", len(docs) - len(errors))
+            for error in errors:
+                number, row = fresh[error["index"]]
+                if error.get("code") == DUPLICATE_KEY:
+                    report.problem("duplicate", number, row["email"], "Email already registered")
+                else:
+                    report.problem("failed", number, row["email"], error.get("errmsg", "Insert failed"))
+        report.created += inserted
+        await counters.increment(db, "users", inserted)
+
+    async for number, row in rows:
+        report.rows += 1
+        raw_email = row.get("email") or ""
+        try:
+            email = validate_email(raw_email, check_deliverability=False).normalized
+        except EmailNotValidError as e:
+            report.problem("invalid", number, raw_email or None, str(e))
+            continue
+        if not row.get("password"):
+            report.problem("invalid", number, email, "Missing password")
+            continue
+        if email in seen:
+            report.problem("duplicate", number, email, "Email appears earlier in the file")
+            continue
+        seen.add(email)
+        chunk.append((number, {"email": email, "name": row.get("name") or email.split("@")[0], "password": row["password"]}))
+        if len(chunk) >= chunk_size:
+            await flush()
+    if chunk:
+        await flush()
+
+    result = report.as_dict()
+    logger.info(
+        "Provisioned %s of %s users (%s duplicate, %s invalid) in %ss",
+        result['created'], result['rows'], result['duplicates'], result['invalid'], result['seconds']
+    )
+    return result
+
+
+async def _file_chunks(path: str, size: int = 1 << 16) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while chunk := f.read(size):
+            yield chunk
+
+
+async def _main(args) -> Dict:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pathlib import Path
+
+    import database
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], **database.client_options())
+    executor = ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        return await provision_users(
+            client[os.environ['DB_NAME']],
+            csv_rows(decode_lines(_file_chunks(args.csv))),
+            admin_emails=os.environ.get('ADMIN_EMAILS', 'admin@blessedbelly.com').split(','),
+            executor=executor,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+        )
+    finally:
+        executor.shutdown()
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Create user accounts from a CSV file")
+    parser.add_argument("csv", help="CSV with email, name and password columns")
+    parser.add_argument("--chunk-size", type=int, default=PROVISION_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=PROVISION_WORKERS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    print(json.dumps(asyncio.run(_main(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
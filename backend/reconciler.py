@@ -0,0 +1,216 @@
+"""Background reconciliation of pending payment transactions against Stripe"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+import counters
+from leases import acquire_lease, release_lease
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "payment_reconciler"
+
+
+class PaymentReconciler:
+    """
+    Resolves payment_transactions stuck in `pending`.
+
+    Pending transactions older than `older_than` are streamed oldest-first through
+    the (payment_status, created_at) index, checked with at most `concurrency`
+    Stripe calls in flight, and written back in `bulk_write` batches; paid ones
+    are claimed one by one so each activates a subscription once. A lease
+    keeps the job to one worker at a time.
+    """
+
+    def __init__(
+        self,
+        db,
+        check_status: Callable[[str], Awaitable[Any]],
+        activation: Callable[[str, str], Dict],
+        on_activated: Optional[Callable[[str], Awaitable[None]]] = None,
+        older_than: timedelta = timedelta(minutes=30),
+        recheck_after: timedelta = timedelta(minutes=15),
+        concurrency: int = 8,
+        batch_size: int = 100,
+        interval: float = 300.0,
+    ):
+        self.db = db
+        self.check_status = check_status
+        self.activation = activation
+        self.on_activated = on_activated
+        self.older_than = older_than
+        self.recheck_after = recheck_after
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.interval = interval
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.metrics: Dict[str, Any] = {
+            "runs": 0,
+            "checked": 0,
+            "paid": 0,
+            "expired": 0,
+            "still_pending": 0,
+            "already_resolved": 0,
+            "errors": 0,
+            "last_run_at": None,
+            "last_duration_s": None,
+            "last_throughput_per_s": None,
+            "lag_seconds": None,
+        }
+        self._task: Optional[asyncio.Task] = None
+        # A manual run and the background loop on the same worker share the lease owner
+        self._lock = asyncio.Lock()
+
+    def _query(self, now: datetime) -> Dict:
+        return {
+            "payment_status": "pending",
+            "created_at": {"$lt": (now - self.older_than).isoformat()},
+            "$or": [
+                {"reconciled_at": {"$exists": False}},
+                {"reconciled_at": {"$lt": (now - self.recheck_after).isoformat()}},
+            ],
+        }
+
+    async def _check(self, semaphore: asyncio.Semaphore, txn: Dict):
+        async with semaphore:
+            try:
+                return txn, await self.check_status(txn["session_id"])
+            except Exception as e:
+                logger.warning("Reconcile check failed for %s: %s", txn['session_id'], e)
+                return txn, None
+
+    async def _apply(self, results: List) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        txn_ops, paid = [], []
+        for txn, status in results:
+            if status is None:
+                self.metrics["errors"] += 1
+                txn_ops.append(UpdateOne({"session_id": txn["session_id"]}, {"$set": {"reconciled_at": now}}))
+                continue
+            self.metrics["checked"] += 1
+            update = {"reconciled_at": now, "status": status.status}
+            if status.payment_status == "paid":
+                update.update(payment_status="paid", updated_at=now)
+                paid.append((txn, update))
+                continue
+            if status.status == "expired":
+                self.metrics["expired"] += 1
+                update.update(payment_status="expired", updated_at=now)
+            else:
+                self.metrics["still_pending"] += 1
+            # Guard on pending so a concurrent webhook or status poll wins
+            match = {"session_id": txn["session_id"], "payment_status": "pending"}
+            txn_ops.append(UpdateOne(match, {"$set": update}))
+
+        if txn_ops:
+            await self.db.payment_transactions.bulk_write(txn_ops, ordered=False)
+
+        # Paid transactions are moved out of pending one at a time, so only
+        # those this run actually moved activate a subscription
+        sub_ops, activated = [], []
+        for txn, update in paid:
+            result = await self.db.payment_transactions.update_one(
+                {"session_id": txn["session_id"], "payment_status": "pending"}, {"$set": update}
+            )
+            if not result.matched_count:
+                self.metrics["already_resolved"] += 1
+                continue
+            self.metrics["paid"] += 1
+            sub_ops.append(UpdateOne(
+                {"user_id": txn["user_id"]},
+                {"$set": self.activation(txn["user_id"], txn.get("plan", "beta_monthly"))},
+                upsert=True,
+            ))
+            activated.append(txn["user_id"])
+
+        if sub_ops:
+            result = await self.db.subscriptions.bulk_write(sub_ops, ordered=False)
+            await counters.increment(self.db, "subscriptions", result.upserted_count)
+        if self.on_activated:
+            for user_id in activated:
+                await self.on_activated(user_id)
+
+    async def run_once(self) -> Dict[str, Any]:
+        """One pass over the pending backlog; returns the metrics"""
+        started = time.monotonic()
+        now = datetime.now(timezone.utc)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        processed = 0
+        oldest = None
+
+        cursor = self.db.payment_transactions.find(
+            self._query(now),
+            {"_id": 0, "session_id": 1, "user_id": 1, "plan": 1, "created_at": 1},
+        ).sort("created_at", 1).batch_size(self.batch_size)
+
+        batch: List[Dict] = []
+        async for txn in cursor:
+            if oldest is None:
+                oldest = txn.get("created_at")
+            batch.append(txn)
+            if len(batch) >= self.batch_size:
+                await self._apply(await asyncio.gather(*(self._check(semaphore, t) for t in batch)))
+                processed += len(batch)
+                batch = []
+        if batch:
+            await self._apply(await asyncio.gather(*(self._check(semaphore, t) for t in batch)))
+            processed += len(batch)
+
+        duration = time.monotonic() - started
+        self.metrics["runs"] += 1
+        self.metrics["last_run_at"] = now.isoformat()
+        self.metrics["last_duration_s"] = round(duration, 3)
+        self.metrics["last_processed"] = processed
+        self.metrics["last_throughput_per_s"] = round(processed / duration, 2) if duration > 0 else None
+        self.metrics["lag_seconds"] = (
+            round((now - datetime.fromisoformat(oldest)).total_seconds(), 1) if oldest else 0
+        )
+        return self.metrics
+
+    async def run_now(self) -> Optional[Dict[str, Any]]:
+        """One pass under the lease, for manual runs; None while another worker holds it"""
+        if not await acquire_lease(self.db, LEASE_NAME, self.owner, timedelta(seconds=self.interval * 2)):
+            return None
+        try:
+            async with self._lock:
+                return await self.run_once()
+        finally:
+            if self._task is None:
+                # Not the background loop's lease to keep
+                await release_lease(self.db, LEASE_NAME, self.owner)
+
+    async def _run(self) -> None:
+        lease_ttl = timedelta(seconds=self.interval * 2)
+        while True:
+            try:
+                if await acquire_lease(self.db, LEASE_NAME, self.owner, lease_ttl):
+                    async with self._lock:
+                        await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Payment reconciliation failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await release_lease(self.db, LEASE_NAME, self.owner)
+        except Exception as e:
+            logger.warning("Could not release reconciler lease: %s", e)
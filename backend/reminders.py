@@ -0,0 +1,330 @@
+"""Daily check-in reminders for active subscribers who have not checked in yet"""
+import asyncio
+import json
+import logging
+import os
+import smtplib
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Protocol
+
+from leases import acquire_lease, release_lease
+
+logger = logging.getLogger(__name__)
+
+REMINDER_SENDER = os.environ.get('REMINDER_SENDER', 'file')  # file, smtp
+REMINDER_OUTBOX = Path(os.environ.get('REMINDER_OUTBOX', Path(__file__).parent / 'outbox' / 'reminders.jsonl'))
+REMINDER_CONCURRENCY = int(os.environ.get('REMINDER_CONCURRENCY', '20'))
+REMINDER_BATCH_SIZE = int(os.environ.get('REMINDER_BATCH_SIZE', '500'))
+# Daily send time as HH:MM UTC; unset disables the schedule (runs can still be started by an admin)
+REMINDER_SEND_AT = os.environ.get('REMINDER_SEND_AT', '')
+
+SMTP_HOST = os.environ.get('SMTP_HOST', 'localhost')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
+SMTP_USERNAME = os.environ.get('SMTP_USERNAME', '')
+SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD', '')
+SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', 'true').lower() == 'true'
+REMINDER_FROM = os.environ.get('REMINDER_FROM', 'Blessed Belly <hello@blessedbelly.com>')
+
+RUNS_COLLECTION = "reminder_runs"
+
+
+@dataclass
+class Reminder:
+    user_id: str
+    email: str
+    name: str
+    date: str
+    link: str
+
+    @property
+    def subject(self) -> str:
+        return "Time for your BASEline check-in"
+
+    @property
+    def body(self) -> str:
+        return (
+            f"Hi {self.name},\n\n"
+            "You haven't checked in today. It only takes a moment to tell us how you're feeling "
+            "and get today's BASEline action and verse.\n\n"
+            f"{self.link}\n"
+        )
+
+
+class Sender(Protocol):
+    async def send(self, reminder: Reminder) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class FileSender:
+    """Appends reminders as JSON lines; a stand-in for email in development and tests"""
+
+    def __init__(self, path: Path = REMINDER_OUTBOX):
+        self.path = path
+        self._lock = asyncio.Lock()
+
+    def _append(self, line: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    async def send(self, reminder: Reminder) -> None:
+        line = json.dumps({**asdict(reminder), "subject": reminder.subject, "body": reminder.body}) + "\n"
+        async with self._lock:
+            await asyncio.to_thread(self._append, line)
+
+    async def close(self) -> None:
+        pass
+
+
+class SMTPSender:
+    """Sends through an SMTP relay, one connection per concurrent slot, reused across messages"""
+
+    def __init__(self, slots: int = REMINDER_CONCURRENCY):
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._slots = slots
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+        if SMTP_STARTTLS:
+            connection.starttls()
+        if SMTP_USERNAME:
+            connection.login(SMTP_USERNAME, SMTP_PASSWORD)
+        return connection
+
+    def _deliver(self, connection: Optional[smtplib.SMTP], message: EmailMessage) -> smtplib.SMTP:
+        if connection is None:
+            connection = self._connect()
+        try:
+            connection.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            connection = self._connect()
+            connection.send_message(message)
+        return connection
+
+    async def send(self, reminder: Reminder) -> None:
+        message = EmailMessage()
+        message["From"] = REMINDER_FROM
+        message["To"] = reminder.email
+        message["Subject"] = reminder.subject
+        message.set_content(reminder.body)
+        connection = self._idle.get_nowait() if not self._idle.empty() else None
+        try:
+            connection = await asyncio.to_thread(self._deliver, connection, message)
+        except Exception:
+            if connection is not None:
+                await asyncio.to_thread(connection.close)
+            raise
+        if self._idle.qsize() < self._slots:
+            self._idle.put_nowait(connection)
+        else:
+            await asyncio.to_thread(connection.quit)
+
+    async def close(self) -> None:
+        while not self._idle.empty():
+            connection = self._idle.get_nowait()
+            try:
+                await asyncio.to_thread(connection.quit)
+            except smtplib.SMTPException:
+                pass
+
+
+def build_sender() -> Sender:
+    if REMINDER_SENDER == "smtp":
+        return SMTPSender()
+    return FileSender()
+
+
+async def anti_join(subscriptions, checkins) -> AsyncIterator[str]:
+    """
+    User ids from `subscriptions` that are absent from `checkins`.
+
+    Both cursors must be sorted by user_id; they are merged in one pass, so
+    memory use does not grow with the number of subscribers.
+    """
+    checkins = checkins.__aiter__()
+    checked_in = None
+    checkins_done = False
+    async for subscription in subscriptions:
+        user_id = subscription["user_id"]
+        while not checkins_done and (checked_in is None or checked_in < user_id):
+            try:
+                checked_in = (await checkins.__anext__())["user_id"]
+            except StopAsyncIteration:
+                checkins_done = True
+        if checked_in != user_id:
+            yield user_id
+
+
+class ReminderDispatcher:
+    """
+    Sends one reminder per day to active subscribers without a check-in.
+
+    Active subscriptions and today's check-ins are streamed in user_id order
+    through the (status, user_id) and (date, user_id) indexes and merged, so
+    only users who still need a reminder are looked up. Messages go out with
+    at most `concurrency` sends in flight. Progress is checkpointed per batch
+    in `reminder_runs`, so an interrupted run resumes after the last finished
+    batch; only the in-flight batch can be sent twice.
+    """
+
+    def __init__(
+        self,
+        db,
+        sender_factory=build_sender,
+        link: str = "/dashboard",
+        concurrency: int = REMINDER_CONCURRENCY,
+        batch_size: int = REMINDER_BATCH_SIZE,
+        send_at: str = REMINDER_SEND_AT,
+    ):
+        self.db = db
+        self.sender_factory = sender_factory
+        self.link = link
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.send_at = send_at
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._task: Optional[asyncio.Task] = None
+
+    async def _send(self, sender: Sender, semaphore: asyncio.Semaphore, reminder: Reminder) -> bool:
+        async with semaphore:
+            try:
+                await sender.send(reminder)
+                return True
+            except Exception as e:
+                logger.warning("Reminder to %s failed: %s", reminder.user_id, e)
+                return False
+
+    async def _dispatch(self, sender: Sender, semaphore, user_ids: List[str], date: str) -> Dict[str, int]:
+        users = await self.db.users.find(
+            {"user_id": {"$in": user_ids}}, {"_id": 0, "user_id": 1, "email": 1, "name": 1}
+        ).to_list(None)
+        reminders = [
+            Reminder(u["user_id"], u["email"], u.get("name") or "friend", date, self.link)
+            for u in users if u.get("email")
+        ]
+        results = await asyncio.gather(*(self._send(sender, semaphore, r) for r in reminders))
+        sent = sum(results)
+        return {"sent": sent, "failed": len(results) - sent, "skipped": len(user_ids) - len(reminders)}
+
+    async def run(self, date: Optional[str] = None) -> Dict[str, Any]:
+        """Send (or resume sending) the reminders for `date` (default today, UTC)"""
+        date = date or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        runs = self.db[RUNS_COLLECTION]
+        lease = f"reminders:{date}"
+        if not await acquire_lease(self.db, lease, self.owner, timedelta(minutes=10)):
+            return {"date": date, "status": "running elsewhere"}
+
+        started = time.monotonic()
+        now = datetime.now(timezone.utc).isoformat()
+        checkpoint = await runs.find_one({"_id": date}) or {}
+        if checkpoint.get("completed_at"):
+            await release_lease(self.db, lease, self.owner)
+            return self._report(checkpoint)
+        after = checkpoint.get("last_user_id")
+        totals = {key: checkpoint.get(key, 0) for key in ("sent", "failed", "skipped")}
+        await runs.update_one(
+            {"_id": date},
+            {"$setOnInsert": {"started_at": now}, "$set": {"status": "running", "resumed_from": after}},
+            upsert=True,
+        )
+
+        resume = {"user_id": {"$gt": after}} if after else {}
+        subscriptions = self.db.subscriptions.find(
+            {"status": "active", **resume}, {"_id": 0, "user_id": 1}
+        ).sort("user_id", 1).batch_size(self.batch_size)
+        checkins = self.db.daily_checkins.find(
+            {"date": date, **resume}, {"_id": 0, "user_id": 1}
+        ).sort("user_id", 1).batch_size(self.batch_size)
+
+        sender = self.sender_factory()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        processed = 0
+        batch: List[str] = []
+
+        async def flush():
+            nonlocal processed
+            counts = await self._dispatch(sender, semaphore, batch, date)
+            for key, value in counts.items():
+                totals[key] += value
+            processed += len(batch)
+            await runs.update_one({"_id": date}, {"$set": {
+                **totals, "last_user_id": batch[-1], "updated_at": datetime.now(timezone.utc).isoformat()
+            }})
+            # Keep the lease for as long as the run takes
+            await acquire_lease(self.db, lease, self.owner, timedelta(minutes=10))
+            batch.clear()
+
+        try:
+            async for user_id in anti_join(subscriptions, checkins):
+                batch.append(user_id)
+                if len(batch) >= self.batch_size:
+                    await flush()
+            if batch:
+                await flush()
+        finally:
+            await sender.close()
+            await release_lease(self.db, lease, self.owner)
+
+        duration = time.monotonic() - started
+        sent_now = totals["sent"] - checkpoint.get("sent", 0)
+        final = {
+            **totals,
+            "status": "completed",
+            "completed_at": datetime.now(timezone.utc).isoformat(),
+            "last_duration_s": round(duration, 3),
+            "last_processed": processed,
+            "throughput_per_s": round(sent_now / duration, 2) if duration > 0 else None,
+        }
+        await runs.update_one({"_id": date}, {"$set": final})
+        logger.info(
+            "Reminders for %s: %s sent, %s failed, %s without email in %.1fs",
+            date, totals['sent'], totals['failed'], totals['skipped'], duration
+        )
+        return self._report({"_id": date, **checkpoint, **final, "resumed_from": after})
+
+    @staticmethod
+    def _report(doc: Dict) -> Dict[str, Any]:
+        return {"date": doc["_id"], **{k: v for k, v in doc.items() if k != "_id"}}
+
+    async def status(self, date: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        date = date or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        doc = await self.db[RUNS_COLLECTION].find_one({"_id": date})
+        return self._report(doc) if doc else None
+
+    def _seconds_until_next(self) -> float:
+        hour, minute = (int(part) for part in self.send_at.split(":"))
+        now = datetime.now(timezone.utc)
+        target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(days=1)
+        return (target - now).total_seconds()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._seconds_until_next())
+            try:
+                await self.run()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Reminder run failed: %s", e)
+
+    def start(self) -> None:
+        if self.send_at:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
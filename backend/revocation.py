@@ -0,0 +1,164 @@
+"""Access-token revocation: a TTL'd denylist in Mongo mirrored by an in-memory Bloom filter"""
+import asyncio
+import hashlib
+import logging
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# How often each worker pulls revocations made by other workers
+REVOCATION_REFRESH_SECONDS = float(os.environ.get('REVOCATION_REFRESH_SECONDS', '5'))
+# How often the filter is rebuilt from scratch to shed expired entries
+REVOCATION_REBUILD_SECONDS = float(os.environ.get('REVOCATION_REBUILD_SECONDS', '3600'))
+REVOCATION_BLOOM_CAPACITY = int(os.environ.get('REVOCATION_BLOOM_CAPACITY', '100000'))
+REVOCATION_BLOOM_FP_RATE = float(os.environ.get('REVOCATION_BLOOM_FP_RATE', '0.001'))
+
+# Incremental refreshes re-read this far back to pick up inserts that became
+# visible after a later one (clock skew between workers, slow writes)
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing of one BLAKE2b digest"""
+
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """
+    Revoked token IDs (`jti`), checked without a DB read unless the filter matches.
+
+    Revocations are stored in `revoked_tokens` until the token would have
+    expired anyway. Each worker keeps a Bloom filter of them, adds its own
+    revocations immediately and pulls other workers' every
+    REVOCATION_REFRESH_SECONDS. A filter hit is confirmed against Mongo, so
+    false positives cost a lookup but never reject a valid token.
+    """
+
+    def __init__(self, capacity: int = REVOCATION_BLOOM_CAPACITY, fp_rate: float = REVOCATION_BLOOM_FP_RATE):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.filter = BloomFilter(capacity, fp_rate)
+        self.db = None
+        self._watermark: Optional[datetime] = None
+        self._last_rebuild = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"checks": 0, "filter_hits": 0, "confirmed": 0, "refreshes": 0}
+
+    async def revoke(self, jti: str, user_id: str, expires_at: datetime) -> None:
+        """Deny a token until `expires_at`, its own expiry"""
+        if expires_at <= datetime.now(timezone.utc):
+            return
+        try:
+            await self.db.revoked_tokens.insert_one({
+                "jti": jti,
+                "user_id": user_id,
+                "revoked_at": datetime.now(timezone.utc),
+                "expires_at": expires_at,  # BSON date so the TTL index can expire it
+            })
+        except DuplicateKeyError:
+            pass
+        self.filter.add(jti)
+
+    async def is_revoked(self, jti: str) -> bool:
+        self.stats["checks"] += 1
+        if self.db is None or jti not in self.filter:
+            return False
+        self.stats["filter_hits"] += 1
+        revoked = await self.db.revoked_tokens.find_one({"jti": jti}, {"_id": 1}) is not None
+        self.stats["confirmed"] += int(revoked)
+        return revoked
+
+    async def rebuild(self) -> None:
+        """Load every unexpired revocation into a new filter and swap it in"""
+        now = datetime.now(timezone.utc)
+        count = await self.db.revoked_tokens.count_documents({"expires_at": {"$gt": now}})
+        # Leave room to grow until the next rebuild
+        fresh = BloomFilter(max(self.capacity, count * 2), self.fp_rate)
+        cursor = self.db.revoked_tokens.find({"expires_at": {"$gt": now}}, {"_id": 0, "jti": 1}).batch_size(10000)
+        async for doc in cursor:
+            fresh.add(doc["jti"])
+        # Revocations made by this worker while loading must not be lost
+        await self._pull(fresh, now - REFRESH_OVERLAP)
+        self.filter = fresh
+        self._watermark = now
+        self._last_rebuild = asyncio.get_running_loop().time()
+
+    async def _pull(self, target: BloomFilter, since: datetime) -> Optional[datetime]:
+        latest = None
+        cursor = self.db.revoked_tokens.find({"revoked_at": {"$gte": since}}, {"_id": 0, "jti": 1, "revoked_at": 1})
+        async for doc in cursor:
+            if doc["jti"] not in target:  # the overlap re-reads recent entries
+                target.add(doc["jti"])
+            revoked_at = doc["revoked_at"]
+            if revoked_at.tzinfo is None:
+                revoked_at = revoked_at.replace(tzinfo=timezone.utc)
+            latest = revoked_at if latest is None else max(latest, revoked_at)
+        return latest
+
+    async def refresh(self) -> None:
+        """Add revocations made since the last refresh (by any worker)"""
+        if asyncio.get_running_loop().time() - self._last_rebuild >= REVOCATION_REBUILD_SECONDS \
+                or self.filter.count > self.filter.capacity:
+            await self.rebuild()
+            return
+        latest = await self._pull(self.filter, self._watermark - REFRESH_OVERLAP)
+        if latest is not None:
+            self._watermark = max(self._watermark, latest)
+        self.stats["refreshes"] += 1
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(REVOCATION_REFRESH_SECONDS)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning("Revocation refresh failed: %s", e)
+
+    async def start(self, db) -> None:
+        self.db = db
+        await self.rebuild()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.db = None
+
+    def snapshot(self) -> Dict:
+        return {
+            **self.stats,
+            "filter_entries": self.filter.count,
+            "filter_bytes": len(self.filter.bits),
+            "watermark": self._watermark.isoformat() if self._watermark else None,
+        }
@@ -0,0 +1,254 @@
+"""
+Production entrypoint for the API.
+
+Runs uvicorn with uvloop and httptools when they are installed and one worker
+process per available CPU. On Linux every worker opens its own SO_REUSEPORT
+listening socket, so the kernel spreads connections across workers instead of
+all of them waking up for each accept on one shared socket.
+
+    python -m backend.serve                 # from the repository root
+    python serve.py --workers 4 --port 8001 # from backend/
+
+SIGTERM or SIGINT drains the workers: they stop accepting, finish in-flight
+requests for up to SERVER_GRACEFUL_TIMEOUT seconds and run the app shutdown.
+SIGHUP replaces the workers one at a time (to pick up a deploy without
+refusing connections).
+"""
+import argparse
+import importlib.util
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+BACKEND_DIR = Path(__file__).resolve().parent
+load_dotenv(BACKEND_DIR / '.env')
+
+logger = logging.getLogger("serve")
+
+SERVER_HOST = os.environ.get('SERVER_HOST', '0.0.0.0')
+SERVER_PORT = int(os.environ.get('SERVER_PORT', '8001'))
+# Worker processes; 0 starts one per available CPU
+SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', '0'))
+# Pending connections the kernel queues per listening socket
+SERVER_BACKLOG = int(os.environ.get('SERVER_BACKLOG', '2048'))
+# Keep idle connections open longer than the load balancer does (60s on most),
+# so it never reuses a connection the server is closing
+SERVER_KEEPALIVE_SECONDS = int(os.environ.get('SERVER_KEEPALIVE_SECONDS', '75'))
+SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', '30'))
+FORWARDED_ALLOW_IPS = os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1')
+# A worker that exits within SERVER_MIN_UPTIME seconds of starting failed to boot;
+# it is restarted after a delay doubling from SERVER_RESPAWN_BACKOFF up to
+# SERVER_RESPAWN_BACKOFF_MAX, and SERVER_MAX_BOOT_FAILURES in a row stop the server
+SERVER_MIN_UPTIME = float(os.environ.get('SERVER_MIN_UPTIME', '10'))
+SERVER_RESPAWN_BACKOFF = float(os.environ.get('SERVER_RESPAWN_BACKOFF', '0.5'))
+SERVER_RESPAWN_BACKOFF_MAX = float(os.environ.get('SERVER_RESPAWN_BACKOFF_MAX', '30'))
+SERVER_MAX_BOOT_FAILURES = int(os.environ.get('SERVER_MAX_BOOT_FAILURES', '5'))
+
+APP = "server:app"
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, honouring affinity and a cgroup v2 CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def event_loop() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def reuse_port_supported() -> bool:
+    return hasattr(socket, "SO_REUSEPORT")
+
+
+def server_options(args) -> Dict:
+    """uvicorn.Config keyword arguments for the parsed command line"""
+    return {
+        "app": APP,
+        "host": args.host,
+        "port": args.port,
+        "loop": event_loop(),
+        "http": http_protocol(),
+        "backlog": args.backlog,
+        "timeout_keep_alive": args.keep_alive,
+        "timeout_graceful_shutdown": args.graceful_timeout,
+        "proxy_headers": True,
+        "forwarded_allow_ips": FORWARDED_ALLOW_IPS,
+        "lifespan": args.lifespan,
+    }
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """A listening socket that other workers can bind to the same address"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+def run_worker(options: Dict) -> None:
+    """Serve on this worker's own SO_REUSEPORT socket until signalled"""
+    import uvicorn
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    config = uvicorn.Config(**options)
+    sock = bind_socket(config.host, config.port, config.backlog)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Supervisor:
+    """Starts the workers, replaces ones that die, and drains them on exit"""
+
+    def __init__(self, options: Dict, workers: int, clock: Callable[[], float] = time.monotonic):
+        self.options = options
+        self.workers = workers
+        self.clock = clock
+        self.processes: List[multiprocessing.Process] = []
+        self.started_at: List[float] = []
+        # Per worker slot: boot failures in a row, and when to start the next attempt
+        self.boot_failures: List[int] = []
+        self.respawn_at: List[Optional[float]] = []
+        self._context = multiprocessing.get_context("spawn")
+        self._exit = threading.Event()
+        self._reload = threading.Event()
+
+    def _spawn(self) -> multiprocessing.Process:
+        process = self._context.Process(target=run_worker, args=(self.options,), name="api-worker")
+        process.start()
+        logger.info("Started worker %s", process.pid)
+        return process
+
+    def _start(self, index: int) -> None:
+        self.processes[index] = self._spawn()
+        self.started_at[index] = self.clock()
+        self.respawn_at[index] = None
+
+    def _start_all(self) -> None:
+        self.processes = [None] * self.workers
+        self.started_at = [0.0] * self.workers
+        self.boot_failures = [0] * self.workers
+        self.respawn_at = [None] * self.workers
+        for index in range(self.workers):
+            self._start(index)
+
+    def _stop(self, processes: List[multiprocessing.Process]) -> None:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()  # SIGTERM: uvicorn drains before exiting
+        for process in processes:
+            process.join(self.options["timeout_graceful_shutdown"] + 5)
+            if process.is_alive():
+                logger.warning("Worker %s did not drain in time; killing it", process.pid)
+                process.kill()
+                process.join()
+
+    def _replace_all(self) -> None:
+        # The replacement binds alongside the old worker before it is drained
+        for index, old in enumerate(list(self.processes)):
+            self._start(index)
+            self._stop([old])
+
+    def check_workers(self) -> bool:
+        """Restart dead workers, backing off while they fail to boot; False means give up"""
+        now = self.clock()
+        for index, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            if self.respawn_at[index] is None:
+                if now - self.started_at[index] < SERVER_MIN_UPTIME:
+                    self.boot_failures[index] += 1
+                else:
+                    self.boot_failures[index] = 0
+                failures = self.boot_failures[index]
+                if failures >= SERVER_MAX_BOOT_FAILURES:
+                    logger.error("Worker exited with %s %s times in a row right after starting; giving up",
+                                 process.exitcode, failures)
+                    return False
+                delay = min(SERVER_RESPAWN_BACKOFF_MAX, SERVER_RESPAWN_BACKOFF * 2 ** (failures - 1)) if failures else 0
+                logger.warning("Worker %s exited with %s; restarting it in %.1fs", process.pid, process.exitcode, delay)
+                self.respawn_at[index] = now + delay
+            if now >= self.respawn_at[index]:
+                self._start(index)
+        return True
+
+    def handle_signal(self, signum, frame) -> None:
+        if signum == signal.SIGHUP:
+            self._reload.set()
+        else:
+            self._exit.set()
+
+    def run(self) -> int:
+        """Supervise until signalled; returns the process exit status"""
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+            signal.signal(signum, self.handle_signal)
+        self._start_all()
+        status = 0
+        while not self._exit.wait(0.5):
+            if self._reload.is_set():
+                self._reload.clear()
+                logger.info("Reloading workers")
+                self._replace_all()
+            if not self.check_workers():
+                status = 1
+                break
+        logger.info("Draining %s workers", len(self.processes))
+        self._stop(self.processes)
+        return status
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the API with production server settings")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS or available_cpus())
+    parser.add_argument("--backlog", type=int, default=SERVER_BACKLOG)
+    parser.add_argument("--keep-alive", type=int, default=SERVER_KEEPALIVE_SECONDS)
+    parser.add_argument("--graceful-timeout", type=int, default=SERVER_GRACEFUL_TIMEOUT)
+    # "off" skips the app startup (database, background jobs); only useful for benchmarks
+    parser.add_argument("--lifespan", choices=["auto", "on", "off"], default="auto")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    options = server_options(args)
+    logger.info(
+        "Serving %s on %s:%s with %s workers (loop=%s, http=%s)",
+        APP, args.host, args.port, args.workers, options['loop'], options['http']
+    )
+    if args.workers > 1 and reuse_port_supported():
+        sys.exit(Supervisor(options, args.workers).run())
+    else:
+        import uvicorn
+
+        # One process, or no SO_REUSEPORT: uvicorn shares a single socket between workers
+        sys.path.insert(0, str(BACKEND_DIR))
+        uvicorn.run(**options, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
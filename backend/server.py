@@ -1,34 +1,85 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, Query
 from dotenv import load_dotenv
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
 import os
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError
+from pymongo import DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import OperationFailure
+from typing import List, Optional, Dict, Any, Awaitable, Callable
 import uuid
+import hashlib
+import secrets
 from datetime import datetime, timezone, timedelta
 import bcrypt
 import jwt
-import httpx
 import random
 
-from emergentintegrations.payments.stripe.checkout import (
-    StripeCheckout, CheckoutSessionResponse, CheckoutStatusResponse, CheckoutSessionRequest
-)
+import archive
+import changelog
+import counters
+import database
+import export
+import loop_monitor
+import outbound
+import profiler
+import provisioning
+import reminders
+import structured_logging
+from batch import BATCH_MAX_REQUESTS, is_batchable, run_batch
+from compression import PrecompressedBody
+from invalidation import InvalidationBus, VersionedCache
+from loader import RequestLoader
+from singleflight import SingleFlight
+from reconciler import PaymentReconciler
+from revocation import RevocationList
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection - created in the app lifespan, not at import time.
+# Pool sizes, timeouts and read preferences come from MONGO_* settings (see database.py).
+client: Optional[AsyncIOMotorClient] = None
+db = None
+# Same database, but reads of baseline_actions, verses and trigger_cards may go to secondaries
+content_db = None
+pool_monitor = database.PoolMonitor()
+client_options = database.client_options(pool_monitor)
+if profiler.PROFILE_SAMPLE_RATE > 0:
+    client_options["event_listeners"].append(profiler.MongoCommandProfiler())
+
+def connect_db():
+    """Create the Motor client on first use and return the database handle"""
+    global client, db, content_db
+    if client is None:
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'], **client_options)
+        db = client[os.environ['DB_NAME']]
+        content_db = client.get_database(
+            os.environ['DB_NAME'],
+            read_preference=database.content_read_preference()
+        )
+    return db
+
+def close_db():
+    global client, db, content_db
+    if client is not None:
+        client.close()
+    client = None
+    db = None
+    content_db = None
 
 # JWT Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'blessed-belly-secret-key-2024')
 JWT_ALGORITHM = "HS256"
+# Access tokens carry role and entitlement claims, so they are kept short-lived;
+# clients renew them through /auth/refresh with a rotating refresh token
+ACCESS_TOKEN_TTL = timedelta(minutes=int(os.environ.get('ACCESS_TOKEN_TTL_MINUTES', '15')))
+REFRESH_TOKEN_TTL = timedelta(days=int(os.environ.get('REFRESH_TOKEN_TTL_DAYS', '30')))
 
 # Stripe Configuration
 STRIPE_API_KEY = os.environ.get('STRIPE_API_KEY')
@@ -40,13 +91,21 @@ ADMIN_EMAILS = os.environ.get('ADMIN_EMAILS', 'admin@blessedbelly.com').split(',
 # Subscription price
 BETA_PRICE = 9.00  # $9/month
 
-# Create the main app
-app = FastAPI(title="Blessed Belly API")
+# A pending checkout session for the same user, plan and origin is handed out
+# again instead of creating a new one if it is younger than this
+CHECKOUT_REUSE_WINDOW = timedelta(minutes=int(os.environ.get('CHECKOUT_REUSE_MINUTES', '30')))
+
+# Pending payments older than PAYMENT_RECONCILE_AFTER_MINUTES are checked against
+# Stripe in the background every PAYMENT_RECONCILE_INTERVAL_SECONDS (0 disables)
+PAYMENT_RECONCILE_INTERVAL = float(os.environ.get('PAYMENT_RECONCILE_INTERVAL_SECONDS', '300'))
+PAYMENT_RECONCILE_AFTER = timedelta(minutes=int(os.environ.get('PAYMENT_RECONCILE_AFTER_MINUTES', '30')))
+# Base URL Stripe webhooks point at when there is no incoming request to take it from
+PUBLIC_BASE_URL = os.environ.get('PUBLIC_BASE_URL', '')
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
-# Configure logging
+# Plain logging until startup switches to the queued JSON pipeline (structured_logging.py)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -75,8 +134,13 @@ class UserResponse(BaseModel):
 
 class TokenResponse(BaseModel):
     token: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
     user: UserResponse
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class CheckInRequest(BaseModel):
     signal: str  # stressed, low_energy, cravings, digestion, normal
 
@@ -119,32 +183,235 @@ class VerseCreate(BaseModel):
     verse_ref: str
     category: str  # B, A, S, E, general
 
+class BASElineActionPatch(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    base_category: Optional[str] = None
+    action_text: Optional[str] = None
+    movement_text: Optional[str] = None
+
+class TriggerCardPatch(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    trigger_type: Optional[str] = None
+    title: Optional[str] = None
+    immediate_action: Optional[str] = None
+    explanation: Optional[str] = None
+    body_truth: Optional[str] = None
+    verse: Optional[str] = None
+    verse_ref: Optional[str] = None
+
+class VersePatch(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    verse_text: Optional[str] = None
+    verse_ref: Optional[str] = None
+    category: Optional[str] = None
+
+class ContentOperation(BaseModel):
+    op: str  # create, update, delete
+    collection: str  # baseline_actions, trigger_cards, verses
+    id: Optional[str] = None  # required for update and delete
+    fields: Dict[str, Any] = {}
+
+class ContentBatchRequest(BaseModel):
+    operations: List[ContentOperation]
+
 class CheckoutRequest(BaseModel):
     origin_url: str
 
+class ArchiveRequest(BaseModel):
+    collection: str  # daily_checkins, payment_transactions
+    older_than_days: int = 365
+
+class BatchItem(BaseModel):
+    method: str = "GET"
+    path: str
+    body: Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
+
+# ============== CACHES ==============
+
+# Content and user documents are cached per worker. Writers publish the key on
+# the invalidation bus so every other worker drops its copy (see invalidation.py).
+# Content may be read from a lagging secondary right after a write, so its
+# entries also expire on their own.
+content_cache = VersionedCache(max_entries=64, ttl_seconds=60)
+user_cache = VersionedCache(max_entries=10000, ttl_seconds=300)
+# Serialized, precompressed catalog bodies keyed like content_cache, so the same
+# invalidation drops both. Each entry maps a rendering name to its body.
+response_cache = VersionedCache(max_entries=64, ttl_seconds=60)
+invalidation_bus = InvalidationBus([content_cache, user_cache, response_cache])
+
+def content_key(collection: str) -> str:
+    return f"content:{collection}"
+
+def user_key(user_id: str) -> str:
+    return f"user:{user_id}"
+
+def entitlement_key(user_id: str) -> str:
+    return f"entitlement:{user_id}"
+
+async def get_content(collection: str) -> List[Dict]:
+    """All documents of a content collection, served from the worker cache"""
+    key = content_key(collection)
+    docs = content_cache.get(key)
+    if docs is None:
+        version = invalidation_bus.version(key)
+        docs = await content_db[collection].find({}, {"_id": 0}).to_list(1000)
+        content_cache.set(key, docs, version)
+    return docs
+
+async def content_response(request: Request, collection: str, name: str, render=None) -> Response:
+    """Serve a content collection as JSON, serialized and compressed once per content version"""
+    key = content_key(collection)
+    bodies = response_cache.get(key)
+    if bodies is None:
+        bodies = {}
+        response_cache.set(key, bodies, invalidation_bus.version(key))
+    body = bodies.get(name)
+    if body is None:
+        docs = await get_content(collection)
+        body = await PrecompressedBody.build(render(docs) if render else docs)
+        bodies[name] = body
+    return body.response(request.headers.get("accept-encoding", ""))
+
+# Profile fields read with a user; never the password hash
+USER_FIELDS = ("email", "name", "picture", "role", "created_at")
+
+async def get_user_by_id(loader: RequestLoader, user_id: str) -> Optional[Dict]:
+    """Look up a user by id, served from the worker cache or else through the request's loader"""
+    key = user_key(user_id)
+    user = user_cache.get(key)
+    if user is None:
+        version = invalidation_bus.version(key)
+        user = await loader.load("users", "user_id", user_id, USER_FIELDS)
+        if user:
+            user_cache.set(key, user, version)
+    return user
+
+# ============== REQUEST LOADER ==============
+
+def get_loader(request: Request) -> RequestLoader:
+    """The request's loader; handlers take it via Depends, helpers via the request"""
+    loader = getattr(request.state, "loader", None)
+    if loader is None:
+        loader = request.state.loader = RequestLoader(db)
+    return loader
+
+def load_active_subscription(loader: RequestLoader, user_id: str):
+    """Active subscription of a user, projected to what user responses need"""
+    return loader.load("subscriptions", "user_id", user_id, ("status",), where={"status": "active"})
+
 # ============== AUTH HELPERS ==============
 
+# Access tokens revoked before they expire (logout); see revocation.py
+revocations = RevocationList()
+
 def hash_password(password: str) -> str:
     return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
 
 def verify_password(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode(), hashed.encode())
 
-def create_jwt_token(user_id: str) -> str:
+def create_jwt_token(
+    user_id: str,
+    role: str = "user",
+    email: Optional[str] = None,
+    subscription_status: Optional[str] = None,
+    entitlement_version: int = 0
+) -> str:
+    """Create a short-lived access token carrying role and entitlement claims"""
     payload = {
         "user_id": user_id,
-        "exp": datetime.now(timezone.utc) + timedelta(days=7)
+        "email": email,
+        "role": role,
+        "subscription_status": subscription_status,
+        "ent_v": entitlement_version,
+        "jti": uuid.uuid4().hex,
+        "iat": datetime.now(timezone.utc),
+        "exp": datetime.now(timezone.utc) + ACCESS_TOKEN_TTL
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+def decode_jwt_token(token: str) -> Dict:
+    """Decode and verify a JWT, raising jwt.InvalidTokenError on failure"""
+    return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+
+def user_from_claims(payload: Dict) -> Dict:
+    """Build the authenticated user from access token claims, without a DB read"""
+    return {
+        "user_id": payload["user_id"],
+        "email": payload.get("email"),
+        "role": payload.get("role", "user"),
+        "has_subscription": payload.get("subscription_status") == "active",
+        "subscription_status": payload.get("subscription_status"),
+        "token_claims": True
+    }
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+async def create_refresh_token(user_id: str, family_id: Optional[str] = None) -> str:
+    """Store a new single-use refresh token; rotations of one login share a family"""
+    token = secrets.token_urlsafe(32)
+    now = datetime.now(timezone.utc)
+    await db.refresh_tokens.insert_one({
+        "token_hash": hash_refresh_token(token),
+        "user_id": user_id,
+        "family_id": family_id or uuid.uuid4().hex,
+        "used_at": None,
+        "expires_at": now + REFRESH_TOKEN_TTL,  # BSON date so the TTL index can expire it
+        "created_at": now.isoformat()
+    })
+    return token
+
+async def issue_tokens(user: Dict, subscription: Optional[Dict], family_id: Optional[str] = None) -> Dict:
+    """Issue an access token with current entitlement claims plus a refresh token"""
+    entitlement_version = await invalidation_bus.fetch_version(entitlement_key(user["user_id"]))
+    token = create_jwt_token(
+        user["user_id"],
+        role=user.get("role", "user"),
+        email=user.get("email"),
+        subscription_status=subscription.get("status") if subscription else None,
+        entitlement_version=entitlement_version
+    )
+    return {
+        "token": token,
+        "refresh_token": await create_refresh_token(user["user_id"], family_id),
+        "expires_in": int(ACCESS_TOKEN_TTL.total_seconds())
+    }
+
+async def entitlement_changed(user_id: str) -> None:
+    """Stop trusting claims of access tokens issued before a subscription change"""
+    await invalidation_bus.publish(entitlement_key(user_id))
+
+def user_response(user: Dict, subscription: Optional[Dict]) -> UserResponse:
+    return UserResponse(
+        user_id=user["user_id"],
+        email=user["email"],
+        name=user["name"],
+        picture=user.get("picture"),
+        role=user.get("role", "user"),
+        has_subscription=bool(subscription),
+        subscription_status=subscription.get("status") if subscription else None
+    )
+
 async def get_current_user(request: Request) -> Optional[Dict]:
-    """Get current user from JWT token or session cookie"""
+    """Get current user from JWT token or session cookie, once per request"""
+    user = getattr(request.state, "user", None)
+    if user is None:
+        user = await authenticate(request)
+        if user:
+            request.state.user = user
+    return user
+
+async def authenticate(request: Request) -> Optional[Dict]:
     # Try session token from cookie first (Google OAuth)
     session_token = request.cookies.get("session_token")
     if session_token:
         session = await db.user_sessions.find_one(
             {"session_token": session_token},
-            {"_id": 0}
+            {"_id": 0, "user_id": 1, "expires_at": 1}
         )
         if session:
             expires_at = session.get("expires_at")
@@ -153,10 +420,7 @@ async def get_current_user(request: Request) -> Optional[Dict]:
             if expires_at.tzinfo is None:
                 expires_at = expires_at.replace(tzinfo=timezone.utc)
             if expires_at > datetime.now(timezone.utc):
-                user = await db.users.find_one(
-                    {"user_id": session["user_id"]},
-                    {"_id": 0}
-                )
+                user = await get_user_by_id(get_loader(request), session["user_id"])
                 if user:
                     return user
     
@@ -165,11 +429,17 @@ async def get_current_user(request: Request) -> Optional[Dict]:
     if auth_header and auth_header.startswith("Bearer "):
         token = auth_header.split(" ")[1]
         try:
-            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-            user = await db.users.find_one(
-                {"user_id": payload["user_id"]},
-                {"_id": 0}
-            )
+            payload = decode_jwt_token(token)
+            # Only probable matches in the revocation filter cost a DB read
+            if "jti" in payload and await revocations.is_revoked(payload["jti"]):
+                return None
+            if "role" in payload and await invalidation_bus.is_current(
+                entitlement_key(payload["user_id"]), payload.get("ent_v", 0), payload.get("iat")
+            ):
+                return user_from_claims(payload)
+            # Legacy token carrying only user_id, or claims older than the user's
+            # last entitlement change: the database decides until the client refreshes
+            user = await get_user_by_id(get_loader(request), payload["user_id"])
             if user:
                 return user
         except jwt.ExpiredSignatureError:
@@ -190,11 +460,12 @@ async def require_subscription(request: Request) -> Dict:
     """Require authenticated user with active subscription"""
     user = await require_auth(request)
     
-    # Check subscription status
-    subscription = await db.subscriptions.find_one(
-        {"user_id": user["user_id"], "status": "active"},
-        {"_id": 0}
-    )
+    # Access tokens carry the entitlement as a signed claim
+    if user.get("has_subscription"):
+        return user
+    
+    # Check subscription status; it may have started after the token was issued
+    subscription = await load_active_subscription(get_loader(request), user["user_id"])
     
     if not subscription:
         raise HTTPException(status_code=403, detail="Active subscription required")
@@ -208,6 +479,79 @@ async def require_admin(request: Request) -> Dict:
         raise HTTPException(status_code=403, detail="Admin access required")
     return user
 
+# ============== INTEGRATIONS ==============
+
+# The Stripe integration and httpx are slow to import and only needed by a
+# handful of endpoints, so they are imported on first use rather than at boot.
+
+# Calls to each upstream run under their own timeout, retry, concurrency and circuit
+# breaker policy (see outbound.py); OUTBOUND_<NAME>_<FIELD> overrides any field
+google_auth = outbound.Dependency("google_auth", outbound.policy_from_env(
+    "google_auth", timeout=5.0, deadline=8.0, retries=2, max_concurrency=50
+))
+stripe_api = outbound.Dependency("stripe", outbound.policy_from_env(
+    "stripe", timeout=10.0, deadline=20.0, retries=2, max_concurrency=20
+))
+
+async def dependency_unavailable(request: Request, exc: outbound.DependencyUnavailable):
+    """Answer 503 when an upstream is down, slow or saturated instead of waiting on it"""
+    headers = {"Retry-After": str(int(exc.retry_after) + 1)} if exc.retry_after else None
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"{exc.name} is temporarily unavailable"},
+        headers=headers
+    )
+
+# Stripe SDK errors (stripe.error.*) that mean Stripe rather than the request failed.
+# Matched by name and HTTP status because the SDK only loads with the integration.
+STRIPE_UPSTREAM_ERRORS = {"APIConnectionError", "APIError", "RateLimitError"}
+
+def is_stripe_upstream_error(error: Exception) -> bool:
+    status = getattr(error, "http_status", None)
+    if isinstance(status, int) and (status >= 500 or status == 429):
+        return True
+    return any(cls.__name__ in STRIPE_UPSTREAM_ERRORS for cls in type(error).__mro__)
+
+async def call_stripe(fn: Callable[[], Awaitable[Any]], retries: Optional[int] = None) -> Any:
+    """Run a StripeCheckout call under stripe_api, counting Stripe outages as upstream failures"""
+    async def attempt():
+        try:
+            # The integration's coroutines make blocking SDK requests, so each
+            # runs on its own loop in a thread instead of stalling this one
+            return await asyncio.to_thread(asyncio.run, fn())
+        except Exception as e:
+            if is_stripe_upstream_error(e):
+                raise outbound.UpstreamError(f"{type(e).__name__}: {e}") from e
+            raise
+    return await stripe_api.call(attempt, retries=retries)
+
+def stripe_checkout_module():
+    from emergentintegrations.payments.stripe import checkout
+    return checkout
+
+def get_stripe_checkout(base_url: str, webhook_secret: Optional[str] = None):
+    """Build a StripeCheckout client whose webhook URL points back at base_url"""
+    checkout = stripe_checkout_module()
+    host_url = base_url.rstrip('/')
+    webhook_url = f"{host_url}/api/webhook/stripe"
+    kwargs = {"api_key": STRIPE_API_KEY, "webhook_url": webhook_url}
+    if webhook_secret:
+        kwargs["webhook_secret"] = webhook_secret
+    return checkout.StripeCheckout(**kwargs)
+
+def subscription_activation(user_id: str, plan: str = "beta_monthly") -> Dict:
+    """Fields set on a user's subscription when a payment succeeds"""
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "subscription_id": f"sub_{uuid.uuid4().hex[:12]}",
+        "user_id": user_id,
+        "plan": plan,
+        "status": "active",
+        "amount": BETA_PRICE,
+        "started_at": now,
+        "updated_at": now
+    }
+
 # ============== HELPER FUNCTIONS ==============
 
 def get_base_category(signal: str) -> str:
@@ -231,12 +575,36 @@ def get_base_name(category: str) -> str:
     }
     return names.get(category, "Become Balanced")
 
+def build_checkin_response(checkin: Dict, action: Dict, verse: Dict) -> Dict:
+    """Build today's check-in payload from the stored check-in, action and verse"""
+    return {
+        "has_checkin": True,
+        "check_in_id": checkin["check_in_id"],
+        "date": checkin["date"],
+        "signal": checkin["signal"],
+        "base_category": checkin["base_category"],
+        "action": {
+            "text": action.get("action_text", ""),
+            "why_it_helps": action.get("why_it_helps", ""),
+            "examples": action.get("examples", ""),
+            "base_name": get_base_name(checkin["base_category"]),
+            "base_letter": checkin["base_category"]
+        },
+        "movement": {
+            "text": action.get("movement_text", "")
+        },
+        "verse": {
+            "text": verse.get("verse_text", ""),
+            "reference": verse.get("verse_ref", "")
+        }
+    }
+
 # ============== AUTH ENDPOINTS ==============
 
 @api_router.post("/auth/register", response_model=TokenResponse)
 async def register(user_data: UserCreate):
     """Register a new user with email/password"""
-    existing = await db.users.find_one({"email": user_data.email}, {"_id": 0})
+    existing = await db.users.find_one({"email": user_data.email}, {"_id": 0, "user_id": 1})
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -254,31 +622,21 @@ async def register(user_data: UserCreate):
     }
     
     await db.users.insert_one(user_doc)
+    await counters.increment(db, "users")
     
-    token = create_jwt_token(user_id)
+    # A brand-new user id cannot have a subscription yet
+    subscription = None
     
-    # Check subscription
-    subscription = await db.subscriptions.find_one(
-        {"user_id": user_id, "status": "active"},
-        {"_id": 0}
-    )
-    
-    return TokenResponse(
-        token=token,
-        user=UserResponse(
-            user_id=user_id,
-            email=user_data.email,
-            name=user_data.name,
-            role=role,
-            has_subscription=bool(subscription),
-            subscription_status=subscription.get("status") if subscription else None
-        )
-    )
+    tokens = await issue_tokens(user_doc, subscription)
+    return TokenResponse(**tokens, user=user_response(user_doc, subscription))
 
 @api_router.post("/auth/login", response_model=TokenResponse)
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, loader: RequestLoader = Depends(get_loader)):
     """Login with email/password"""
-    user = await db.users.find_one({"email": credentials.email}, {"_id": 0})
+    user = await db.users.find_one(
+        {"email": credentials.email},
+        {"_id": 0, "user_id": 1, "email": 1, "name": 1, "picture": 1, "role": 1, "password_hash": 1}
+    )
     
     if not user or not user.get("password_hash"):
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -286,26 +644,38 @@ async def login(credentials: UserLogin):
     if not verify_password(credentials.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    token = create_jwt_token(user["user_id"])
-    
     # Check subscription
-    subscription = await db.subscriptions.find_one(
-        {"user_id": user["user_id"], "status": "active"},
-        {"_id": 0}
+    subscription = await load_active_subscription(loader, user["user_id"])
+    
+    tokens = await issue_tokens(user, subscription)
+    return TokenResponse(**tokens, user=user_response(user, subscription))
+
+@api_router.post("/auth/refresh", response_model=TokenResponse)
+async def refresh(body: RefreshRequest, loader: RequestLoader = Depends(get_loader)):
+    """Rotate a refresh token and issue an access token with current claims"""
+    token_hash = hash_refresh_token(body.refresh_token)
+    now = datetime.now(timezone.utc)
+    record = await db.refresh_tokens.find_one_and_update(
+        {"token_hash": token_hash, "used_at": None, "expires_at": {"$gt": now}},
+        {"$set": {"used_at": now}},
+        projection={"_id": 0}
     )
     
-    return TokenResponse(
-        token=token,
-        user=UserResponse(
-            user_id=user["user_id"],
-            email=user["email"],
-            name=user["name"],
-            picture=user.get("picture"),
-            role=user.get("role", "user"),
-            has_subscription=bool(subscription),
-            subscription_status=subscription.get("status") if subscription else None
-        )
-    )
+    if not record:
+        # A rotated token presented again has leaked; revoke the whole login
+        reused = await db.refresh_tokens.find_one({"token_hash": token_hash}, {"_id": 0, "family_id": 1})
+        if reused:
+            await db.refresh_tokens.delete_many({"family_id": reused["family_id"]})
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    
+    user = await get_user_by_id(loader, record["user_id"])
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    
+    subscription = await load_active_subscription(loader, user["user_id"])
+    
+    tokens = await issue_tokens(user, subscription, family_id=record["family_id"])
+    return TokenResponse(**tokens, user=user_response(user, subscription))
 
 @api_router.post("/auth/google/session")
 async def google_session(request: Request, response: Response):
@@ -316,13 +686,21 @@ async def google_session(request: Request, response: Response):
     if not session_id:
         raise HTTPException(status_code=400, detail="session_id required")
     
+    import httpx
+    
     # Call Emergent Auth to get user data
     # REMINDER: DO NOT HARDCODE THE URL, OR ADD ANY FALLBACKS OR REDIRECT URLS, THIS BREAKS THE AUTH
-    async with httpx.AsyncClient() as client:
-        auth_response = await client.get(
-            "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-            headers={"X-Session-ID": session_id}
-        )
+    async def fetch_session_data():
+        async with httpx.AsyncClient(timeout=google_auth.policy.timeout) as client:
+            auth_response = await client.get(
+                "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
+                headers={"X-Session-ID": session_id}
+            )
+        if auth_response.status_code >= 500:
+            raise outbound.UpstreamError(f"HTTP {auth_response.status_code}")
+        return auth_response
+    
+    auth_response = await google_auth.call(fetch_session_data, retry_on=(httpx.TransportError,))
     
     if auth_response.status_code != 200:
         raise HTTPException(status_code=401, detail="Invalid session")
@@ -334,7 +712,7 @@ async def google_session(request: Request, response: Response):
     session_token = auth_data["session_token"]
     
     # Find or create user
-    user = await db.users.find_one({"email": email}, {"_id": 0})
+    user = await db.users.find_one({"email": email}, {"_id": 0, "user_id": 1, "role": 1})
     
     if user:
         user_id = user["user_id"]
@@ -343,6 +721,7 @@ async def google_session(request: Request, response: Response):
             {"user_id": user_id},
             {"$set": {"name": name, "picture": picture}}
         )
+        await invalidation_bus.publish(user_key(user_id))
     else:
         user_id = f"user_{uuid.uuid4().hex[:12]}"
         role = "admin" if email in ADMIN_EMAILS else "user"
@@ -356,6 +735,7 @@ async def google_session(request: Request, response: Response):
             "created_at": datetime.now(timezone.utc).isoformat()
         }
         await db.users.insert_one(user_doc)
+        await counters.increment(db, "users")
         user = user_doc
     
     # Store session
@@ -379,10 +759,7 @@ async def google_session(request: Request, response: Response):
     )
     
     # Check subscription
-    subscription = await db.subscriptions.find_one(
-        {"user_id": user_id, "status": "active"},
-        {"_id": 0}
-    )
+    subscription = await load_active_subscription(get_loader(request), user_id)
     
     return {
         "user": {
@@ -397,27 +774,19 @@ async def google_session(request: Request, response: Response):
     }
 
 @api_router.get("/auth/me", response_model=UserResponse)
-async def get_me(request: Request):
+async def get_me(request: Request, loader: RequestLoader = Depends(get_loader)):
     """Get current authenticated user"""
     user = await get_current_user(request)
+    if user and user.get("token_claims"):
+        # Claims don't carry the profile fields
+        user = await get_user_by_id(loader, user["user_id"])
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     # Check subscription
-    subscription = await db.subscriptions.find_one(
-        {"user_id": user["user_id"], "status": "active"},
-        {"_id": 0}
-    )
+    subscription = await load_active_subscription(loader, user["user_id"])
     
-    return UserResponse(
-        user_id=user["user_id"],
-        email=user["email"],
-        name=user["name"],
-        picture=user.get("picture"),
-        role=user.get("role", "user"),
-        has_subscription=bool(subscription),
-        subscription_status=subscription.get("status") if subscription else None
-    )
+    return user_response(user, subscription)
 
 @api_router.post("/auth/logout")
 async def logout(request: Request, response: Response):
@@ -426,27 +795,77 @@ async def logout(request: Request, response: Response):
     if session_token:
         await db.user_sessions.delete_one({"session_token": session_token})
     
+    # Revoke the access token itself for the rest of its lifetime
+    auth_header = request.headers.get("Authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        try:
+            payload = decode_jwt_token(auth_header.split(" ")[1])
+        except jwt.InvalidTokenError:
+            payload = {}
+        if "jti" in payload:
+            expires_at = datetime.fromtimestamp(payload["exp"], timezone.utc)
+            await revocations.revoke(payload["jti"], payload["user_id"], expires_at)
+    
+    # Revoke the refresh token's whole rotation family, if one was sent
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    refresh_token = body.get("refresh_token") if isinstance(body, dict) else None
+    if refresh_token:
+        record = await db.refresh_tokens.find_one(
+            {"token_hash": hash_refresh_token(refresh_token)},
+            {"_id": 0, "family_id": 1}
+        )
+        if record:
+            await db.refresh_tokens.delete_many({"family_id": record["family_id"]})
+    
     response.delete_cookie(key="session_token", path="/")
     return {"message": "Logged out successfully"}
 
 # ============== SUBSCRIPTION ENDPOINTS ==============
 
+# Concurrent create calls from one user (double-clicks, retries) share one Stripe call
+checkout_flights = SingleFlight()
+
 @api_router.post("/checkout/session")
 async def create_checkout_session(checkout_req: CheckoutRequest, request: Request):
     """Create Stripe checkout session for subscription"""
     user = await require_auth(request)
+    plan = "beta_monthly"
+    
+    return await checkout_flights.do(
+        (user["user_id"], plan, checkout_req.origin_url),
+        lambda: get_or_create_checkout_session(user, plan, checkout_req.origin_url, request)
+    )
+
+async def get_or_create_checkout_session(user: Dict, plan: str, origin_url: str, request: Request) -> Dict:
+    """Reuse a recent pending session for this user, plan and origin, or create one"""
+    cutoff = datetime.now(timezone.utc) - CHECKOUT_REUSE_WINDOW
+    pending = await db.payment_transactions.find_one(
+        {
+            "user_id": user["user_id"],
+            "plan": plan,
+            "origin_url": origin_url,
+            "payment_status": "pending",
+            "url": {"$exists": True},
+            "created_at": {"$gte": cutoff.isoformat()}
+        },
+        {"_id": 0, "session_id": 1, "url": 1},
+        sort=[("created_at", -1)]
+    )
+    if pending:
+        return {"url": pending["url"], "session_id": pending["session_id"]}
     
     # Build URLs from provided origin
-    success_url = f"{checkout_req.origin_url}/payment/success?session_id={{CHECKOUT_SESSION_ID}}"
-    cancel_url = f"{checkout_req.origin_url}/pricing"
+    success_url = f"{origin_url}/payment/success?session_id={{CHECKOUT_SESSION_ID}}"
+    cancel_url = f"{origin_url}/pricing"
     
     # Initialize Stripe
-    host_url = str(request.base_url).rstrip('/')
-    webhook_url = f"{host_url}/api/webhook/stripe"
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+    stripe_checkout = get_stripe_checkout(str(request.base_url))
     
     # Create checkout session
-    checkout_request = CheckoutSessionRequest(
+    checkout_request = stripe_checkout_module().CheckoutSessionRequest(
         amount=BETA_PRICE,
         currency="usd",
         success_url=success_url,
@@ -454,21 +873,24 @@ async def create_checkout_session(checkout_req: CheckoutRequest, request: Reques
         metadata={
             "user_id": user["user_id"],
             "user_email": user["email"],
-            "plan": "beta_monthly"
+            "plan": plan
         }
     )
     
-    session = await stripe_checkout.create_checkout_session(checkout_request)
+    # Not retried: a repeated request could open a second checkout session
+    session = await call_stripe(lambda: stripe_checkout.create_checkout_session(checkout_request), retries=0)
     
     # Create payment transaction record
     await db.payment_transactions.insert_one({
         "transaction_id": f"txn_{uuid.uuid4().hex[:12]}",
         "session_id": session.session_id,
+        "url": session.url,
+        "origin_url": origin_url,
         "user_id": user["user_id"],
         "email": user["email"],
         "amount": BETA_PRICE,
         "currency": "usd",
-        "plan": "beta_monthly",
+        "plan": plan,
         "payment_status": "pending",
         "created_at": datetime.now(timezone.utc).isoformat()
     })
@@ -481,12 +903,10 @@ async def get_checkout_status(session_id: str, request: Request):
     user = await require_auth(request)
     
     # Initialize Stripe
-    host_url = str(request.base_url).rstrip('/')
-    webhook_url = f"{host_url}/api/webhook/stripe"
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+    stripe_checkout = get_stripe_checkout(str(request.base_url))
     
     # Get status from Stripe
-    status = await stripe_checkout.get_checkout_status(session_id)
+    status = await call_stripe(lambda: stripe_checkout.get_checkout_status(session_id))
     
     # Update transaction
     transaction = await db.payment_transactions.find_one(
@@ -506,19 +926,14 @@ async def get_checkout_status(session_id: str, request: Request):
         )
         
         # Create or update subscription
-        await db.subscriptions.update_one(
+        result = await db.subscriptions.update_one(
             {"user_id": user["user_id"]},
-            {"$set": {
-                "subscription_id": f"sub_{uuid.uuid4().hex[:12]}",
-                "user_id": user["user_id"],
-                "plan": "beta_monthly",
-                "status": "active",
-                "amount": BETA_PRICE,
-                "started_at": datetime.now(timezone.utc).isoformat(),
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }},
+            {"$set": subscription_activation(user["user_id"])},
             upsert=True
         )
+        if result.upserted_id is not None:
+            await counters.increment(db, "subscriptions")
+        await entitlement_changed(user["user_id"])
     
     return {
         "status": status.status,
@@ -533,13 +948,7 @@ async def stripe_webhook(request: Request):
     body = await request.body()
     signature = request.headers.get("Stripe-Signature")
     
-    host_url = str(request.base_url).rstrip('/')
-    webhook_url = f"{host_url}/api/webhook/stripe"
-    stripe_checkout = StripeCheckout(
-        api_key=STRIPE_API_KEY, 
-        webhook_url=webhook_url,
-        webhook_secret=STRIPE_WEBHOOK_SECRET
-    )
+    stripe_checkout = get_stripe_checkout(str(request.base_url), webhook_secret=STRIPE_WEBHOOK_SECRET)
     
     try:
         webhook_response = await stripe_checkout.handle_webhook(body, signature)
@@ -547,27 +956,32 @@ async def stripe_webhook(request: Request):
         if webhook_response.payment_status == "paid":
             user_id = webhook_response.metadata.get("user_id")
             user_email = webhook_response.metadata.get("user_email")
-            logger.info(f"Payment successful for user: {user_id} ({user_email})")
+            logger.info("Payment successful for user: %s (%s)", user_id, user_email, extra={"user_id": user_id})
             
-            if user_id:
-                await db.subscriptions.update_one(
+            # Mark the transaction paid so the reconciler leaves it alone; if a status
+            # poll or the reconciler got there first, it also activated the subscription
+            moved = await db.payment_transactions.update_one(
+                {"session_id": webhook_response.session_id, "payment_status": {"$ne": "paid"}},
+                {"$set": {"payment_status": "paid", "updated_at": datetime.now(timezone.utc).isoformat()}}
+            )
+            already_applied = not moved.matched_count and await db.payment_transactions.count_documents(
+                {"session_id": webhook_response.session_id}, limit=1
+            )
+            
+            if user_id and not already_applied:
+                result = await db.subscriptions.update_one(
                     {"user_id": user_id},
-                    {"$set": {
-                        "subscription_id": f"sub_{uuid.uuid4().hex[:12]}",
-                        "user_id": user_id,
-                        "plan": "beta_monthly",
-                        "status": "active",
-                        "amount": BETA_PRICE,
-                        "started_at": datetime.now(timezone.utc).isoformat(),
-                        "updated_at": datetime.now(timezone.utc).isoformat()
-                    }},
+                    {"$set": subscription_activation(user_id)},
                     upsert=True
                 )
-                logger.info(f"Subscription activated for user: {user_id}")
+                if result.upserted_id is not None:
+                    await counters.increment(db, "subscriptions")
+                await entitlement_changed(user_id)
+                logger.info("Subscription activated for user: %s", user_id, extra={"user_id": user_id})
         
         return {"received": True}
     except Exception as e:
-        logger.error(f"Webhook error: {e}")
+        logger.error("Webhook error: %s", e)
         return {"received": True}
 
 @api_router.get("/subscription/status")
@@ -596,7 +1010,7 @@ async def daily_checkin(checkin: CheckInRequest, request: Request):
     base_category = get_base_category(checkin.signal)
     
     # Get random action for this BASE category
-    actions = await db.baseline_actions.find(
+    actions = await content_db.baseline_actions.find(
         {"base_category": base_category},
         {"_id": 0}
     ).to_list(100)
@@ -612,7 +1026,7 @@ async def daily_checkin(checkin: CheckInRequest, request: Request):
         action = random.choice(actions)
     
     # Get random verse for this category
-    verses = await db.verses.find(
+    verses = await content_db.verses.find(
         {"category": {"$in": [base_category, "general"]}},
         {"_id": 0}
     ).to_list(100)
@@ -641,11 +1055,13 @@ async def daily_checkin(checkin: CheckInRequest, request: Request):
     }
     
     # Upsert - replace if already checked in today
-    await db.daily_checkins.update_one(
+    result = await db.daily_checkins.update_one(
         {"user_id": user["user_id"], "date": today},
         {"$set": check_in_doc},
         upsert=True
     )
+    if result.upserted_id is not None:
+        await counters.increment(db, "daily_checkins")
     
     return DailyCheckInResponse(
         check_in_id=check_in_id,
@@ -669,25 +1085,22 @@ async def daily_checkin(checkin: CheckInRequest, request: Request):
         }
     )
 
-@api_router.get("/checkin/today")
-async def get_today_checkin(request: Request):
-    """Get today's check-in if exists"""
-    user = await require_subscription(request)
-    
+async def load_today_checkin(user_id: str) -> Dict:
+    """Today's check-in for a user with its action and verse resolved"""
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
     
     checkin = await db.daily_checkins.find_one(
-        {"user_id": user["user_id"], "date": today},
+        {"user_id": user_id, "date": today},
         {"_id": 0}
     )
     
     if not checkin:
         return {"has_checkin": False}
     
-    # Get action details
-    action = await db.baseline_actions.find_one(
-        {"action_id": checkin.get("action_id")},
-        {"_id": 0}
+    # Get action and verse details
+    action, verse = await asyncio.gather(
+        content_db.baseline_actions.find_one({"action_id": checkin.get("action_id")}, {"_id": 0}),
+        content_db.verses.find_one({"verse_id": checkin.get("verse_id")}, {"_id": 0})
     )
     
     if not action:
@@ -696,66 +1109,134 @@ async def get_today_checkin(request: Request):
             "movement_text": "Take a 10-minute walk after eating"
         }
     
-    # Get verse details
-    verse = await db.verses.find_one(
-        {"verse_id": checkin.get("verse_id")},
-        {"_id": 0}
-    )
-    
     if not verse:
         verse = {
             "verse_text": "Do you not know that your bodies are temples of the Holy Spirit?",
             "verse_ref": "1 Corinthians 6:19"
         }
     
-    return {
-        "has_checkin": True,
-        "check_in_id": checkin["check_in_id"],
-        "date": checkin["date"],
-        "signal": checkin["signal"],
-        "base_category": checkin["base_category"],
-        "action": {
-            "text": action.get("action_text", ""),
-            "why_it_helps": action.get("why_it_helps", ""),
-            "examples": action.get("examples", ""),
-            "base_name": get_base_name(checkin["base_category"]),
-            "base_letter": checkin["base_category"]
-        },
-        "movement": {
-            "text": action.get("movement_text", "")
-        },
-        "verse": {
-            "text": verse.get("verse_text", ""),
-            "reference": verse.get("verse_ref", "")
-        }
-    }
+    return build_checkin_response(checkin, action, verse)
+
+@api_router.get("/checkin/today")
+async def get_today_checkin(request: Request):
+    """Get today's check-in if exists"""
+    user = await require_subscription(request)
+    return await load_today_checkin(user["user_id"])
 
 # ============== TRIGGER LIBRARY ENDPOINTS ==============
 
+def render_triggers(triggers: List[Dict]) -> List[Dict]:
+    return [TriggerCardResponse(**t).model_dump() for t in triggers[:100]]
+
 @api_router.get("/triggers", response_model=List[TriggerCardResponse])
 async def get_all_triggers(request: Request):
     """Get all trigger cards"""
     await require_subscription(request)
     
-    triggers = await db.trigger_cards.find({}, {"_id": 0}).to_list(100)
-    
-    return [TriggerCardResponse(**t) for t in triggers]
+    return await content_response(request, "trigger_cards", "triggers", render_triggers)
 
 @api_router.get("/triggers/{trigger_type}")
 async def get_trigger_by_type(trigger_type: str, request: Request):
     """Get trigger cards by type"""
     await require_subscription(request)
     
-    triggers = await db.trigger_cards.find(
-        {"trigger_type": trigger_type},
-        {"_id": 0}
-    ).to_list(10)
+    triggers = [t for t in await get_content("trigger_cards") if t.get("trigger_type") == trigger_type][:10]
     
     if not triggers:
         raise HTTPException(status_code=404, detail="No triggers found")
     
     return triggers
 
+@api_router.get("/content/changes")
+async def get_content_changes(request: Request, since: int = 0, limit: int = 500):
+    """Content upserts and deletions after sequence number `since` (0 for a full snapshot)"""
+    await require_subscription(request)
+    
+    return await changelog.changes_since(db, max(since, 0), min(max(limit, 1), 1000))
+
+# ============== BOOTSTRAP ENDPOINT ==============
+
+@api_router.get("/bootstrap")
+async def bootstrap(request: Request, loader: RequestLoader = Depends(get_loader)):
+    """Everything the member app needs on load, in one round trip"""
+    user = await require_auth(request)
+    user_id = user["user_id"]
+    
+    async def load_user():
+        # Access token claims don't carry the profile fields
+        return await get_user_by_id(loader, user_id) if user.get("token_claims") else user
+    
+    profile, subscription = await asyncio.gather(
+        load_user(),
+        load_active_subscription(loader, user_id)
+    )
+    
+    if not profile:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    # Check-in and triggers are only for subscribers; don't read them for anyone else
+    checkin = triggers = None
+    if subscription:
+        checkin, trigger_docs = await asyncio.gather(
+            load_today_checkin(user_id),
+            get_content("trigger_cards")
+        )
+        triggers = render_triggers(trigger_docs)
+    
+    return {
+        "user": user_response(profile, subscription),
+        "checkin": checkin,
+        "triggers": triggers
+    }
+
+# ============== BATCH ENDPOINT ==============
+
+@api_router.post("/batch")
+async def batch(batch_req: BatchRequest, request: Request):
+    """Run several API calls in one round trip; reads run concurrently"""
+    if len(batch_req.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_REQUESTS} requests per batch")
+    
+    items = []
+    for item in batch_req.requests:
+        method = item.method.upper()
+        if not is_batchable(method, item.path):
+            raise HTTPException(status_code=400, detail=f"{method} {item.path} cannot be batched")
+        items.append((method, item.path, item.body))
+    
+    # Authenticate once; sub-requests share this request's state
+    await require_auth(request)
+    get_loader(request)
+    
+    return {"responses": await run_batch(request.app, request, items)}
+
+# ============== DATA EXPORT ENDPOINTS ==============
+
+def export_response(user_id: str, export_format: str) -> StreamingResponse:
+    """Stream a user's data as NDJSON or a zip, produced as the client reads it"""
+    stream, media_type, extension = export.EXPORT_FORMATS[export_format]
+    filename = f"blessed-belly-{user_id}-{datetime.now(timezone.utc).strftime('%Y%m%d')}.{extension}"
+    logger.info("Exporting data of %s as %s", user_id, export_format)
+    return StreamingResponse(
+        stream(db, user_id),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"},
+    )
+
+@api_router.get("/me/export")
+async def export_my_data(request: Request, format: str = Query("ndjson", pattern="^(ndjson|zip)$")):
+    """Download profile, check-ins, subscriptions and payments of the current user"""
+    user = await require_auth(request)
+    return export_response(user["user_id"], format)
+
+@api_router.get("/admin/users/{user_id}/export")
+async def export_user_data(user_id: str, request: Request, format: str = Query("ndjson", pattern="^(ndjson|zip)$")):
+    """Download everything stored about a user, for support and privacy requests"""
+    await require_admin(request)
+    if not await db.users.find_one({"user_id": user_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="User not found")
+    return export_response(user_id, format)
+
 # ============== ADMIN ENDPOINTS ==============
 
 @api_router.post("/admin/actions")
@@ -771,6 +1252,8 @@ async def create_action(action: BASElineActionCreate, request: Request):
     }
     
     await db.baseline_actions.insert_one(action_doc)
+    await changelog.record_upserts(db, "baseline_actions", [action_doc])
+    await invalidation_bus.publish(content_key("baseline_actions"))
     return {"action_id": action_id, "message": "Action created"}
 
 @api_router.get("/admin/actions")
@@ -778,8 +1261,7 @@ async def get_all_actions(request: Request):
     """Get all BASEline actions"""
     await require_admin(request)
     
-    actions = await db.baseline_actions.find({}, {"_id": 0}).to_list(1000)
-    return actions
+    return await content_response(request, "baseline_actions", "admin")
 
 @api_router.delete("/admin/actions/{action_id}")
 async def delete_action(action_id: str, request: Request):
@@ -789,6 +1271,8 @@ async def delete_action(action_id: str, request: Request):
     result = await db.baseline_actions.delete_one({"action_id": action_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Action not found")
+    await changelog.record_deletes(db, "baseline_actions", [action_id])
+    await invalidation_bus.publish(content_key("baseline_actions"))
     return {"message": "Action deleted"}
 
 @api_router.post("/admin/triggers")
@@ -804,6 +1288,8 @@ async def create_trigger(trigger: TriggerCardCreate, request: Request):
     }
     
     await db.trigger_cards.insert_one(trigger_doc)
+    await changelog.record_upserts(db, "trigger_cards", [trigger_doc])
+    await invalidation_bus.publish(content_key("trigger_cards"))
     return {"trigger_id": trigger_id, "message": "Trigger created"}
 
 @api_router.get("/admin/triggers")
@@ -811,8 +1297,7 @@ async def get_all_admin_triggers(request: Request):
     """Get all trigger cards (admin)"""
     await require_admin(request)
     
-    triggers = await db.trigger_cards.find({}, {"_id": 0}).to_list(1000)
-    return triggers
+    return await content_response(request, "trigger_cards", "admin")
 
 @api_router.delete("/admin/triggers/{trigger_id}")
 async def delete_trigger(trigger_id: str, request: Request):
@@ -822,6 +1307,8 @@ async def delete_trigger(trigger_id: str, request: Request):
     result = await db.trigger_cards.delete_one({"trigger_id": trigger_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Trigger not found")
+    await changelog.record_deletes(db, "trigger_cards", [trigger_id])
+    await invalidation_bus.publish(content_key("trigger_cards"))
     return {"message": "Trigger deleted"}
 
 @api_router.post("/admin/verses")
@@ -837,6 +1324,8 @@ async def create_verse(verse: VerseCreate, request: Request):
     }
     
     await db.verses.insert_one(verse_doc)
+    await changelog.record_upserts(db, "verses", [verse_doc])
+    await invalidation_bus.publish(content_key("verses"))
     return {"verse_id": verse_id, "message": "Verse created"}
 
 @api_router.get("/admin/verses")
@@ -844,8 +1333,7 @@ async def get_all_verses(request: Request):
     """Get all verses"""
     await require_admin(request)
     
-    verses = await db.verses.find({}, {"_id": 0}).to_list(1000)
-    return verses
+    return await content_response(request, "verses", "admin")
 
 @api_router.delete("/admin/verses/{verse_id}")
 async def delete_verse(verse_id: str, request: Request):
@@ -855,8 +1343,312 @@ async def delete_verse(verse_id: str, request: Request):
     result = await db.verses.delete_one({"verse_id": verse_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Verse not found")
+    await changelog.record_deletes(db, "verses", [verse_id])
+    await invalidation_bus.publish(content_key("verses"))
     return {"message": "Verse deleted"}
 
+# Create and partial-update models of each content collection, for batch edits
+CONTENT_MODELS = {
+    "baseline_actions": (BASElineActionCreate, BASElineActionPatch),
+    "trigger_cards": (TriggerCardCreate, TriggerCardPatch),
+    "verses": (VerseCreate, VersePatch),
+}
+CONTENT_BATCH_MAX_OPERATIONS = int(os.environ.get('CONTENT_BATCH_MAX_OPERATIONS', '500'))
+
+def plan_content_batch(operations: List[ContentOperation]) -> Dict[str, Dict]:
+    """Validate every operation up front and group them into bulk writes per collection"""
+    plans: Dict[str, Dict] = {}
+    errors = []
+    now = datetime.now(timezone.utc).isoformat()
+    for index, operation in enumerate(operations):
+        models = CONTENT_MODELS.get(operation.collection)
+        if models is None:
+            errors.append({"index": index, "error": f"Unknown collection {operation.collection!r}"})
+            continue
+        if operation.op != "create" and not operation.id:
+            errors.append({"index": index, "error": f"{operation.op} needs an id"})
+            continue
+        id_field = changelog.CONTENT_ID_FIELDS[operation.collection]
+        plan = plans.setdefault(operation.collection, {
+            "id_field": id_field, "writes": [], "created": [], "updated": [], "deleted": [], "referenced": set()
+        })
+        try:
+            if operation.op == "create":
+                doc_id = f"{id_field.split('_')[0]}_{uuid.uuid4().hex[:12]}"
+                doc = {id_field: doc_id, **models[0](**operation.fields).model_dump(), "created_at": now}
+                plan["writes"].append(InsertOne(doc))
+                plan["created"].append(doc)
+            elif operation.op == "update":
+                changes = models[1](**operation.fields).model_dump(exclude_unset=True)
+                if not changes or any(value is None for value in changes.values()):
+                    raise ValueError("update needs at least one field, and fields cannot be null")
+                plan["writes"].append(UpdateOne({id_field: operation.id}, {"$set": {**changes, "updated_at": now}}))
+                plan["updated"].append(operation.id)
+                plan["referenced"].add(operation.id)
+            elif operation.op == "delete":
+                plan["writes"].append(DeleteOne({id_field: operation.id}))
+                plan["deleted"].append(operation.id)
+                plan["referenced"].add(operation.id)
+            else:
+                raise ValueError(f"Unknown op {operation.op!r}")
+        except (ValidationError, ValueError) as e:
+            errors.append({"index": index, "error": str(e)})
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return plans
+
+async def run_in_transaction(fn):
+    """Run fn(session) in a transaction; standalone servers, which lack them, run it without one"""
+    if client is None:
+        return await fn(None)
+    async with await client.start_session() as session:
+        try:
+            async with session.start_transaction():
+                return await fn(session)
+        except OperationFailure as e:
+            if e.code != 20:  # IllegalOperation: transactions need a replica set
+                raise
+    return await fn(None)
+
+@api_router.post("/admin/content/batch")
+async def content_batch(batch: ContentBatchRequest, request: Request):
+    """Apply creates, partial updates and deletes across content collections in one go"""
+    await require_admin(request)
+    if not batch.operations:
+        raise HTTPException(status_code=400, detail="No operations")
+    if len(batch.operations) > CONTENT_BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {CONTENT_BATCH_MAX_OPERATIONS} operations per batch")
+    
+    plans = plan_content_batch(batch.operations)
+    
+    async def write(session):
+        # Every updated or deleted document must exist; checked in the transaction
+        # so a concurrent delete can't turn an update into a silent no-op
+        missing = []
+        for collection, plan in plans.items():
+            if plan["referenced"]:
+                found = await db[collection].distinct(
+                    plan["id_field"], {plan["id_field"]: {"$in": list(plan["referenced"])}}, session=session
+                )
+                missing += [{"collection": collection, "id": doc_id} for doc_id in plan["referenced"] - set(found)]
+        if missing:
+            raise HTTPException(status_code=404, detail={"message": "Documents not found", "missing": missing})
+        
+        for collection, plan in plans.items():
+            await db[collection].bulk_write(plan["writes"], ordered=True, session=session)
+        
+        # Log entries commit with the writes, so delta-sync clients can't miss them
+        for collection, plan in plans.items():
+            id_field = plan["id_field"]
+            deleted = set(plan["deleted"])
+            updated_ids = [doc_id for doc_id in dict.fromkeys(plan["updated"]) if doc_id not in deleted]
+            updated = await db[collection].find(
+                {id_field: {"$in": updated_ids}}, {"_id": 0}, session=session
+            ).to_list(None) if updated_ids else []
+            await changelog.record_upserts(db, collection, plan["created"] + updated, session)
+            await changelog.record_deletes(db, collection, list(dict.fromkeys(plan["deleted"])), session)
+    
+    await run_in_transaction(write)
+    # One version bump per touched collection, broadcast as a single message
+    await invalidation_bus.publish_many(content_key(collection) for collection in plans)
+    
+    return {
+        "created": {c: [d[p["id_field"]] for d in p["created"]] for c, p in plans.items() if p["created"]},
+        "updated": sum(len(p["updated"]) for p in plans.values()),
+        "deleted": sum(len(set(p["deleted"])) for p in plans.values())
+    }
+
+@api_router.post("/admin/content/changes/compact")
+async def compact_content_changes(request: Request):
+    """Drop superseded change-log entries and expired tombstones"""
+    await require_admin(request)
+    
+    return await changelog.compact(db)
+
+@api_router.get("/admin/revocations")
+async def revocation_stats(request: Request):
+    """Revoked-token filter size and how often it sent checks to the DB"""
+    await require_admin(request)
+    
+    return revocations.snapshot()
+
+@api_router.get("/admin/outbound")
+async def get_outbound_metrics(request: Request):
+    """Latency, failures and circuit state of calls to external services"""
+    await require_admin(request)
+    return {dependency.name: dependency.snapshot() for dependency in (google_auth, stripe_api)}
+
+@api_router.get("/admin/reconciler")
+async def get_reconciler_metrics(request: Request):
+    """Payment reconciliation throughput and lag"""
+    await require_admin(request)
+    if payment_reconciler is None:
+        return {"enabled": False}
+    return {"enabled": True, **payment_reconciler.metrics}
+
+@api_router.post("/admin/reconciler/run")
+async def run_reconciler(request: Request):
+    """Run one payment reconciliation pass now"""
+    await require_admin(request)
+    reconciler = payment_reconciler or build_payment_reconciler()
+    metrics = await reconciler.run_now()
+    if metrics is None:
+        return {"status": "running elsewhere"}
+    return metrics
+
+@api_router.get("/admin/counts")
+async def get_counts(request: Request):
+    """Users, subscriptions and check-ins, read from maintained counters"""
+    await require_admin(request)
+    return {
+        "counts": await counters.get_counts(db),
+        "reconciler": counter_reconciler.metrics if counter_reconciler is not None else None,
+    }
+
+@api_router.post("/admin/counts/reconcile")
+async def reconcile_counts(request: Request):
+    """Recount the tracked collections now and correct any counter drift"""
+    await require_admin(request)
+    reconciler = counter_reconciler or counters.CounterReconciler(db)
+    return await reconciler.run_once()
+
+@api_router.get("/admin/reminders")
+async def get_reminder_run(request: Request, date: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$")):
+    """Progress and throughput of a day's reminder run (default today)"""
+    await require_admin(request)
+    run = await reminder_dispatcher.status(date)
+    if run is None:
+        raise HTTPException(status_code=404, detail="No reminder run for that date")
+    return run
+
+@api_router.post("/admin/reminders/run")
+async def run_reminders(request: Request, date: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$")):
+    """Send a day's check-in reminders now, resuming an interrupted run"""
+    await require_admin(request)
+    return await reminder_dispatcher.run(date)
+
+@api_router.post("/admin/archive")
+async def run_archive(archive_req: ArchiveRequest, request: Request):
+    """Move old rows of a collection out of Mongo into the Parquet archive"""
+    await require_admin(request)
+    if archive_req.collection not in archive.ARCHIVE_SPECS:
+        raise HTTPException(status_code=400, detail="Collection cannot be archived")
+    
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=archive_req.older_than_days)).strftime("%Y-%m-%d")
+    result = await archive.archive_collection(db, archive_req.collection, cutoff)
+    if archive_req.collection in counters.COUNTED_COLLECTIONS:
+        await counters.increment(db, archive_req.collection, -result["archived"])
+    return result
+
+@api_router.get("/admin/archive/{collection}")
+async def query_archive(
+    collection: str,
+    request: Request,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    user_id: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000)
+):
+    """Query archived rows by date range and user"""
+    await require_admin(request)
+    if collection not in archive.ARCHIVE_SPECS:
+        raise HTTPException(status_code=404, detail="No archive for collection")
+    
+    filters = {"user_id": user_id} if user_id else None
+    
+    def read_page():
+        # Only the page is materialized; counting reads just the filtered columns
+        page = archive.read_archive(collection, start, end, filters, limit=limit)
+        return page, archive.count_archive(collection, start, end, filters)
+    
+    page, total = await asyncio.to_thread(read_page)
+    rows = page.astype(object).where(page.notna(), None).to_dict(orient="records")
+    return {"total": total, "rows": rows}
+
+@api_router.post("/admin/users/import")
+async def import_users(request: Request):
+    """Create accounts from a streamed CSV body (email, name, password columns)"""
+    await require_admin(request)
+    rows = provisioning.csv_rows(provisioning.decode_lines(request.stream()))
+    return await provisioning.provision_users(db, rows, admin_emails=ADMIN_EMAILS)
+
+# ============== ANALYTICS ENDPOINTS ==============
+
+# Reports are computed at most once per UTC day per worker, over this many days
+# of check-ins (older rows are usually archived anyway).
+ANALYTICS_LOOKBACK_DAYS = int(os.environ.get('ANALYTICS_LOOKBACK_DAYS', '365'))
+analytics_cache = VersionedCache(max_entries=4, ttl_seconds=24 * 3600)
+analytics_flights = SingleFlight()
+
+async def analytics_report(refresh: bool = False) -> Dict[str, Any]:
+    """Retention, signal trends and streaks for today, computed once and cached"""
+    today = datetime.now(timezone.utc)
+    key = f"analytics:{today.strftime('%Y-%m-%d')}"
+    report = None if refresh else analytics_cache.get(key)
+    if report is not None:
+        return report
+
+    async def compute():
+        import analytics
+        since = (today - timedelta(days=ANALYTICS_LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+        data = await analytics.load_checkins(db, since)
+
+        def summarize():
+            return {
+                "retention": analytics.weekly_retention(data),
+                "signals": analytics.signal_trends(data),
+                "streaks": analytics.streak_distribution(data),
+            }
+
+        result = await asyncio.to_thread(summarize)
+        result.update(checkins=len(data), since=since, computed_at=datetime.now(timezone.utc).isoformat())
+        analytics_cache.set(key, result, 0)
+        logger.info("Computed analytics over %d check-ins since %s", len(data), since)
+        return result
+
+    return await analytics_flights.do(key, compute)
+
+@api_router.get("/admin/analytics/retention")
+async def retention_analytics(request: Request, refresh: bool = False):
+    """Weekly cohort retention and streak distributions"""
+    await require_admin(request)
+    report = await analytics_report(refresh)
+    return {
+        "cohorts": report["retention"]["cohorts"],
+        "max_weeks": report["retention"]["max_weeks"],
+        "streaks": report["streaks"],
+        "checkins": report["checkins"],
+        "computed_at": report["computed_at"]
+    }
+
+@api_router.get("/admin/analytics/signals")
+async def signal_analytics(request: Request, refresh: bool = False):
+    """Weekly signal → BASE category trends"""
+    await require_admin(request)
+    report = await analytics_report(refresh)
+    return {**report["signals"], "checkins": report["checkins"], "computed_at": report["computed_at"]}
+
+# ============== PROFILER ENDPOINTS ==============
+
+# Slow requests caught by the sampling profiler (PROFILE_SAMPLE_RATE, see profiler.py)
+profile_store = profiler.CaptureStore()
+
+@api_router.get("/admin/profiles")
+async def list_profiles(request: Request, limit: int = 50):
+    """Recent slow-request captures, newest first"""
+    await require_admin(request)
+    captures = await asyncio.to_thread(profile_store.list, min(limit, profile_store.keep))
+    return {"enabled": profiler.PROFILE_SAMPLE_RATE > 0, "captures": captures}
+
+@api_router.get("/admin/profiles/{capture_id}", response_class=PlainTextResponse)
+async def get_profile(capture_id: str, request: Request):
+    """Collapsed-stack flame data of one capture"""
+    await require_admin(request)
+    folded = await asyncio.to_thread(profile_store.folded, capture_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Capture not found")
+    return folded
+
 # ============== SEED DATA ENDPOINT ==============
 
 @api_router.post("/admin/seed")
@@ -865,237 +1657,19 @@ async def seed_data(request: Request):
     # Allow seeding without auth for initial setup
     
     # Check if data already exists
-    actions_count = await db.baseline_actions.count_documents({})
-    if actions_count > 0:
+    if await db.baseline_actions.find_one({}, {"_id": 1}):
         return {"message": "Data already seeded"}
     
-    # BASEline Actions with educational content
-    baseline_actions = [
-        # B - Become Balanced
-        {
-            "action_id": "action_b1",
-            "base_category": "B",
-            "action_text": "Start your next meal with protein first, then vegetables, then carbs.",
-            "why_it_helps": "Eating in this order slows down how quickly sugar enters your bloodstream. When you eat carbs first, your blood sugar spikes and crashes—leaving you tired and hungry. Protein and vegetables create a 'buffer' that keeps your energy steady.",
-            "examples": "Protein options: grilled chicken, salmon, eggs, Greek yogurt, cottage cheese, lentils, or black beans. Eat a few bites of these before touching your rice, bread, or pasta.",
-            "movement_text": "Take a gentle 10-minute walk after eating."
-        },
-        {
-            "action_id": "action_b2",
-            "base_category": "B",
-            "action_text": "Add a healthy fat to your next meal.",
-            "why_it_helps": "Healthy fats help you feel satisfied longer and support hormone balance. They also help your body absorb important vitamins (A, D, E, K) from your vegetables. Fat doesn't make you fat—it helps regulate hunger.",
-            "examples": "Easy additions: half an avocado, a drizzle of olive oil on salad, a handful of almonds or walnuts, a spoonful of nut butter, or cooking with coconut oil.",
-            "movement_text": "Do 5 slow squats before your meal."
-        },
-        {
-            "action_id": "action_b3",
-            "base_category": "B",
-            "action_text": "Drink a full glass of water 15 minutes before eating.",
-            "why_it_helps": "Often what feels like hunger is actually thirst. Drinking water before meals helps you eat the right amount and supports digestion. It also gives your brain time to recognize fullness signals.",
-            "examples": "One full glass is about 8 ounces. Room temperature or warm water is easier on digestion than ice cold. Add a squeeze of lemon if plain water feels boring.",
-            "movement_text": "Stretch your arms overhead 10 times."
-        },
-        {
-            "action_id": "action_b4",
-            "base_category": "B",
-            "action_text": "Include fiber-rich vegetables in your lunch today.",
-            "why_it_helps": "Fiber is like a broom for your digestive system—it keeps things moving and feeds the good bacteria in your gut. It also slows sugar absorption, preventing energy crashes. Most women don't get nearly enough fiber.",
-            "examples": "High-fiber veggies: broccoli, Brussels sprouts, artichokes, green peas, carrots, sweet potatoes, spinach, kale. Even adding a side salad counts! Aim for your veggies to fill half your plate.",
-            "movement_text": "Walk around the block after lunch."
-        },
-        
-        # A - Activate Awareness
-        {
-            "action_id": "action_a1",
-            "base_category": "A",
-            "action_text": "Before eating, pause and take 3 deep breaths. Notice your hunger level on a scale of 1-10.",
-            "why_it_helps": "When you're stressed, your body is in 'fight or flight' mode and can't digest food properly. Three deep breaths activate your 'rest and digest' system. Rating your hunger builds awareness—many of us eat when we're not actually hungry.",
-            "examples": "1-3 = not hungry (eating from boredom or stress), 4-6 = moderately hungry (good time to eat), 7-10 = very hungry (try not to get here—you'll overeat). Ideally, eat when you're at a 5-6.",
-            "movement_text": "Roll your shoulders back 10 times to release tension."
-        },
-        {
-            "action_id": "action_a2",
-            "base_category": "A",
-            "action_text": "Put your fork down between bites for your next meal.",
-            "why_it_helps": "It takes about 20 minutes for your brain to receive fullness signals. When you eat quickly, you overshoot fullness before your brain catches up. Slowing down helps you eat the right amount naturally.",
-            "examples": "Take a bite, set down your fork, chew completely, swallow, then pick up your fork again. It feels awkward at first but becomes natural. Notice how food tastes more flavorful when you slow down.",
-            "movement_text": "Take a 5-minute walking break outside."
-        },
-        {
-            "action_id": "action_a3",
-            "base_category": "A",
-            "action_text": "Write down one thing you're grateful for about your body today.",
-            "why_it_helps": "Gratitude rewires your brain away from criticism and toward appreciation. When you appreciate your body, you naturally want to care for it better. This shifts eating from punishment to nourishment.",
-            "examples": "Examples: 'I'm grateful my legs carried me today,' 'I'm thankful for arms that hug my children,' 'I appreciate that my body healed from that cold,' 'I'm grateful for eyes that see the sunrise.'",
-            "movement_text": "Do gentle neck stretches for 2 minutes."
-        },
-        {
-            "action_id": "action_a4",
-            "base_category": "A",
-            "action_text": "Eat one meal today without screens or distractions.",
-            "why_it_helps": "Distracted eating leads to overeating because you're not paying attention to fullness cues. Studies show people eat significantly more when watching TV or scrolling their phones. Single-tasking helps you enjoy food more with less.",
-            "examples": "Turn off the TV, put your phone in another room, step away from your desk. Sit at a table, look at your food, notice the colors and smells. Even 10 minutes of focused eating makes a difference.",
-            "movement_text": "Stand and stretch every hour today."
-        },
-        
-        # S - Support Strength
-        {
-            "action_id": "action_s1",
-            "base_category": "S",
-            "action_text": "Stand up and move for 5 minutes every hour today.",
-            "why_it_helps": "Sitting for long periods slows your metabolism and makes your body store more fat around your middle. Brief movement breaks keep your blood flowing and your metabolism active. It also improves focus and energy.",
-            "examples": "Set a phone timer. Walk to get water, do a lap around your house or office, march in place, do some arm circles. Even standing and stretching counts. The goal is breaking up long sitting periods.",
-            "movement_text": "Do 10 wall push-ups."
-        },
-        {
-            "action_id": "action_s2",
-            "base_category": "S",
-            "action_text": "Take the stairs instead of the elevator today.",
-            "why_it_helps": "Stair climbing is a simple way to build leg strength and get your heart rate up without 'working out.' Strong muscles burn more calories even at rest. Small choices add up to big changes over time.",
-            "examples": "Start with one flight and take the elevator the rest of the way if needed. Hold the railing if balance is a concern. Climb at your own pace—there's no rush. Count it as a win even if it's just a few stairs.",
-            "movement_text": "Hold a 30-second plank."
-        },
-        {
-            "action_id": "action_s3",
-            "base_category": "S",
-            "action_text": "Park farther away from your destination today.",
-            "why_it_helps": "Extra steps throughout the day add up significantly. This 'hidden exercise' boosts your daily movement without requiring gym time. Walking also reduces stress hormones that contribute to belly fat.",
-            "examples": "Park at the back of the parking lot, get off the bus one stop early, walk to a colleague's desk instead of emailing. Aim for an extra 5-10 minutes of walking spread throughout the day.",
-            "movement_text": "Do 15 standing calf raises."
-        },
-        {
-            "action_id": "action_s4",
-            "base_category": "S",
-            "action_text": "Do gentle stretches while waiting for your morning coffee.",
-            "why_it_helps": "Morning stretching wakes up your muscles, improves circulation, and sets a positive tone for the day. Stiff muscles can lead to poor posture, which affects digestion and how your body stores fat around your midsection.",
-            "examples": "While the coffee brews: reach arms overhead, twist gently side to side, roll your neck, touch your toes (or reach toward them), do a few hip circles. 2-3 minutes is all you need.",
-            "movement_text": "Walk for 15 minutes after dinner."
-        },
-        
-        # E - Engage Your Gut
-        {
-            "action_id": "action_e1",
-            "base_category": "E",
-            "action_text": "Add a probiotic food to one meal today.",
-            "why_it_helps": "Your gut contains trillions of bacteria that affect weight, mood, and immune function. Probiotic foods add beneficial bacteria to your gut, improving digestion and reducing bloating. A healthy gut microbiome is linked to less belly fat.",
-            "examples": "Probiotic-rich foods: plain Greek yogurt (check for 'live cultures'), kefir, sauerkraut, kimchi, miso soup, tempeh, kombucha. Start small—even a few spoonfuls of sauerkraut on the side counts.",
-            "movement_text": "Do gentle torso twists after eating."
-        },
-        {
-            "action_id": "action_e2",
-            "base_category": "E",
-            "action_text": "Chew each bite 20-30 times during your next meal.",
-            "why_it_helps": "Digestion starts in your mouth. Chewing thoroughly breaks down food so your stomach works less hard. It also releases more nutrients and gives your brain time to register fullness. Most of us chew only 5-10 times!",
-            "examples": "Count your chews for a few bites to see where you're starting. Put your fork down while chewing. Notice how food becomes almost liquid before you swallow. Soup and smoothies don't count for this practice!",
-            "movement_text": "Take a slow 15-minute walk to aid digestion."
-        },
-        {
-            "action_id": "action_e3",
-            "base_category": "E",
-            "action_text": "Drink warm water with lemon first thing in the morning.",
-            "why_it_helps": "After sleeping, your body is dehydrated and your digestive system is sluggish. Warm lemon water hydrates you, stimulates digestion, and supports your liver's natural detox processes. It's a gentle wake-up call for your gut.",
-            "examples": "Heat water to warm (not boiling), squeeze half a lemon, drink before breakfast. Use a straw if you're concerned about enamel. Fresh lemon is better than bottled juice. Do this before coffee for best results.",
-            "movement_text": "Do gentle belly breathing for 5 minutes."
-        },
-        {
-            "action_id": "action_e4",
-            "base_category": "E",
-            "action_text": "Stop eating when you feel 80% full.",
-            "why_it_helps": "The Japanese call this 'hara hachi bu.' Your stomach is about the size of your fist and can stretch—but shouldn't have to. Stopping at 80% prevents the stuffed feeling and gives your digestive system room to work efficiently.",
-            "examples": "80% full feels like: satisfied but not stuffed, you could eat more but don't need to, no belly discomfort, you still have energy. 100% full feels like: needing to unbutton pants, feeling sleepy, slight nausea.",
-            "movement_text": "Light stretching before bed."
-        },
-    ]
-    
-    # Trigger Cards
-    trigger_cards = [
-        {
-            "trigger_id": "trigger_stressed1",
-            "trigger_type": "stressed",
-            "title": "Feeling Stressed?",
-            "immediate_action": "Step away from what you're doing. Place one hand on your heart and breathe deeply for 60 seconds.",
-            "explanation": "Stress triggers cortisol, which can increase belly fat storage. Taking a moment to calm your nervous system helps your body shift from 'fight or flight' to 'rest and digest.'",
-            "body_truth": "Your body is designed to handle stress, but it also needs moments of peace. You can create calm within chaos.",
-            "verse": "Come to me, all you who are weary and burdened, and I will give you rest.",
-            "verse_ref": "Matthew 11:28"
-        },
-        {
-            "trigger_id": "trigger_cravings1",
-            "trigger_type": "cravings",
-            "title": "Having Cravings?",
-            "immediate_action": "Drink a full glass of water and wait 10 minutes. Often thirst masquerades as hunger.",
-            "explanation": "Cravings often signal blood sugar imbalance or emotional needs. Pausing before acting helps you respond rather than react.",
-            "body_truth": "Cravings are information, not commands. Your body is communicating—listen with curiosity, not judgment.",
-            "verse": "For I am the Lord your God who takes hold of your right hand and says to you, Do not fear; I will help you.",
-            "verse_ref": "Isaiah 41:13"
-        },
-        {
-            "trigger_id": "trigger_lowenergy1",
-            "trigger_type": "low_energy",
-            "title": "Feeling Low Energy?",
-            "immediate_action": "Stand up, stretch your arms overhead, and take 5 deep breaths. Then drink a glass of water.",
-            "explanation": "Low energy often comes from dehydration, blood sugar dips, or simply sitting too long. Movement and hydration are natural energizers.",
-            "body_truth": "Your body has energy reserves—sometimes it just needs a gentle nudge to access them.",
-            "verse": "But those who hope in the Lord will renew their strength. They will soar on wings like eagles.",
-            "verse_ref": "Isaiah 40:31"
-        },
-        {
-            "trigger_id": "trigger_aftermeals1",
-            "trigger_type": "after_meals",
-            "title": "After Meals",
-            "immediate_action": "Take a gentle 10-minute walk. Even pacing inside your home helps.",
-            "explanation": "Moving after eating helps stabilize blood sugar and aids digestion. It doesn't need to be intense—gentle is perfect.",
-            "body_truth": "Your body processes food better when you move. This is gentle care, not punishment.",
-            "verse": "So whether you eat or drink or whatever you do, do it all for the glory of God.",
-            "verse_ref": "1 Corinthians 10:31"
-        },
-        {
-            "trigger_id": "trigger_beforebed1",
-            "trigger_type": "before_bed",
-            "title": "Before Bed",
-            "immediate_action": "Stop eating 2-3 hours before sleep. Do gentle stretches and write one gratitude in your journal.",
-            "explanation": "Quality sleep is essential for metabolic health. Creating a calm evening routine supports your body's natural healing processes.",
-            "body_truth": "Rest is productive. Your body does important repair work while you sleep.",
-            "verse": "In peace I will lie down and sleep, for you alone, Lord, make me dwell in safety.",
-            "verse_ref": "Psalm 4:8"
-        }
-    ]
-    
-    # Verses
-    verses = [
-        # B - Become Balanced
-        {"verse_id": "verse_b1", "verse_text": "Whether you eat or drink or whatever you do, do it all for the glory of God.", "verse_ref": "1 Corinthians 10:31", "category": "B"},
-        {"verse_id": "verse_b2", "verse_text": "Everything is permissible for me—but not everything is beneficial.", "verse_ref": "1 Corinthians 6:12", "category": "B"},
-        {"verse_id": "verse_b3", "verse_text": "Do not join those who drink too much wine or gorge themselves on meat.", "verse_ref": "Proverbs 23:20", "category": "B"},
-        
-        # A - Activate Awareness
-        {"verse_id": "verse_a1", "verse_text": "Be still, and know that I am God.", "verse_ref": "Psalm 46:10", "category": "A"},
-        {"verse_id": "verse_a2", "verse_text": "Do not be anxious about anything, but in every situation, by prayer and petition, with thanksgiving, present your requests to God.", "verse_ref": "Philippians 4:6", "category": "A"},
-        {"verse_id": "verse_a3", "verse_text": "The peace of God, which transcends all understanding, will guard your hearts and your minds.", "verse_ref": "Philippians 4:7", "category": "A"},
-        
-        # S - Support Strength
-        {"verse_id": "verse_s1", "verse_text": "I can do all things through Christ who strengthens me.", "verse_ref": "Philippians 4:13", "category": "S"},
-        {"verse_id": "verse_s2", "verse_text": "She sets about her work vigorously; her arms are strong for her tasks.", "verse_ref": "Proverbs 31:17", "category": "S"},
-        {"verse_id": "verse_s3", "verse_text": "Physical training is of some value, but godliness has value for all things.", "verse_ref": "1 Timothy 4:8", "category": "S"},
-        
-        # E - Engage Your Gut
-        {"verse_id": "verse_e1", "verse_text": "Do you not know that your bodies are temples of the Holy Spirit?", "verse_ref": "1 Corinthians 6:19", "category": "E"},
-        {"verse_id": "verse_e2", "verse_text": "Gracious words are a honeycomb, sweet to the soul and healing to the bones.", "verse_ref": "Proverbs 16:24", "category": "E"},
-        {"verse_id": "verse_e3", "verse_text": "A cheerful heart is good medicine, but a crushed spirit dries up the bones.", "verse_ref": "Proverbs 17:22", "category": "E"},
-        
-        # General
-        {"verse_id": "verse_g1", "verse_text": "For you created my inmost being; you knit me together in my mother's womb. I praise you because I am fearfully and wonderfully made.", "verse_ref": "Psalm 139:13-14", "category": "general"},
-        {"verse_id": "verse_g2", "verse_text": "Do not conform to the pattern of this world, but be transformed by the renewing of your mind.", "verse_ref": "Romans 12:2", "category": "general"},
-        {"verse_id": "verse_g3", "verse_text": "But the fruit of the Spirit is love, joy, peace, forbearance, kindness, goodness, faithfulness, gentleness and self-control.", "verse_ref": "Galatians 5:22-23", "category": "general"},
-    ]
+    from seed_content import BASELINE_ACTIONS, TRIGGER_CARDS, VERSES
     
-    # Insert all data
-    await db.baseline_actions.insert_many(baseline_actions)
-    await db.trigger_cards.insert_many(trigger_cards)
-    await db.verses.insert_many(verses)
+    # Insert all data (copies, since insert_many adds _id to each document)
+    seeded = {"baseline_actions": BASELINE_ACTIONS, "trigger_cards": TRIGGER_CARDS, "verses": VERSES}
+    for collection, docs in seeded.items():
+        await db[collection].insert_many([dict(d) for d in docs])
+        await changelog.record_upserts(db, collection, docs)
+        await invalidation_bus.publish(content_key(collection))
     
-    return {"message": "Data seeded successfully", "actions": len(baseline_actions), "triggers": len(trigger_cards), "verses": len(verses)}
+    return {"message": "Data seeded successfully", "actions": len(BASELINE_ACTIONS), "triggers": len(TRIGGER_CARDS), "verses": len(VERSES)}
 
 # ============== HEALTH CHECK ==============
 
@@ -1105,19 +1679,134 @@ async def root():
 
 @api_router.get("/health")
 async def health():
-    return {"status": "healthy"}
+    """Report MongoDB ping latency, connection pool saturation and event-loop lag"""
+    pool = pool_monitor.snapshot(client_options["maxPoolSize"])
+    loop = lag_monitor.summary() if lag_monitor is not None else None
+    try:
+        ping_ms = await database.ping(db)
+    except Exception as e:
+        logger.warning("Health check ping failed: %s", e)
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unhealthy", "mongo": {"ping_ms": None, "pool": pool}, "loop": loop}
+        )
+    return {"status": "healthy", "mongo": {"ping_ms": round(ping_ms, 2), "pool": pool}, "loop": loop}
 
-# Include the router in the main app
-app.include_router(api_router)
+@api_router.get("/admin/loop-lag")
+async def loop_lag(request: Request):
+    """Event-loop lag histogram and stacks of recent stalls"""
+    await require_admin(request)
+    if lag_monitor is None:
+        raise HTTPException(status_code=404, detail="Loop monitor is disabled")
+    return lag_monitor.stats()
+
+# ============== APP FACTORY ==============
+
+payment_reconciler: Optional[PaymentReconciler] = None
+lag_monitor: Optional[loop_monitor.LoopMonitor] = None
+counter_reconciler: Optional[counters.CounterReconciler] = None
+reminder_dispatcher: Optional[reminders.ReminderDispatcher] = None
+
+def build_payment_reconciler() -> PaymentReconciler:
+    async def check_status(session_id: str):
+        stripe_checkout = get_stripe_checkout(PUBLIC_BASE_URL)
+        return await call_stripe(lambda: stripe_checkout.get_checkout_status(session_id))
+    
+    return PaymentReconciler(
+        db,
+        check_status=check_status,
+        activation=subscription_activation,
+        on_activated=entitlement_changed,
+        older_than=PAYMENT_RECONCILE_AFTER,
+        interval=PAYMENT_RECONCILE_INTERVAL
+    )
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+async def ensure_indexes():
+    try:
+        await db.refresh_tokens.create_index("token_hash", unique=True)
+        await db.refresh_tokens.create_index("family_id")
+        await db.refresh_tokens.create_index("expires_at", expireAfterSeconds=0)
+        await db.payment_transactions.create_index(
+            [("user_id", 1), ("plan", 1), ("payment_status", 1), ("created_at", -1)]
+        )
+        await db.payment_transactions.create_index([("payment_status", 1), ("created_at", 1)])
+        await db.daily_checkins.create_index([("date", 1), ("user_id", 1)])
+        await db.daily_checkins.create_index([("user_id", 1), ("date", 1)])
+        await db.subscriptions.create_index([("status", 1), ("user_id", 1)])
+        await db.users.create_index("user_id")
+        await db.content_changes.create_index("seq", unique=True)
+        await db.revoked_tokens.create_index("jti", unique=True)
+        await db.revoked_tokens.create_index("revoked_at")
+        await db.revoked_tokens.create_index("expires_at", expireAfterSeconds=0)
+        await db.content_changes.create_index([("collection", 1), ("doc_id", 1), ("seq", 1)])
+        # Last: fails if existing accounts already share an email
+        await db.users.create_index("email", unique=True)
+    except Exception as e:
+        logger.warning("Could not create indexes: %s", e)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global lag_monitor, payment_reconciler, reminder_dispatcher, counter_reconciler
+    structured_logging.configure_logging()
+    if loop_monitor.LOOP_MONITOR_INTERVAL_MS > 0:
+        lag_monitor = loop_monitor.LoopMonitor()
+        lag_monitor.start()
+    connect_db()
+    warm_connections = int(os.environ.get('MONGO_WARM_CONNECTIONS', client_options["minPoolSize"] or 1))
+    await database.warm_up(db, warm_connections)
+    await ensure_indexes()
+    try:
+        await changelog.backfill(db)
+    except Exception as e:
+        logger.warning("Could not backfill content change log: %s", e)
+    await invalidation_bus.start(db)
+    await revocations.start(db)
+    reminder_dispatcher = reminders.ReminderDispatcher(db, link=f"{PUBLIC_BASE_URL}/dashboard")
+    reminder_dispatcher.start()
+    if counters.COUNTER_RECONCILE_SECONDS > 0:
+        counter_reconciler = counters.CounterReconciler(db)
+        counter_reconciler.start()
+    if PAYMENT_RECONCILE_INTERVAL > 0 and STRIPE_API_KEY:
+        payment_reconciler = build_payment_reconciler()
+        payment_reconciler.start()
+    yield
+    if payment_reconciler is not None:
+        await payment_reconciler.stop()
+        payment_reconciler = None
+    await reminder_dispatcher.stop()
+    reminder_dispatcher = None
+    if counter_reconciler is not None:
+        await counter_reconciler.stop()
+        counter_reconciler = None
+    await revocations.stop()
+    await invalidation_bus.stop()
+    provisioning.shutdown_pool()
+    close_db()
+    if lag_monitor is not None:
+        await lag_monitor.stop()
+        lag_monitor = None
+    structured_logging.stop_logging()
+
+def create_app() -> FastAPI:
+    """Build the FastAPI application; the database connects on startup"""
+    app = FastAPI(title="Blessed Belly API", lifespan=lifespan)
+    
+    # Include the router in the main app
+    app.include_router(api_router)
+    app.add_exception_handler(outbound.DependencyUnavailable, dependency_unavailable)
+    
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Request-ID"],
+    )
+    if profiler.PROFILE_SAMPLE_RATE > 0:
+        app.add_middleware(profiler.ProfilerMiddleware, store=profile_store)
+    app.add_middleware(structured_logging.RequestIdMiddleware)
+    
+    return app
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+app = create_app()
@@ -0,0 +1,22 @@
+"""Coalesce concurrent calls for the same key into one in-flight call"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Concurrent callers of `do` with the same key share one execution of `fn`"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: one caller disconnecting must not cancel the call for the others
+        return await asyncio.shield(future)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
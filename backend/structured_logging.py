@@ -0,0 +1,191 @@
+"""Non-blocking JSON logging: records are queued by the caller and written by a listener thread"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+# Records beyond this many waiting for the writer thread are dropped, not waited on
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+# Per-logger sampling of records below WARNING, e.g. "uvicorn.access=0.05,reconciler=0.2"
+LOG_SAMPLE_RATES = os.environ.get('LOG_SAMPLE_RATES', '')
+
+# Loggers that servers configure with their own synchronous handlers
+SERVER_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for part in spec.split(","):
+        name, _, rate = part.strip().partition("=")
+        if name and rate:
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the request ID and any `extra=` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of sub-WARNING records from noisy loggers"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.name)
+        return rate is None or random.random() < rate
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue records without formatting them.
+
+    The stock QueueHandler formats the message in the calling thread; here only
+    the request ID is captured (it lives in a context variable) and the
+    listener thread does the rest, tracebacks included. A full queue drops the
+    record rather than blocking the event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        request_id = getattr(record, "request_id", None)
+        return f"{message} [{request_id}]" if request_id else message
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose stop waits for room in a full queue instead of raising queue.Full"""
+
+    def enqueue_sentinel(self) -> None:
+        # The writer thread is still running, so a blocking put only waits for it to catch up
+        self.queue.put(self._sentinel)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[ContextQueueHandler] = None
+
+
+def configure_logging(stream=None) -> ContextQueueHandler:
+    """Route the root logger (and the server's own loggers) through the queue"""
+    global _listener, _queue_handler
+    stop_logging()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = ContextQueueHandler(log_queue)
+    rates = parse_sample_rates(LOG_SAMPLE_RATES)
+    if rates:
+        handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(LOG_LEVEL)
+    for name in SERVER_LOGGERS:
+        server_logger = logging.getLogger(name)
+        server_logger.handlers[:] = []
+        server_logger.propagate = True
+
+    _listener = DrainingQueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    _queue_handler = handler
+    return handler
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        if _queue_handler.dropped:
+            record = logging.makeLogRecord({
+                "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+                "msg": f"Dropped {_queue_handler.dropped} log records while the queue was full",
+            })
+            for output in _listener.handlers:
+                output.handle(record)
+    _listener = None
+    _queue_handler = None
+
+
+class RequestIdMiddleware:
+    """Tag every log record of a request with an ID, echoed as X-Request-ID"""
+
+    def __init__(self, app, header: str = "x-request-id"):
+        self.app = app
+        self.header = header.encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = next((v.decode("latin-1")[:128] for k, v in scope["headers"] if k == self.header), None)
+        # Batched sub-requests run inside their parent and keep its ID
+        request_id = incoming or request_id_var.get() or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(self.header, request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
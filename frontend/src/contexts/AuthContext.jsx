@@ -1,13 +1,72 @@
-import React, { createContext, useContext, useState, useEffect, useCallback } from 'react';
+import React, { createContext, useContext, useState, useEffect, useCallback, useRef } from 'react';
 
 const AuthContext = createContext(null);
 
 const API_URL = process.env.REACT_APP_BACKEND_URL;
 
+// Refresh the access token this long before it expires
+const REFRESH_MARGIN_MS = 60 * 1000;
+
+const tokenExpiry = (token) => {
+  try {
+    const payload = JSON.parse(atob(token.split('.')[1].replace(/-/g, '+').replace(/_/g, '/')));
+    return payload.exp ? payload.exp * 1000 : null;
+  } catch (error) {
+    return null;
+  }
+};
+
 export const AuthProvider = ({ children }) => {
   const [user, setUser] = useState(null);
+  // Today's check-in and the trigger catalog, preloaded by /api/bootstrap for subscribers.
+  // Pages take each value once; later visits fetch fresh data.
+  const bootstrap = useRef({});
   const [loading, setLoading] = useState(true);
   const [token, setToken] = useState(() => localStorage.getItem('bb_token'));
+  const refreshing = useRef(null);
+
+  const storeTokens = (data) => {
+    localStorage.setItem('bb_token', data.token);
+    if (data.refresh_token) {
+      localStorage.setItem('bb_refresh_token', data.refresh_token);
+    }
+    setToken(data.token);
+  };
+
+  const clearTokens = () => {
+    localStorage.removeItem('bb_token');
+    localStorage.removeItem('bb_refresh_token');
+    setToken(null);
+  };
+
+  // Exchange the refresh token for a new access token; concurrent callers share one request
+  const refreshSession = useCallback(async () => {
+    const refreshToken = localStorage.getItem('bb_refresh_token');
+    if (!refreshToken) return false;
+    if (!refreshing.current) {
+      refreshing.current = (async () => {
+        try {
+          const response = await fetch(`${API_URL}/api/auth/refresh`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh_token: refreshToken }),
+            credentials: 'include'
+          });
+          if (!response.ok) return false;
+          const data = await response.json();
+          storeTokens(data);
+          setUser(data.user);
+          return true;
+        } catch (error) {
+          console.error('Token refresh failed:', error);
+          return false;
+        } finally {
+          refreshing.current = null;
+        }
+      })();
+    }
+    return refreshing.current;
+  }, []);
 
   const checkAuth = useCallback(async () => {
     try {
@@ -16,18 +75,22 @@ export const AuthProvider = ({ children }) => {
         headers['Authorization'] = `Bearer ${token}`;
       }
       
-      const response = await fetch(`${API_URL}/api/auth/me`, {
+      const response = await fetch(`${API_URL}/api/bootstrap`, {
         credentials: 'include',
         headers
       });
       
       if (response.ok) {
-        const userData = await response.json();
-        setUser(userData);
+        const data = await response.json();
+        setUser(data.user);
+        bootstrap.current = { checkin: data.checkin, triggers: data.triggers };
+      } else if (response.status === 401 && await refreshSession()) {
+        // The new token re-runs checkAuth
+        return;
       } else {
         setUser(null);
-        localStorage.removeItem('bb_token');
-        setToken(null);
+        bootstrap.current = {};
+        clearTokens();
       }
     } catch (error) {
       console.error('Auth check failed:', error);
@@ -35,12 +98,20 @@ export const AuthProvider = ({ children }) => {
     } finally {
       setLoading(false);
     }
-  }, [token]);
+  }, [token, refreshSession]);
 
   useEffect(() => {
     checkAuth();
   }, [checkAuth]);
 
+  // Renew the short-lived access token shortly before it expires
+  useEffect(() => {
+    const expiresAt = token && tokenExpiry(token);
+    if (!expiresAt) return undefined;
+    const timer = setTimeout(refreshSession, Math.max(0, expiresAt - Date.now() - REFRESH_MARGIN_MS));
+    return () => clearTimeout(timer);
+  }, [token, refreshSession]);
+
   const login = async (email, password) => {
     const response = await fetch(`${API_URL}/api/auth/login`, {
       method: 'POST',
@@ -55,8 +126,7 @@ export const AuthProvider = ({ children }) => {
     }
 
     const data = await response.json();
-    localStorage.setItem('bb_token', data.token);
-    setToken(data.token);
+    storeTokens(data);
     setUser(data.user);
     return data.user;
   };
@@ -75,8 +145,7 @@ export const AuthProvider = ({ children }) => {
     }
 
     const data = await response.json();
-    localStorage.setItem('bb_token', data.token);
-    setToken(data.token);
+    storeTokens(data);
     setUser(data.user);
     return data.user;
   };
@@ -107,26 +176,39 @@ export const AuthProvider = ({ children }) => {
 
   const logout = async () => {
     try {
+      const headers = { 'Content-Type': 'application/json' };
+      if (token) headers['Authorization'] = `Bearer ${token}`;
       await fetch(`${API_URL}/api/auth/logout`, {
         method: 'POST',
         credentials: 'include',
-        headers: token ? { 'Authorization': `Bearer ${token}` } : {}
+        headers,
+        body: JSON.stringify({ refresh_token: localStorage.getItem('bb_refresh_token') })
       });
     } catch (error) {
       console.error('Logout error:', error);
     }
     
-    localStorage.removeItem('bb_token');
-    setToken(null);
+    clearTokens();
     setUser(null);
+    bootstrap.current = {};
   };
 
+  // Entitlements live in the access token, so pick up a new one before re-checking
   const refreshUser = async () => {
-    await checkAuth();
+    if (!(await refreshSession())) {
+      await checkAuth();
+    }
+  };
+
+  const takeBootstrap = (key) => {
+    const data = bootstrap.current[key] ?? null;
+    bootstrap.current[key] = null;
+    return data;
   };
 
   const value = {
     user,
+    takeBootstrap,
     loading,
     token,
     login,
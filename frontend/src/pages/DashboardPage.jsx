@@ -9,7 +9,7 @@ import { toast } from 'sonner';
 const API_URL = process.env.REACT_APP_BACKEND_URL;
 
 const DashboardPage = () => {
-  const { user, token } = useAuth();
+  const { user, token, takeBootstrap } = useAuth();
   const [loading, setLoading] = useState(true);
   const [submitting, setSubmitting] = useState(false);
   const [todayData, setTodayData] = useState(null);
@@ -40,6 +40,15 @@ const DashboardPage = () => {
   };
 
   useEffect(() => {
+    // Use the check-in preloaded at sign-in when we have it
+    const checkin = takeBootstrap('checkin');
+    if (checkin) {
+      if (checkin.has_checkin) {
+        setTodayData(checkin);
+      }
+      setLoading(false);
+      return;
+    }
     fetchTodayCheckIn();
   }, []);
 
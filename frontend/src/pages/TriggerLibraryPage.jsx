@@ -9,7 +9,7 @@ import { Loader2, X, Heart, Cookie, Battery, Utensils, Moon, BookOpen, Sparkles
 const API_URL = process.env.REACT_APP_BACKEND_URL;
 
 const TriggerLibraryPage = () => {
-  const { token } = useAuth();
+  const { token, takeBootstrap } = useAuth();
   const [searchParams] = useSearchParams();
   const [loading, setLoading] = useState(true);
   const [triggers, setTriggers] = useState([]);
@@ -24,6 +24,13 @@ const TriggerLibraryPage = () => {
   };
 
   useEffect(() => {
+    // Use the catalog preloaded at sign-in when we have it
+    const preloaded = takeBootstrap('triggers');
+    if (preloaded) {
+      setTriggers(preloaded);
+      setLoading(false);
+      return;
+    }
     fetchTriggers();
   }, []);
 
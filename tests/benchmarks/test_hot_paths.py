@@ -0,0 +1,113 @@
+"""
+Microbenchmarks for the pure-CPU work done on every request.
+
+Run and save a baseline, then compare later runs against it:
+
+    pytest tests/benchmarks --benchmark-autosave
+    pytest tests/benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+
+Saved runs live in test_reports/benchmarks so they can be committed and
+tracked over time.
+"""
+import pytest
+
+import server
+
+USER_ID = "user_0123456789ab"
+
+ACTION = {
+    "action_id": "action_b1",
+    "base_category": "B",
+    "action_text": "Start your next meal with protein first, then vegetables, then carbs.",
+    "why_it_helps": "Eating in this order slows down how quickly sugar enters your bloodstream. " * 3,
+    "examples": "Protein options: grilled chicken, salmon, eggs, Greek yogurt, cottage cheese, lentils.",
+    "movement_text": "Take a gentle 10-minute walk after eating."
+}
+
+VERSE = {
+    "verse_id": "verse_b1",
+    "verse_text": "Whether you eat or drink or whatever you do, do it all for the glory of God.",
+    "verse_ref": "1 Corinthians 10:31",
+    "category": "B"
+}
+
+CHECKIN = {
+    "check_in_id": "checkin_0123456789ab",
+    "user_id": USER_ID,
+    "date": "2026-01-01",
+    "signal": "cravings",
+    "base_category": "B",
+    "action_id": "action_b1",
+    "verse_id": "verse_b1",
+    "created_at": "2026-01-01T08:00:00+00:00"
+}
+
+TRIGGER = {
+    "trigger_id": "trigger_stressed1",
+    "trigger_type": "stressed",
+    "title": "Feeling Stressed?",
+    "immediate_action": "Step away from what you're doing. Place one hand on your heart and breathe deeply.",
+    "explanation": "Stress triggers cortisol, which can increase belly fat storage. " * 2,
+    "body_truth": "Your body is designed to handle stress, but it also needs moments of peace.",
+    "verse": "Come to me, all you who are weary and burdened, and I will give you rest.",
+    "verse_ref": "Matthew 11:28"
+}
+
+
+@pytest.fixture(scope="module")
+def token():
+    return server.create_jwt_token(USER_ID)
+
+
+def test_create_jwt_token(benchmark):
+    benchmark(server.create_jwt_token, USER_ID)
+
+
+def test_decode_jwt_token(benchmark, token):
+    payload = benchmark(server.decode_jwt_token, token)
+    assert payload["user_id"] == USER_ID
+
+
+@pytest.mark.parametrize("signal", ["cravings", "stressed", "digestion", "normal", "unknown"])
+def test_get_base_category(benchmark, signal):
+    assert benchmark(server.get_base_category, signal) in {"B", "A", "S", "E"}
+
+
+def test_get_base_name(benchmark):
+    assert benchmark(server.get_base_name, "S") == "Support Strength"
+
+
+def test_trigger_card_response(benchmark):
+    benchmark(lambda: server.TriggerCardResponse(**TRIGGER))
+
+
+def test_trigger_catalog_response(benchmark):
+    triggers = [dict(TRIGGER, trigger_id=f"trigger_{i}") for i in range(50)]
+    benchmark(lambda: [server.TriggerCardResponse(**t) for t in triggers])
+
+
+def test_daily_checkin_response(benchmark):
+    def build():
+        return server.DailyCheckInResponse(
+            check_in_id=CHECKIN["check_in_id"],
+            user_id=USER_ID,
+            date=CHECKIN["date"],
+            signal=CHECKIN["signal"],
+            base_category="B",
+            action={
+                "text": ACTION["action_text"],
+                "why_it_helps": ACTION["why_it_helps"],
+                "examples": ACTION["examples"],
+                "base_name": server.get_base_name("B"),
+                "base_letter": "B"
+            },
+            movement={"text": ACTION["movement_text"]},
+            verse={"text": VERSE["verse_text"], "reference": VERSE["verse_ref"]}
+        )
+
+    benchmark(build)
+
+
+def test_build_checkin_response(benchmark):
+    payload = benchmark(server.build_checkin_response, CHECKIN, ACTION, VERSE)
+    assert payload["action"]["base_name"] == "Become Balanced"
@@ -0,0 +1,48 @@
+"""
+Time a log call costs the calling thread (the event loop, in a handler).
+
+`sync` writes and flushes from the caller the way logging.basicConfig does;
+`queued` only hands the record to the writer thread.
+
+    pytest tests/benchmarks/test_logging.py --benchmark-group-by=group
+"""
+import logging
+
+import pytest
+
+import structured_logging
+
+
+@pytest.fixture
+def sink(tmp_path):
+    with open(tmp_path / "app.log", "w") as stream:
+        yield stream
+
+
+@pytest.fixture
+def isolated_root():
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    yield root
+    structured_logging.stop_logging()
+    root.handlers[:], root.level = saved
+
+
+def _emit(logger):
+    logger.info("Payment successful for user: %s (%s)", "user_0123456789ab", "a@example.com",
+                extra={"user_id": "user_0123456789ab"})
+
+
+@pytest.mark.benchmark(group="logging")
+def test_sync_stream_handler(benchmark, sink, isolated_root):
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(structured_logging.JsonFormatter())
+    isolated_root.handlers[:] = [handler]
+    isolated_root.setLevel(logging.INFO)
+    benchmark(_emit, logging.getLogger("server"))
+
+
+@pytest.mark.benchmark(group="logging")
+def test_queued_handler(benchmark, sink, isolated_root):
+    structured_logging.configure_logging(sink)
+    benchmark(_emit, logging.getLogger("server"))
@@ -0,0 +1,98 @@
+"""
+Requests per second of `uvicorn server:app` with its defaults against serve.py.
+
+Each server runs as a subprocess on a free port. Client processes hold
+keep-alive connections and send GET /api/ back to back; the rate is recorded
+in each result's extra_info. The app runs with its lifespan off: GET /api/
+touches no database, so no MongoDB is needed.
+
+    pytest tests/benchmarks/test_serve.py --benchmark-group-by=group
+"""
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend"
+
+CLIENT_PROCESSES = max(1, (os.cpu_count() or 2) // 2)
+CONNECTIONS_PER_PROCESS = 32
+REQUESTS_PER_CONNECTION = 200
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _connection(port: int, count: int) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = b"GET /api/ HTTP/1.1\r\nHost: bench\r\n\r\n"
+    for _ in range(count):
+        writer.write(request)
+        headers = await reader.readuntil(b"\r\n\r\n")
+        length = next(
+            int(line.split(b":")[1]) for line in headers.split(b"\r\n")
+            if line.lower().startswith(b"content-length:")
+        )
+        await reader.readexactly(length)
+    writer.close()
+
+
+def _client(port: int) -> None:
+    async def run():
+        await asyncio.gather(*(
+            _connection(port, REQUESTS_PER_CONNECTION) for _ in range(CONNECTIONS_PER_PROCESS)
+        ))
+    asyncio.run(run())
+
+
+def _load(port: int) -> None:
+    with multiprocessing.get_context("spawn").Pool(CLIENT_PROCESSES) as pool:
+        pool.map(_client, [port] * CLIENT_PROCESSES)
+
+
+def _wait_until_serving(port: int, process: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        assert process.poll() is None, "server exited during startup"
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1) as sock:
+                sock.sendall(b"GET /api/ HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n")
+                if sock.recv(16).startswith(b"HTTP/1.1 200"):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("server did not start")
+
+
+COMMANDS = {
+    "uvicorn-defaults": lambda port: [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port),
+                                      "--lifespan", "off"],
+    "serve": lambda port: [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port),
+                           "--lifespan", "off"],
+}
+
+
+@pytest.mark.parametrize("setup", list(COMMANDS))
+@pytest.mark.benchmark(group="serve")
+def test_requests_per_second(benchmark, setup):
+    port = _free_port()
+    process = subprocess.Popen(COMMANDS[setup](port), cwd=BACKEND_DIR,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_until_serving(port, process)
+        benchmark.pedantic(_load, args=(port,), rounds=3, warmup_rounds=1)
+        total = CLIENT_PROCESSES * CONNECTIONS_PER_PROCESS * REQUESTS_PER_CONNECTION
+        benchmark.extra_info["requests_per_second"] = round(total / benchmark.stats.stats.mean)
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
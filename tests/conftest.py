@@ -0,0 +1,425 @@
+import contextlib
+import copy
+import os
+import sys
+from collections import Counter, OrderedDict
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# server.py reads these at import time; tests never talk to a real database
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+
+from bson import ObjectId  # noqa: E402
+from pymongo import DeleteMany, DeleteOne, InsertOne, UpdateMany, UpdateOne  # noqa: E402
+from pymongo.errors import BulkWriteError, DuplicateKeyError  # noqa: E402
+
+# ============== IN-MEMORY MOTOR FAKE ==============
+# Just enough of Motor's collection API for the queries the backend issues, so
+# database code can be exercised without a running MongoDB.
+
+
+def _get(doc, path):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return None
+        doc = doc[part]
+    return doc
+
+
+def _has(doc, path):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return False
+        doc = doc[part]
+    return True
+
+
+def _compare(value, op, operand):
+    if op == "$eq":
+        return value == operand
+    if op == "$ne":
+        return value != operand
+    if op == "$in":
+        return value in operand
+    if op == "$nin":
+        return value not in operand
+    if value is None or operand is None:
+        return False
+    if op == "$gt":
+        return value > operand
+    if op == "$gte":
+        return value >= operand
+    if op == "$lt":
+        return value < operand
+    if op == "$lte":
+        return value <= operand
+    raise NotImplementedError(op)
+
+
+def matches(doc, query):
+    """Whether `doc` satisfies a find() filter"""
+    for field, condition in (query or {}).items():
+        if field == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif field == "$and":
+            if not all(matches(doc, q) for q in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            for op, operand in condition.items():
+                if op == "$exists":
+                    if _has(doc, field) != bool(operand):
+                        return False
+                elif not _compare(_get(doc, field), op, operand):
+                    return False
+        elif _get(doc, field) != condition:
+            return False
+    return True
+
+
+def project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        out = {k: copy.deepcopy(v) for k, v in doc.items() if k in include}
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return out
+    hidden = {k for k, v in projection.items() if not v}
+    return {k: copy.deepcopy(v) for k, v in doc.items() if k not in hidden}
+
+
+def _sort_key(value):
+    # None sorts first, as in MongoDB
+    return (value is not None, value)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = list(docs)
+        self.consumed = 0
+
+    def sort(self, key, direction=1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            if field == "$natural":
+                if order < 0:
+                    self.docs.reverse()
+                continue
+            self.docs.sort(key=lambda d: _sort_key(_get(d, field)), reverse=order < 0)
+        return self
+
+    def limit(self, n):
+        if n:
+            self.docs = self.docs[:n]
+        return self
+
+    def skip(self, n):
+        self.docs = self.docs[n:]
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    async def to_list(self, length):
+        docs = self.docs if length is None else self.docs[:length]
+        self.consumed += len(docs)
+        return list(docs)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            self.consumed += 1
+            yield doc
+
+
+class FakeCollection:
+    def __init__(self, name, docs=()):
+        self.name = name
+        self.docs = {}
+        self.unique = []
+        self.cursors = []
+        self.calls = Counter()
+        self.seed(*docs)
+
+    def seed(self, *docs):
+        """Insert documents synchronously, for test setup"""
+        for doc in docs:
+            self._insert(dict(doc))
+
+    def _check_unique(self, doc, ignore=None):
+        for fields in self.unique:
+            key = [_get(doc, f) for f in fields]
+            for other in self.docs.values():
+                if other is not ignore and [_get(other, f) for f in fields] == key:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name}", 11000)
+
+    def _insert(self, doc):
+        doc.setdefault("_id", ObjectId())
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name}", 11000)
+        self._check_unique(doc)
+        self.docs[doc["_id"]] = doc
+        return doc
+
+    def _matching(self, query, sort=None):
+        docs = [d for d in self.docs.values() if matches(d, query)]
+        return FakeCursor(docs).sort(sort).docs if sort else docs
+
+    def _apply(self, doc, update, inserting=False):
+        for field, value in update.get("$set", {}).items():
+            doc[field] = copy.deepcopy(value)
+        if inserting:
+            for field, value in update.get("$setOnInsert", {}).items():
+                doc[field] = copy.deepcopy(value)
+        for field, by in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + by
+        for field, value in update.get("$max", {}).items():
+            if field not in doc or value > doc[field]:
+                doc[field] = value
+        for field, value in update.get("$min", {}).items():
+            if field not in doc or value < doc[field]:
+                doc[field] = value
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+
+    def _upsert(self, query, update):
+        doc = {
+            k: v for k, v in query.items()
+            if not k.startswith("$") and not (isinstance(v, dict) and any(op.startswith("$") for op in v))
+        }
+        self._apply(doc, update, inserting=True)
+        return self._insert(doc)
+
+    def _update(self, query, update, upsert, many):
+        matched = self._matching(query)
+        if not many:
+            matched = matched[:1]
+        if not matched:
+            if upsert:
+                doc = self._upsert(query, update)
+                return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+        modified = 0
+        for doc in matched:
+            before = copy.deepcopy(doc)
+            self._apply(doc, update)
+            self._check_unique(doc, ignore=doc)
+            modified += doc != before
+        return SimpleNamespace(matched_count=len(matched), modified_count=modified, upserted_id=None)
+
+    def find(self, query=None, projection=None, sort=None, limit=0, **kwargs):
+        self.calls["find"] += 1
+        cursor = FakeCursor(project(d, projection) for d in self._matching(query, sort))
+        cursor.limit(limit)
+        self.cursors.append(cursor)
+        return cursor
+
+    async def find_one(self, query=None, projection=None, sort=None, **kwargs):
+        self.calls["find_one"] += 1
+        docs = self._matching(query, sort)
+        return project(docs[0], projection) if docs else None
+
+    async def insert_one(self, doc, session=None):
+        self.calls["insert_one"] += 1
+        # Like pymongo, the caller's document gains the generated _id
+        self._insert(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs, ordered=True, session=None):
+        self.calls["insert_many"] += 1
+        inserted, errors = [], []
+        for index, doc in enumerate(docs):
+            try:
+                inserted.append(self._insert(doc)["_id"])
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+        return SimpleNamespace(inserted_ids=inserted)
+
+    async def update_one(self, query, update, upsert=False, session=None):
+        self.calls["update_one"] += 1
+        return self._update(query, update, upsert, many=False)
+
+    async def update_many(self, query, update, upsert=False, session=None):
+        self.calls["update_many"] += 1
+        return self._update(query, update, upsert, many=True)
+
+    async def find_one_and_update(self, query, update, projection=None, sort=None, upsert=False,
+                                  return_document=False, session=None):
+        self.calls["find_one_and_update"] += 1
+        docs = self._matching(query, sort)
+        if docs:
+            before = project(docs[0], projection)
+            self._apply(docs[0], update)
+            return project(docs[0], projection) if return_document else before
+        if upsert:
+            doc = self._upsert(query, update)
+            return project(doc, projection) if return_document else None
+        return None
+
+    async def delete_one(self, query, session=None):
+        self.calls["delete_one"] += 1
+        docs = self._matching(query)[:1]
+        for doc in docs:
+            del self.docs[doc["_id"]]
+        return SimpleNamespace(deleted_count=len(docs))
+
+    async def delete_many(self, query, session=None):
+        self.calls["delete_many"] += 1
+        docs = self._matching(query)
+        for doc in docs:
+            del self.docs[doc["_id"]]
+        return SimpleNamespace(deleted_count=len(docs))
+
+    async def bulk_write(self, requests, ordered=True, session=None):
+        self.calls["bulk_write"] += 1
+        totals = Counter()
+        upserted_ids = {}
+        for index, op in enumerate(requests):
+            if isinstance(op, InsertOne):
+                self._insert(op._doc)
+                totals["inserted"] += 1
+            elif isinstance(op, (UpdateOne, UpdateMany)):
+                result = self._update(op._filter, op._doc, op._upsert, many=isinstance(op, UpdateMany))
+                totals["matched"] += result.matched_count
+                totals["modified"] += result.modified_count
+                if result.upserted_id is not None:
+                    upserted_ids[index] = result.upserted_id
+            elif isinstance(op, DeleteOne):
+                totals["deleted"] += (await self.delete_one(op._filter)).deleted_count
+            elif isinstance(op, DeleteMany):
+                totals["deleted"] += (await self.delete_many(op._filter)).deleted_count
+            else:
+                raise NotImplementedError(type(op).__name__)
+        return SimpleNamespace(
+            inserted_count=totals["inserted"], matched_count=totals["matched"],
+            modified_count=totals["modified"], deleted_count=totals["deleted"],
+            upserted_count=len(upserted_ids), upserted_ids=upserted_ids,
+        )
+
+    async def distinct(self, key, query=None, session=None):
+        self.calls["distinct"] += 1
+        values = []
+        for doc in self._matching(query):
+            value = _get(doc, key)
+            if value is not None and value not in values:
+                values.append(value)
+        return values
+
+    async def count_documents(self, query, **kwargs):
+        self.calls["count_documents"] += 1
+        return len(self._matching(query))
+
+    async def estimated_document_count(self):
+        self.calls["estimated_document_count"] += 1
+        return len(self.docs)
+
+    async def create_index(self, keys, unique=False, **kwargs):
+        keys = [keys] if isinstance(keys, str) else keys
+        fields = tuple(k if isinstance(k, str) else k[0] for k in keys)
+        if unique and fields != ("_id",):
+            self.unique.append(fields)
+        return "_".join(fields)
+
+
+class FakeSession:
+    """Client session whose transactions roll the database back if their body raises"""
+
+    def __init__(self, db):
+        self.db = db
+        self.transactions = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @contextlib.asynccontextmanager
+    async def start_transaction(self):
+        self.transactions += 1
+        snapshot = {name: copy.deepcopy(c.docs) for name, c in self.db._collections.items()}
+        try:
+            yield
+        except BaseException:
+            for name, collection in list(self.db._collections.items()):
+                collection.docs = snapshot.get(name, {})
+            raise
+
+
+class FakeClient:
+    def __init__(self, db):
+        self.db = db
+        self.sessions = []
+
+    async def start_session(self):
+        session = FakeSession(self.db)
+        self.sessions.append(session)
+        return session
+
+
+class FakeDb:
+    """Collections are created on first use, as in MongoDB; seed them with lists of documents"""
+
+    def __init__(self, **collections):
+        self._collections = {}
+        self.commands = []
+        for name, docs in collections.items():
+            self._collections[name] = FakeCollection(name, docs)
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name)
+        return self._collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __setitem__(self, name, collection):
+        self._collections[name] = collection
+
+    async def command(self, command, **kwargs):
+        self.commands.append(command)
+        return {"ok": 1.0}
+
+    async def list_collection_names(self):
+        return list(self._collections)
+
+    async def create_collection(self, name, **options):
+        return self[name]
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """TestClient on a fresh app whose database handles all point at one FakeDb (as `api.db`)"""
+    import server
+    from fastapi.testclient import TestClient
+
+    db = FakeDb()
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "content_db", db)
+    monkeypatch.setattr(server, "client", FakeClient(db))
+    monkeypatch.setattr(server.revocations, "db", db)
+    monkeypatch.setattr(server.invalidation_bus, "db", db)
+    monkeypatch.setattr(server.invalidation_bus, "versions", OrderedDict())
+    for cache in server.invalidation_bus.caches:
+        cache.clear()
+    # No lifespan: nothing connects to MongoDB or starts background jobs
+    client = TestClient(server.create_app())
+    client.db = db
+    return client
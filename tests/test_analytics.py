@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import analytics
+from tests.conftest import FakeDb
+
+
+def _checkin(user, date, signal="normal", category="B"):
+    return {"user_id": user, "date": date, "signal": signal, "base_category": category}
+
+
+def _load(docs, monkeypatch, batch=2):
+    monkeypatch.setattr(analytics, "CURSOR_BATCH_SIZE", batch)
+    return asyncio.run(analytics.load_checkins(FakeDb(daily_checkins=docs)))
+
+
+def test_weekly_retention_by_first_week_cohort(monkeypatch):
+    # Mondays: 2025-01-06, 2025-01-13, 2025-01-20
+    data = _load([
+        _checkin("a", "2025-01-06"), _checkin("a", "2025-01-14"), _checkin("a", "2025-01-22"),
+        _checkin("b", "2025-01-07"), _checkin("b", "2025-01-08"),
+        _checkin("c", "2025-01-15"), _checkin("c", "2025-01-21"),
+    ], monkeypatch)
+    cohorts = analytics.weekly_retention(data, max_weeks=4)["cohorts"]
+    assert cohorts == [
+        {"cohort_week": "2025-01-06", "users": 2, "retention": [1.0, 0.5, 0.5]},
+        {"cohort_week": "2025-01-13", "users": 1, "retention": [1.0, 1.0]},
+    ]
+
+
+def test_signal_trends_count_pairs_per_week(monkeypatch):
+    data = _load([
+        _checkin("a", "2025-01-06", "stressed", "A"), _checkin("b", "2025-01-07", "stressed", "A"),
+        _checkin("a", "2025-01-14", "cravings", "S"),
+    ], monkeypatch)
+    trends = analytics.signal_trends(data)
+    assert trends["weeks"] == ["2025-01-06", "2025-01-13"]
+    assert trends["series"] == [
+        {"signal": "stressed", "base_category": "A", "total": 2, "counts": [2, 0]},
+        {"signal": "cravings", "base_category": "S", "total": 1, "counts": [0, 1]},
+    ]
+
+
+def test_streaks_ignore_duplicate_days_and_break_on_gaps(monkeypatch):
+    data = _load([
+        _checkin("a", "2025-01-01"), _checkin("a", "2025-01-02"), _checkin("a", "2025-01-02"),
+        _checkin("a", "2025-01-03"), _checkin("a", "2025-01-09"), _checkin("a", "2025-01-10"),
+        _checkin("b", "2025-01-09"),
+    ], monkeypatch)
+    today = int(analytics.np.datetime64("2025-01-10", "D").astype(int))
+    streaks = analytics.streak_distribution(data, today=today)
+    assert streaks["longest"] == [{"days": 1, "users": 1}, {"days": 3, "users": 1}]
+    # b's last check-in was yesterday, so the streak is still alive
+    assert streaks["current"] == [{"days": 1, "users": 1}, {"days": 2, "users": 1}]
+
+
+def test_empty_collection():
+    data = asyncio.run(analytics.load_checkins(FakeDb()))
+    assert analytics.weekly_retention(data)["cohorts"] == []
+    assert analytics.signal_trends(data)["series"] == []
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import archive
+from tests.conftest import FakeDb
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path)
+    return tmp_path
+
+
+def _checkins():
+    return [
+        {"_id": i, "check_in_id": f"checkin_{i}", "user_id": f"user_{i % 3}", "date": f"2025-0{1 + i % 3}-{10 + i:02d}",
+         "signal": "normal", "base_category": "B", "created_at": "2025-01-01T00:00:00+00:00"}
+        for i in range(12)
+    ]
+
+
+def test_batches_are_partitioned_by_month(archive_dir):
+    files = archive._write_batch("daily_checkins", _checkins())
+    assert sorted(p.parent.name for p in files) == ["month=2025-01", "month=2025-02", "month=2025-03"]
+
+
+def test_read_archive_filters_by_date_range_and_user():
+    archive._write_batch("daily_checkins", _checkins())
+    frame = archive.read_archive("daily_checkins", start="2025-02-01", end="2025-03-01", filters={"user_id": "user_1"})
+    assert list(frame["check_in_id"]) == ["checkin_1", "checkin_4", "checkin_7", "checkin_10"]
+    assert "_id" not in frame.columns
+
+
+def test_read_archive_without_files_is_empty():
+    assert archive.read_archive("payment_transactions").empty
+
+
+def test_rerunning_an_interrupted_archive_does_not_duplicate_rows(archive_dir, monkeypatch):
+    db = FakeDb(daily_checkins=_checkins())
+
+    async def lost_delete(query, session=None):
+        raise ConnectionError("connection reset")
+
+    # The first run writes its files but dies before removing the rows
+    monkeypatch.setattr(db.daily_checkins, "delete_many", lost_delete)
+    with pytest.raises(ConnectionError):
+        asyncio.run(archive.archive_collection(db, "daily_checkins", "2026-01-01", batch_size=4))
+    monkeypatch.undo()
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", archive_dir)
+
+    result = asyncio.run(archive.archive_collection(db, "daily_checkins", "2026-01-01", batch_size=4))
+    assert result["archived"] == 12 and not db.daily_checkins.docs
+    frame = archive.read_archive("daily_checkins")
+    assert sorted(frame["check_in_id"]) == sorted(row["check_in_id"] for row in _checkins())
+
+
+def test_read_archive_stops_at_the_limit():
+    archive._write_batch("daily_checkins", _checkins())
+    assert len(archive.read_archive("daily_checkins", filters={"user_id": "user_1"}, limit=2)) == 2
+    assert archive.count_archive("daily_checkins", filters={"user_id": "user_1"}) == 4
+    assert archive.count_archive("payment_transactions") == 0
+
+
+def test_archive_query_limit_is_capped(api):
+    assert api.get("/api/admin/archive/daily_checkins", params={"limit": 100000}).status_code == 422
@@ -0,0 +1,141 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from revocation import RevocationList
+import server
+
+
+def _user(api, user_id="u1", role="user", subscribed=False):
+    api.db.users.seed({"user_id": user_id, "email": f"{user_id}@example.com", "name": "Ann", "role": role,
+                       "password_hash": server.hash_password("pw-1")})
+    if subscribed:
+        api.db.subscriptions.seed({"user_id": user_id, "status": "active"})
+
+
+def _login(api, user_id="u1"):
+    response = api.post("/api/auth/login", json={"email": f"{user_id}@example.com", "password": "pw-1"})
+    assert response.status_code == 200
+    return response.json()
+
+
+def _bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _refresh(api, refresh_token):
+    return api.post("/api/auth/refresh", json={"refresh_token": refresh_token})
+
+
+def test_refresh_rotates_tokens_within_one_family(api):
+    _user(api)
+    first = _login(api)
+    second = _refresh(api, first["refresh_token"])
+    assert second.status_code == 200
+    second = second.json()
+    assert second["refresh_token"] != first["refresh_token"] and second["user"]["user_id"] == "u1"
+    assert api.get("/api/auth/me", headers=_bearer(second["token"])).status_code == 200
+    families = {doc["family_id"] for doc in api.db.refresh_tokens.docs.values()}
+    assert len(families) == 1
+
+
+def test_reusing_a_rotated_refresh_token_revokes_the_family(api):
+    _user(api)
+    first = _login(api)
+    second = _refresh(api, first["refresh_token"]).json()
+    # The old token was stolen and replayed: neither it nor its successor works any more
+    assert _refresh(api, first["refresh_token"]).status_code == 401
+    assert _refresh(api, second["refresh_token"]).status_code == 401
+    assert not api.db.refresh_tokens.docs
+
+
+def test_expired_refresh_tokens_are_rejected(api):
+    _user(api)
+    tokens = _login(api)
+    for doc in api.db.refresh_tokens.docs.values():
+        doc["expires_at"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+    assert _refresh(api, tokens["refresh_token"]).status_code == 401
+    assert _refresh(api, "never-issued").status_code == 401
+
+
+def test_subscription_claims_are_trusted_without_a_lookup(api):
+    _user(api, subscribed=True)
+    token = server.create_jwt_token("u1", subscription_status="active")
+    assert api.get("/api/checkin/today", headers=_bearer(token)).status_code == 200
+    assert api.db.subscriptions.calls["find"] == 0
+
+
+def test_missing_subscription_claim_is_checked_before_refusing(api):
+    _user(api)
+    token = server.create_jwt_token("u1")
+    assert api.get("/api/checkin/today", headers=_bearer(token)).status_code == 403
+    # Paid after the token was issued
+    api.db.subscriptions.seed({"user_id": "u1", "status": "active"})
+    assert api.get("/api/checkin/today", headers=_bearer(token)).status_code == 200
+
+
+def test_admin_routes_follow_the_role_claim(api):
+    _user(api, user_id="a1", role="admin")
+    admin = api.get("/api/admin/reconciler", headers=_bearer(server.create_jwt_token("a1", role="admin")))
+    assert admin.json() == {"enabled": False}
+    member = api.get("/api/admin/reconciler", headers=_bearer(server.create_jwt_token("a1", role="user")))
+    assert member.status_code == 403
+
+
+def test_stale_entitlement_claims_defer_to_the_database(api):
+    _user(api, subscribed=True)
+    token = server.create_jwt_token("u1", subscription_status="active", entitlement_version=0)
+    # The subscription ends; claims issued before that are no longer trusted
+    for doc in api.db.subscriptions.docs.values():
+        doc["status"] = "cancelled"
+    asyncio.run(server.entitlement_changed("u1"))
+    assert api.get("/api/checkin/today", headers=_bearer(token)).status_code == 403
+    # The token still identifies the user, so the client can carry on and refresh
+    assert api.get("/api/auth/me", headers=_bearer(token)).json()["has_subscription"] is False
+
+    fresh = _login(api)
+    assert server.decode_jwt_token(fresh["token"])["ent_v"] == 1
+    assert api.get("/api/auth/me", headers=_bearer(fresh["token"])).status_code == 200
+
+
+def test_workers_that_missed_the_change_read_the_authoritative_version(api):
+    _user(api)
+    token = server.create_jwt_token("u1", subscription_status="active", entitlement_version=0)
+    asyncio.run(server.entitlement_changed("u1"))
+    # A worker started after the change has never seen its message
+    server.invalidation_bus.versions.clear()
+    assert api.get("/api/checkin/today", headers=_bearer(token)).status_code == 403
+    assert server.invalidation_bus.version(server.entitlement_key("u1")) == 1
+
+
+def test_logout_revokes_the_access_token_and_its_refresh_family(api):
+    _user(api)
+    first = _login(api)
+    second = _refresh(api, first["refresh_token"]).json()
+    assert api.get("/api/auth/me", headers=_bearer(second["token"])).status_code == 200
+
+    response = api.post("/api/auth/logout", headers=_bearer(second["token"]),
+                        json={"refresh_token": second["refresh_token"]})
+    assert response.status_code == 200
+    assert api.get("/api/auth/me", headers=_bearer(second["token"])).status_code == 401
+    assert _refresh(api, second["refresh_token"]).status_code == 401
+    assert not api.db.refresh_tokens.docs
+
+
+def test_other_workers_see_a_logout_after_refreshing(api):
+    _user(api)
+    token = _login(api)["token"]
+    jti = server.decode_jwt_token(token)["jti"]
+    other = RevocationList(capacity=1000, fp_rate=0.001)
+    other.db = api.db
+    asyncio.run(other.rebuild())
+
+    api.post("/api/auth/logout", headers=_bearer(token))
+    assert not asyncio.run(other.is_revoked(jti))
+    asyncio.run(other.refresh())
+    assert asyncio.run(other.is_revoked(jti))
+
+    # A worker starting afresh loads it with the rest
+    late = RevocationList(capacity=1000, fp_rate=0.001)
+    late.db = api.db
+    asyncio.run(late.rebuild())
+    assert asyncio.run(late.is_revoked(jti))
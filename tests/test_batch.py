@@ -0,0 +1,115 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+from starlette.requests import Request
+
+import server
+from batch import is_batchable, run_batch
+
+
+def test_only_allowlisted_routes_can_be_batched():
+    assert is_batchable("GET", "/api/auth/me")
+    assert is_batchable("GET", "/api/triggers/stress?limit=3")
+    assert is_batchable("POST", "/api/checkin")
+    assert not is_batchable("POST", "/api/auth/me")
+    assert not is_batchable("POST", "/api/auth/login")
+    assert not is_batchable("POST", "/api/auth/refresh")
+    assert not is_batchable("GET", "/api/admin/stats")
+    assert not is_batchable("POST", "/api/admin/content/batch")
+    assert not is_batchable("POST", "/api/batch")
+    assert not is_batchable("GET", "/api/triggers/stress/extra")
+
+
+class RecordingApp:
+    """ASGI app that logs when each sub-request starts and ends; /fail raises"""
+
+    def __init__(self):
+        self.events = []
+
+    async def __call__(self, scope, receive, send):
+        path = scope["path"]
+        self.events.append(("start", scope["method"], path))
+        await asyncio.sleep(0.01)
+        if path == "/fail":
+            raise RuntimeError("boom")
+        scope["state"].setdefault("seen", []).append(path)
+        body = json.dumps({"path": path, "user": scope["state"].get("user")}).encode()
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+        self.events.append(("end", scope["method"], path))
+
+
+def _parent(state=None):
+    return Request({"type": "http", "method": "POST", "path": "/api/batch", "headers": [],
+                    "state": state if state is not None else {}})
+
+
+def test_writes_are_barriers_and_results_keep_request_order():
+    app = RecordingApp()
+    items = [("GET", "/a", None), ("GET", "/b", None), ("POST", "/c", {"x": 1}), ("GET", "/d", None)]
+    results = asyncio.run(run_batch(app, _parent(), items))
+
+    assert [r["body"]["path"] for r in results] == ["/a", "/b", "/c", "/d"]
+    order = [(kind, path) for kind, _, path in app.events]
+    # The two reads overlap, the write waits for both, and the last read waits for the write
+    assert order[:2] == [("start", "/a"), ("start", "/b")]
+    assert order.index(("start", "/c")) > max(order.index(("end", "/a")), order.index(("end", "/b")))
+    assert order.index(("start", "/d")) > order.index(("end", "/c"))
+
+
+def test_sub_requests_share_the_batch_state():
+    state = {"user": {"user_id": "u1"}}
+    results = asyncio.run(run_batch(RecordingApp(), _parent(state), [("GET", "/a", None), ("GET", "/b", None)]))
+    assert [r["body"]["user"] for r in results] == [{"user_id": "u1"}] * 2
+    assert sorted(state["seen"]) == ["/a", "/b"]
+
+
+def test_one_failing_sub_request_does_not_fail_the_others():
+    items = [("GET", "/a", None), ("GET", "/fail", None), ("POST", "/c", None)]
+    results = asyncio.run(run_batch(RecordingApp(), _parent(), items))
+    assert [r["status"] for r in results] == [200, 500, 200]
+
+
+def _session(api, subscribed=False):
+    api.db.users.seed({"user_id": "u1", "email": "u1@example.com", "name": "Ann", "role": "user"})
+    if subscribed:
+        api.db.subscriptions.seed({"user_id": "u1", "status": "active"})
+    expires_at = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    api.db.user_sessions.seed({"user_id": "u1", "session_token": "session-1", "expires_at": expires_at})
+    api.cookies.set("session_token", "session-1")
+
+
+def test_batch_endpoint_authenticates_once_for_all_sub_requests(api):
+    _session(api, subscribed=True)
+    response = api.post("/api/batch", json={"requests": [
+        {"path": "/api/auth/me"}, {"path": "/api/subscription/status"}, {"path": "/api/bootstrap"},
+    ]})
+    assert [r["status"] for r in response.json()["responses"]] == [200, 200, 200]
+    assert api.db.user_sessions.calls["find_one"] == 1
+
+
+def test_batch_endpoint_reports_sub_request_errors_in_place(api):
+    _session(api, subscribed=False)
+    response = api.post("/api/batch", json={"requests": [
+        {"path": "/api/checkin/today"}, {"path": "/api/auth/me"},
+    ]})
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()["responses"]] == [403, 200]
+
+
+def test_batch_endpoint_rejects_unlisted_routes_and_oversized_batches(api, monkeypatch):
+    _session(api)
+    response = api.post("/api/batch", json={"requests": [{"method": "GET", "path": "/api/admin/stats"}]})
+    assert response.status_code == 400
+    monkeypatch.setattr(server, "BATCH_MAX_REQUESTS", 2)
+    response = api.post("/api/batch", json={"requests": [{"path": "/api/auth/me"}] * 3})
+    assert response.status_code == 400
+    # Nothing ran, not even authentication
+    assert api.db.user_sessions.calls["find_one"] == 0
+
+
+def test_batch_endpoint_requires_authentication(api):
+    response = api.post("/api/batch", json={"requests": [{"path": "/api/auth/me"}]})
+    assert response.status_code == 401
@@ -0,0 +1,37 @@
+import server
+
+TRIGGER = {
+    "trigger_id": "trigger_1", "trigger_type": "stress", "title": "Stressed", "immediate_action": "Breathe",
+    "explanation": "Cortisol", "body_truth": "It passes", "verse": "Be still", "verse_ref": "Psalm 46:10",
+}
+
+
+def _seed(api, user_id, subscribed):
+    api.db.users.seed({"user_id": user_id, "email": f"{user_id}@example.com", "name": "Ann", "password_hash": "x"})
+    if subscribed:
+        api.db.subscriptions.seed({"user_id": user_id, "status": "active"})
+    api.db.trigger_cards.seed(TRIGGER)
+    token = server.create_jwt_token(user_id, subscription_status="active" if subscribed else None)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_bootstrap_for_a_subscriber(api):
+    headers = _seed(api, "user_sub", subscribed=True)
+    payload = api.get("/api/bootstrap", headers=headers).json()
+    assert payload["user"]["user_id"] == "user_sub" and payload["user"]["has_subscription"]
+    assert payload["user"]["email"] == "user_sub@example.com"
+    assert payload["checkin"] == {"has_checkin": False}
+    assert [t["trigger_id"] for t in payload["triggers"]] == ["trigger_1"]
+
+
+def test_bootstrap_skips_subscriber_data_for_everyone_else(api):
+    headers = _seed(api, "user_free", subscribed=False)
+    payload = api.get("/api/bootstrap", headers=headers).json()
+    assert payload["user"]["user_id"] == "user_free" and not payload["user"]["has_subscription"]
+    assert payload["checkin"] is None and payload["triggers"] is None
+    assert api.db.daily_checkins.calls["find_one"] == 0
+    assert api.db.trigger_cards.calls["find"] == 0
+
+
+def test_bootstrap_requires_authentication(api):
+    assert api.get("/api/bootstrap").status_code == 401
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import changelog
+from tests.conftest import FakeDb
+
+
+def _entry(seq, op="upsert", age=60, doc_id=None):
+    entry = {"seq": seq, "collection": "verses", "doc_id": doc_id or f"verse_{seq}", "op": op,
+             "at": datetime.now(timezone.utc) - timedelta(seconds=age)}
+    if op == "upsert":
+        entry["doc"] = {"verse_id": entry["doc_id"]}
+    return entry
+
+
+def make_db(entries, seq, floor=0):
+    return FakeDb(
+        content_changes=entries,
+        counters=[{"_id": changelog.COUNTER_ID, "seq": seq, "floor": floor}],
+    )
+
+
+def _changes(db, since, limit=500):
+    return asyncio.run(changelog.changes_since(db, since, limit))
+
+
+def test_recent_entries_are_held_back():
+    db = make_db([_entry(1), _entry(2), _entry(3, age=1), _entry(4)], seq=4)
+    result = _changes(db, 0)
+    assert [c["seq"] for c in result["changes"]] == [1, 2]
+    assert result["next"] == 2 and result["has_more"]
+
+
+def test_deltas_include_tombstones_but_snapshots_do_not():
+    db = make_db([_entry(5), _entry(6), _entry(7, op="delete", doc_id="verse_5")], seq=7)
+    assert [(c["seq"], c["op"]) for c in _changes(db, 4)["changes"]] == [
+        (5, "upsert"), (6, "upsert"), (7, "delete")
+    ]
+    snapshot = _changes(db, 0)
+    # verse_5 was deleted, so a fresh client never sees it
+    assert [c["id"] for c in snapshot["changes"]] == ["verse_6"]
+    assert snapshot["next"] == 7 and not snapshot["has_more"]
+
+
+def test_snapshot_keeps_documents_recreated_after_a_delete():
+    db = make_db([
+        _entry(1, doc_id="verse_1"), _entry(2, op="delete", doc_id="verse_1"), _entry(3, doc_id="verse_1"),
+    ], seq=3)
+    assert [(c["seq"], c["op"]) for c in _changes(db, 0)["changes"]] == [(3, "upsert")]
+
+
+def test_clients_behind_compacted_tombstones_must_reset():
+    db = make_db([_entry(9)], seq=9, floor=8)
+    assert _changes(db, 3)["reset"]
+    assert not _changes(db, 8)["reset"]
+    assert not _changes(db, 0)["reset"]
+
+
+def test_paging_respects_limit():
+    db = make_db([_entry(i) for i in range(1, 6)], seq=5)
+    first = _changes(db, 0, limit=2)
+    assert [c["seq"] for c in first["changes"]] == [1, 2] and first["has_more"]
+    assert [c["seq"] for c in _changes(db, first["next"], limit=2)["changes"]] == [3, 4]
@@ -0,0 +1,156 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import outbound
+import server
+
+
+class APIConnectionError(Exception):
+    """Shaped like stripe.error.APIConnectionError"""
+
+
+class InvalidRequestError(Exception):
+    """Shaped like stripe.error.InvalidRequestError, which carries the HTTP status"""
+
+    def __init__(self, message, http_status):
+        super().__init__(message)
+        self.http_status = http_status
+
+
+@pytest.fixture
+def stripe_api(monkeypatch):
+    dependency = outbound.Dependency("stripe", outbound.Policy(timeout=1.0, deadline=5.0, retries=2, backoff=0.01))
+    monkeypatch.setattr(server, "stripe_api", dependency)
+    return dependency
+
+
+def _failing(*errors):
+    script = list(errors)
+
+    async def call():
+        if script:
+            raise script.pop(0)
+        return "ok"
+    return call
+
+
+def test_stripe_outages_are_retried_as_upstream_failures(stripe_api):
+    call = _failing(APIConnectionError("reset"), InvalidRequestError("busy", 503))
+    assert asyncio.run(server.call_stripe(call)) == "ok"
+    assert stripe_api.metrics["retries"] == 2
+
+    with pytest.raises(outbound.DependencyUnavailable):
+        asyncio.run(server.call_stripe(_failing(APIConnectionError("reset")), retries=0))
+
+
+def test_stripe_rejections_are_raised_unchanged(stripe_api):
+    with pytest.raises(InvalidRequestError):
+        asyncio.run(server.call_stripe(_failing(InvalidRequestError("no such session", 404))))
+    assert stripe_api.metrics["retries"] == 0
+    assert stripe_api.breaker.state == outbound.CLOSED
+
+
+def test_stripe_calls_run_off_the_event_loop(stripe_api):
+    async def call():
+        return threading.current_thread() is threading.main_thread()
+
+    assert asyncio.run(server.call_stripe(call)) is False
+
+
+class FakeStripeCheckout:
+    """StripeCheckout stand-in that counts the sessions it opens"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = []
+
+    async def create_checkout_session(self, request):
+        await asyncio.sleep(self.delay)
+        self.requests.append(request)
+        number = len(self.requests)
+        return SimpleNamespace(session_id=f"cs_{number}", url=f"https://stripe.test/cs_{number}")
+
+
+@pytest.fixture
+def stripe_checkout(api, stripe_api, monkeypatch):
+    checkout = FakeStripeCheckout(delay=0.2)
+    monkeypatch.setattr(server, "get_stripe_checkout", lambda base_url, webhook_secret=None: checkout)
+    monkeypatch.setattr(server, "stripe_checkout_module",
+                        lambda: SimpleNamespace(CheckoutSessionRequest=lambda **fields: SimpleNamespace(**fields)))
+    api.db.users.seed({"user_id": "u1", "email": "u1@example.com", "name": "Ann", "role": "user"})
+    return checkout
+
+
+def _create(api, origin="https://app.test"):
+    token = server.create_jwt_token("u1", email="u1@example.com")
+    response = api.post("/api/checkout/session", json={"origin_url": origin},
+                        headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_pending_session_is_reused_within_the_window(api, stripe_checkout):
+    first = _create(api)
+    assert _create(api) == first
+    assert len(stripe_checkout.requests) == 1
+    assert len(api.db.payment_transactions.docs) == 1
+
+
+def test_concurrent_creates_share_one_stripe_call(api, stripe_checkout):
+    token = server.create_jwt_token("u1", email="u1@example.com")
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/api/checkout/session", json={"origin_url": "https://app.test"},
+                            headers={"Authorization": f"Bearer {token}"})
+                for _ in range(5)
+            ))
+
+    responses = asyncio.run(scenario())
+    assert {response.json()["session_id"] for response in responses} == {"cs_1"}
+    assert len(stripe_checkout.requests) == 1
+
+
+def test_new_session_after_the_window_or_for_another_origin(api, stripe_checkout):
+    first = _create(api)
+    assert _create(api, origin="https://other.test") != first
+    for doc in api.db.payment_transactions.docs.values():
+        doc["created_at"] = (datetime.now(timezone.utc) - server.CHECKOUT_REUSE_WINDOW - timedelta(minutes=1)).isoformat()
+    assert _create(api)["session_id"] == "cs_3"
+    assert len(stripe_checkout.requests) == 3
+
+
+def _webhook(api, monkeypatch, session_id):
+    class Webhook:
+        async def handle_webhook(self, body, signature):
+            return SimpleNamespace(session_id=session_id, payment_status="paid",
+                                   metadata={"user_id": "u1", "user_email": "u1@example.com"})
+
+    monkeypatch.setattr(server, "get_stripe_checkout", lambda base_url, webhook_secret=None: Webhook())
+    return api.post("/api/webhook/stripe", content=b"{}", headers={"Stripe-Signature": "t=1,v1=sig"})
+
+
+def test_webhook_marks_the_transaction_paid(api, monkeypatch):
+    api.db.payment_transactions.seed({"session_id": "cs_1", "user_id": "u1", "payment_status": "pending",
+                                      "created_at": "2025-01-01T00:00:00+00:00"})
+    assert _webhook(api, monkeypatch, "cs_1").json() == {"received": True}
+    [txn] = api.db.payment_transactions.docs.values()
+    assert txn["payment_status"] == "paid"
+    [subscription] = api.db.subscriptions.docs.values()
+    assert subscription["status"] == "active"
+    assert server.invalidation_bus.version(server.entitlement_key("u1")) == 1
+
+
+def test_webhook_for_an_already_applied_payment_changes_nothing(api, monkeypatch):
+    api.db.payment_transactions.seed({"session_id": "cs_1", "user_id": "u1", "payment_status": "paid",
+                                      "created_at": "2025-01-01T00:00:00+00:00"})
+    _webhook(api, monkeypatch, "cs_1")
+    assert not api.db.subscriptions.docs
+    assert server.invalidation_bus.version(server.entitlement_key("u1")) == 0
@@ -0,0 +1,51 @@
+import asyncio
+import gzip
+import threading
+
+import compression
+from compression import PrecompressedBody, negotiate
+
+
+def test_negotiate_prefers_brotli_and_honours_q_values():
+    available = {"br": b"", "gzip": b""}
+    assert negotiate("gzip, deflate, br", available) == "br"
+    assert negotiate("br;q=0, gzip", available) == "gzip"
+    assert negotiate("*", available) == "br"
+    assert negotiate("identity", available) is None
+    assert negotiate("", available) is None
+    assert negotiate("br, gzip", {"gzip": b""}) == "gzip"
+
+
+def test_small_bodies_stay_uncompressed():
+    response = PrecompressedBody({"ok": True}).response("gzip")
+    assert "content-encoding" not in response.headers
+    assert response.body == b'{"ok":true}'
+
+
+def test_large_bodies_are_compressed_once():
+    docs = [{"explanation": "Stress triggers cortisol. " * 20, "n": i} for i in range(20)]
+    body = PrecompressedBody(docs)
+    response = body.response("gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.body) == body.identity
+    assert len(response.body) < len(body.identity)
+
+
+def test_build_compresses_off_the_event_loop(monkeypatch):
+    threads = []
+    real_compress = compression._compress
+
+    def recording_compress(body):
+        threads.append(threading.get_ident())
+        return real_compress(body)
+
+    monkeypatch.setattr(compression, "_compress", recording_compress)
+    docs = [{"explanation": "Stress triggers cortisol. " * 20, "n": i} for i in range(20)]
+
+    async def build():
+        return await PrecompressedBody.build(docs), threading.get_ident()
+
+    body, loop_thread = asyncio.run(build())
+    assert threads and threads[0] != loop_thread
+    assert gzip.decompress(body.encodings["gzip"]) == body.identity
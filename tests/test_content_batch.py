@@ -0,0 +1,123 @@
+import pytest
+from fastapi import HTTPException
+from pymongo import DeleteOne, InsertOne, UpdateOne
+
+import server
+from server import ContentOperation
+
+
+def _plan(*operations):
+    return server.plan_content_batch([ContentOperation(**op) for op in operations])
+
+
+def test_operations_are_grouped_into_one_bulk_write_per_collection():
+    plans = _plan(
+        {"op": "create", "collection": "verses", "fields": {"verse_text": "t", "verse_ref": "r", "category": "B"}},
+        {"op": "update", "collection": "baseline_actions", "id": "action_b1", "fields": {"base_category": "A"}},
+        {"op": "delete", "collection": "verses", "id": "verse_b1"},
+    )
+    assert set(plans) == {"verses", "baseline_actions"}
+    assert [type(w) for w in plans["verses"]["writes"]] == [InsertOne, DeleteOne]
+    [update] = plans["baseline_actions"]["writes"]
+    assert isinstance(update, UpdateOne)
+    assert plans["baseline_actions"]["referenced"] == {"action_b1"}
+    assert plans["verses"]["created"][0]["verse_id"].startswith("verse_")
+
+
+def test_invalid_operations_reject_the_whole_batch():
+    with pytest.raises(HTTPException) as error:
+        _plan(
+            {"op": "create", "collection": "verses", "fields": {"verse_text": "missing ref and category"}},
+            {"op": "update", "collection": "trigger_cards", "id": "t1", "fields": {"colour": "red"}},
+            {"op": "update", "collection": "trigger_cards", "id": "t1", "fields": {"title": None}},
+            {"op": "delete", "collection": "trigger_cards"},
+            {"op": "delete", "collection": "users", "id": "user_1"},
+            {"op": "update", "collection": "verses", "id": "verse_b1", "fields": {"verse_ref": "ok"}},
+        )
+    assert error.value.status_code == 422
+    assert [e["index"] for e in error.value.detail] == [0, 1, 2, 3, 4]
+
+
+VERSE = {"verse_text": "Be still", "verse_ref": "Psalm 46:10", "category": "B"}
+
+
+def _admin(api):
+    return {"Authorization": f"Bearer {server.create_jwt_token('admin_1', role='admin')}"}
+
+
+def _seed_verses(api):
+    api.db.verses.seed({"verse_id": "verse_1", **VERSE}, {"verse_id": "verse_2", **VERSE})
+    api.db.trigger_cards.seed({"trigger_id": "trigger_1", "title": "Stressed"})
+
+
+def test_batch_applies_mixed_operations_in_one_transaction(api):
+    _seed_verses(api)
+    response = api.post("/api/admin/content/batch", headers=_admin(api), json={"operations": [
+        {"op": "create", "collection": "verses", "fields": {**VERSE, "verse_ref": "John 1:1"}},
+        {"op": "update", "collection": "verses", "id": "verse_1", "fields": {"category": "A"}},
+        {"op": "delete", "collection": "verses", "id": "verse_2"},
+        {"op": "delete", "collection": "verses", "id": "verse_2"},
+        {"op": "update", "collection": "trigger_cards", "id": "trigger_1", "fields": {"title": "Calm"}},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    [created_id] = body["created"]["verses"]
+    assert (body["updated"], body["deleted"]) == (2, 1)
+
+    verses = {d["verse_id"]: d for d in api.db.verses.docs.values()}
+    assert set(verses) == {"verse_1", created_id} and verses["verse_1"]["category"] == "A"
+    assert [s.transactions for s in server.client.sessions] == [1]
+
+    changes = [(c["collection"], c["op"], c["doc_id"]) for c in api.db.content_changes.docs.values()]
+    assert sorted(changes) == sorted([
+        ("verses", "upsert", created_id), ("verses", "upsert", "verse_1"), ("verses", "delete", "verse_2"),
+        ("trigger_cards", "upsert", "trigger_1"),
+    ])
+    # One version bump per touched collection, in a single broadcast message
+    assert len(api.db.cache_invalidations.docs) == 1
+    versions = {d["_id"]: d["version"] for d in api.db.cache_versions.docs.values()}
+    assert versions == {"content:verses": 1, "content:trigger_cards": 1}
+
+
+def test_batch_with_missing_ids_writes_nothing(api):
+    _seed_verses(api)
+    response = api.post("/api/admin/content/batch", headers=_admin(api), json={"operations": [
+        {"op": "create", "collection": "verses", "fields": VERSE},
+        {"op": "update", "collection": "verses", "id": "verse_1", "fields": {"category": "A"}},
+        {"op": "delete", "collection": "verses", "id": "verse_gone"},
+    ]})
+    assert response.status_code == 404
+    assert response.json()["detail"]["missing"] == [{"collection": "verses", "id": "verse_gone"}]
+    assert {d["verse_id"]: d["category"] for d in api.db.verses.docs.values()} == {"verse_1": "B", "verse_2": "B"}
+    assert not api.db.content_changes.docs and not api.db.cache_versions.docs
+
+
+def test_batch_requires_an_admin(api):
+    token = server.create_jwt_token("user_1")
+    response = api.post("/api/admin/content/batch", headers={"Authorization": f"Bearer {token}"},
+                        json={"operations": [{"op": "delete", "collection": "verses", "id": "verse_1"}]})
+    assert response.status_code == 403
+
+
+def test_change_log_failure_rolls_the_writes_back(api, monkeypatch):
+    _seed_verses(api)
+
+    async def broken_log(*args, **kwargs):
+        raise RuntimeError("log write failed")
+
+    monkeypatch.setattr(server.changelog, "record_deletes", broken_log)
+    with pytest.raises(RuntimeError):
+        api.post("/api/admin/content/batch", headers=_admin(api), json={"operations": [
+            {"op": "delete", "collection": "verses", "id": "verse_2"},
+        ]})
+    assert {d["verse_id"] for d in api.db.verses.docs.values()} == {"verse_1", "verse_2"}
+    assert not api.db.cache_versions.docs
+
+
+def test_batch_runs_without_a_transaction_when_no_client_is_connected(api, monkeypatch):
+    _seed_verses(api)
+    monkeypatch.setattr(server, "client", None)
+    response = api.post("/api/admin/content/batch", headers=_admin(api), json={"operations": [
+        {"op": "delete", "collection": "verses", "id": "verse_2"},
+    ]})
+    assert response.json()["deleted"] == 1
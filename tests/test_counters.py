@@ -0,0 +1,61 @@
+import asyncio
+
+import counters
+from tests.conftest import FakeCollection, FakeDb
+
+
+class RacingCollection(FakeCollection):
+    """Runs `during_count` between reading the counter and writing the recount"""
+
+    during_count = None
+
+    async def count_documents(self, query, **kwargs):
+        if self.during_count:
+            await self.during_count(self.name)
+        return await super().count_documents(query, **kwargs)
+
+
+def make_db(sizes):
+    db = FakeDb()
+    for name, size in sizes.items():
+        db[name] = RacingCollection(name, [{} for _ in range(size)])
+    return db
+
+
+def test_counts_fall_back_to_estimates_until_reconciled():
+    db = make_db({"users": 7, "subscriptions": 3, "daily_checkins": 40})
+
+    async def scenario():
+        # Increments before the first reconciliation do not create a bogus counter
+        await counters.increment(db, "users")
+        before = await counters.get_counts(db)
+        await counters.CounterReconciler(db).run_once()
+        await counters.increment(db, "users")
+        return before, await counters.get_counts(db)
+
+    before, after = asyncio.run(scenario())
+    assert before["users"] == {"value": 7, "source": "estimate", "reconciled_at": None}
+    assert after["users"]["value"] == 8 and after["users"]["source"] == "counter"
+    assert after["daily_checkins"]["value"] == 40
+    # Reads after reconciliation never scan
+    assert db.daily_checkins.calls["count_documents"] == 1
+
+
+def test_reconcile_corrects_drift_but_not_over_concurrent_increments():
+    db = make_db({"users": 10, "subscriptions": 0, "daily_checkins": 0})
+
+    async def scenario():
+        await counters.reconcile(db, "users")
+        await counters.increment(db, "users", 5)  # drifted: only 10 documents exist
+        drift = await counters.reconcile(db, "users")
+
+        async def concurrent_write(name):
+            await counters.increment(db, name)
+        db.users.during_count = concurrent_write
+        skipped = await counters.reconcile(db, "users")
+        return drift, skipped
+
+    drift, skipped = asyncio.run(scenario())
+    assert drift == -5
+    assert skipped is None
+    assert db.counters.docs["count:users"]["value"] == 11
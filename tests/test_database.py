@@ -0,0 +1,93 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from pymongo import ReadPreference
+from pymongo.errors import ServerSelectionTimeoutError
+
+import database
+import server
+from tests.conftest import FakeDb
+
+
+def test_client_options_default_without_settings(monkeypatch):
+    for name in ("MONGO_MAX_POOL_SIZE", "MONGO_MIN_POOL_SIZE", "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+                 "MONGO_SERVER_SELECTION_TIMEOUT_MS", "MONGO_READ_PREFERENCE", "MONGO_COMPRESSORS"):
+        monkeypatch.delenv(name, raising=False)
+    options = database.client_options()
+    assert options == {
+        "maxPoolSize": 100,
+        "minPoolSize": 0,
+        "waitQueueTimeoutMS": 5000,
+        "serverSelectionTimeoutMS": 5000,
+        "read_preference": ReadPreference.PRIMARY,
+    }
+
+
+def test_client_options_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "20")
+    monkeypatch.setenv("MONGO_MIN_POOL_SIZE", "5")
+    monkeypatch.setenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "250")
+    monkeypatch.setenv("MONGO_READ_PREFERENCE", "secondaryPreferred")
+    monkeypatch.setenv("MONGO_COMPRESSORS", "zstd,zlib")
+    monitor = database.PoolMonitor()
+    options = database.client_options(monitor)
+    assert (options["maxPoolSize"], options["minPoolSize"], options["waitQueueTimeoutMS"]) == (20, 5, 250)
+    assert options["read_preference"] == ReadPreference.SECONDARY_PREFERRED
+    assert options["compressors"] == "zstd,zlib"
+    assert options["event_listeners"] == [monitor]
+
+    monkeypatch.setenv("MONGO_READ_PREFERENCE", "closest")
+    with pytest.raises(ValueError):
+        database.client_options()
+
+
+def test_content_reads_use_the_primary_unless_configured(monkeypatch):
+    monkeypatch.delenv("MONGO_CONTENT_READ_PREFERENCE", raising=False)
+    assert database.content_read_preference() == ReadPreference.PRIMARY
+    monkeypatch.setenv("MONGO_CONTENT_READ_PREFERENCE", "secondaryPreferred")
+    assert database.content_read_preference() == ReadPreference.SECONDARY_PREFERRED
+
+
+def test_pool_monitor_tracks_connections():
+    monitor = database.PoolMonitor()
+    event = SimpleNamespace()
+    for _ in range(3):
+        monitor.connection_created(event)
+    monitor.connection_checked_out(event)
+    monitor.connection_checked_out(event)
+    monitor.connection_checked_in(event)
+    monitor.connection_check_out_failed(event)
+    assert monitor.snapshot(4) == {
+        "max_size": 4, "open": 3, "in_use": 1, "saturation": 0.25, "checkout_failures": 1,
+    }
+
+
+def test_warm_up_opens_the_requested_connections():
+    db = FakeDb()
+    asyncio.run(database.warm_up(db, 3))
+    assert db.commands == ["ping"] * 3
+
+
+def test_health_reports_ping_and_pool(monkeypatch):
+    monkeypatch.setattr(server, "db", FakeDb())
+    payload = asyncio.run(server.health())
+    assert payload["status"] == "healthy"
+    assert isinstance(payload["mongo"]["ping_ms"], float)
+    assert set(payload["mongo"]["pool"]) == {"max_size", "open", "in_use", "saturation", "checkout_failures"}
+    assert payload["mongo"]["pool"]["max_size"] == server.client_options["maxPoolSize"]
+    assert "loop" in payload
+
+
+def test_health_is_unhealthy_when_mongo_is_unreachable(monkeypatch):
+    class UnreachableDb(FakeDb):
+        async def command(self, command, **kwargs):
+            raise ServerSelectionTimeoutError("no servers")
+
+    monkeypatch.setattr(server, "db", UnreachableDb())
+    response = asyncio.run(server.health())
+    assert response.status_code == 503
+    payload = json.loads(response.body)
+    assert payload["status"] == "unhealthy" and payload["mongo"]["ping_ms"] is None
+    assert "pool" in payload["mongo"]
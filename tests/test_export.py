@@ -0,0 +1,82 @@
+import asyncio
+import io
+import json
+import zipfile
+
+import pytest
+
+import archive
+import export
+from tests.conftest import FakeDb
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path / "archive")
+
+
+@pytest.fixture
+def db():
+    checkins = [
+        {"_id": i, "check_in_id": f"checkin_{i}", "user_id": "user_1", "date": f"2026-01-{i + 1:02d}", "signal": "normal"}
+        for i in range(30)
+    ]
+    return FakeDb(
+        users=[{"_id": 1, "user_id": "user_1", "email": "a@example.com", "password_hash": "secret"}],
+        subscriptions=[{"_id": 1, "user_id": "user_1", "status": "active"}],
+        daily_checkins=checkins + [{"_id": 99, "user_id": "user_2", "date": "2026-01-01"}],
+        payment_transactions=[{"_id": 1, "user_id": "user_1", "created_at": "2026-01-01", "amount": 9.0}],
+    )
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_ndjson_export_has_every_section_and_no_password_hash(db):
+    body = b"".join(asyncio.run(_collect(export.ndjson_stream(db, "user_1"))))
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+    assert lines[0]["type"] == "export" and lines[0]["data"]["user_id"] == "user_1"
+    types = [line["type"] for line in lines[1:]]
+    assert types == ["profile", "subscriptions"] + ["daily_checkins"] * 30 + ["payment_transactions"]
+    assert "password_hash" not in lines[1]["data"]
+    assert all(line["data"].get("user_id") == "user_1" for line in lines[1:])
+
+
+def test_ndjson_export_is_produced_as_the_client_reads(db, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_CHUNK_BYTES", 1024)
+
+    async def first_chunk():
+        stream = export.ndjson_stream(db, "user_1")
+        chunk = await stream.__anext__()
+        await stream.aclose()
+        return chunk
+
+    assert asyncio.run(first_chunk())
+    # Only as much was read from the cursor as fit in the first chunk
+    assert db.daily_checkins.cursors[0].consumed < 30
+
+
+def test_zip_export_holds_one_file_per_section(db, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_CHUNK_BYTES", 512)
+    chunks = asyncio.run(_collect(export.zip_stream(db, "user_1")))
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as bundle:
+        assert bundle.namelist() == [
+            "export.json", "profile.ndjson", "subscriptions.ndjson", "daily_checkins.ndjson",
+            "payment_transactions.ndjson",
+        ]
+        checkins = bundle.read("daily_checkins.ndjson").decode().splitlines()
+        assert [json.loads(line)["date"] for line in checkins] == [f"2026-01-{i + 1:02d}" for i in range(30)]
+
+
+def test_archived_checkins_are_exported_first(db):
+    pytest.importorskip("pyarrow")
+    archive._write_batch("daily_checkins", [
+        {"_id": 1, "check_in_id": "old", "user_id": "user_1", "date": "2024-05-01", "signal": "cravings"},
+        {"_id": 2, "check_in_id": "other", "user_id": "user_2", "date": "2024-05-01", "signal": "normal"},
+    ])
+    body = b"".join(asyncio.run(_collect(export.ndjson_stream(db, "user_1"))))
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+    checkins = [line["data"] for line in lines if line["type"] == "daily_checkins"]
+    assert [c["check_in_id"] for c in checkins[:2]] == ["old", "checkin_0"]
+    assert len(checkins) == 31
@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# Worker boot budget for `import server`; override on slow CI hosts
+IMPORT_BUDGET_SECONDS = float(os.environ.get("IMPORT_BUDGET_SECONDS", "1.5"))
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import server
+elapsed = time.perf_counter() - start
+heavy = [m for m in ("emergentintegrations", "httpx", "seed_content", "pandas", "numpy") if m in sys.modules]
+print(elapsed)
+print(",".join(heavy))
+print(server.client is None)
+"""
+
+
+def _probe():
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    return float(out[0]), out[1], out[2] == "True"
+
+
+def test_import_is_within_budget():
+    elapsed, _, _ = _probe()
+    assert elapsed < IMPORT_BUDGET_SECONDS, f"import server took {elapsed:.3f}s"
+
+
+def test_import_does_not_load_heavy_modules_or_connect():
+    _, heavy, no_client = _probe()
+    assert heavy == ""
+    assert no_client
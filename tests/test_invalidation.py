@@ -0,0 +1,216 @@
+import asyncio
+import os
+import time
+import uuid
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from invalidation import MESSAGES_COLLECTION, VERSIONS_COLLECTION, InvalidationBus, VersionedCache
+from tests.conftest import FakeDb
+
+
+def _mongo_available() -> bool:
+    try:
+        MongoClient(os.environ["MONGO_URL"], serverSelectionTimeoutMS=500).admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+requires_mongo = pytest.mark.skipif(not _mongo_available(), reason="MongoDB not reachable")
+
+
+def test_cache_only_drops_older_versions():
+    cache = VersionedCache()
+    cache.set("content:verses", ["v"], version=3)
+    assert not cache.invalidate("content:verses", 3)
+    assert cache.get("content:verses") == ["v"]
+    assert cache.invalidate("content:verses", 4)
+    assert cache.get("content:verses") is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = VersionedCache(max_entries=2)
+    cache.set("a", 1, 0)
+    cache.set("b", 2, 0)
+    cache.get("a")
+    cache.set("c", 3, 0)
+    assert cache.keys() == ["a", "c"]
+
+
+def test_publish_without_database_invalidates_locally():
+    cache = VersionedCache()
+    bus = InvalidationBus([cache])
+    cache.set("user:1", {"name": "old"}, bus.version("user:1"))
+    assert asyncio.run(bus.publish("user:1")) == 1
+    assert cache.get("user:1") is None
+
+
+def _deliver(db, bus):
+    """Hand every message after the bus's position to it, as the tail would"""
+    for message in list(db[MESSAGES_COLLECTION].docs.values()):
+        if bus._last_id is None or message["_id"] > bus._last_id:
+            bus._handle(message)
+
+
+def test_published_messages_invalidate_other_workers():
+    db = FakeDb()
+    cache_a, cache_b = VersionedCache(), VersionedCache()
+    bus_a, bus_b = InvalidationBus([cache_a]), InvalidationBus([cache_b])
+    bus_a.db = bus_b.db = db
+    cache_b.set("content:verses", ["stale"], bus_b.version("content:verses"))
+    cache_b.set("user:1", {"name": "stale"}, 0)
+    cache_b.set("user:2", {"name": "stale"}, 0)
+
+    asyncio.run(bus_a.publish("content:verses"))
+    asyncio.run(bus_a.publish_many(["user:1", "user:2"]))
+    _deliver(db, bus_b)
+
+    assert cache_b.keys() == []
+    assert bus_b.version("content:verses") == 1 and bus_b.version("user:2") == 1
+    assert bus_b.stats["received"] == 2
+    # Replaying a message older than what a worker has seen changes nothing
+    cache_b.set("content:verses", ["fresh"], 1)
+    bus_b._handle({"_id": bus_b._last_id, "key": "content:verses", "version": 1})
+    assert cache_b.get("content:verses") == ["fresh"]
+
+
+def test_resync_drops_keys_whose_messages_were_missed():
+    db = FakeDb(**{VERSIONS_COLLECTION: [{"_id": "user:1", "version": 3}, {"_id": "user:2", "version": 1}]})
+    cache = VersionedCache()
+    bus = InvalidationBus([cache])
+    bus.db = db
+    cache.set("user:1", {"name": "stale"}, 1)
+    cache.set("user:2", {"name": "current"}, 1)
+    cache.set("user:3", {"name": "never published"}, 0)
+
+    assert asyncio.run(bus.resync()) == 1
+    assert cache.keys() == ["user:2", "user:3"]
+    assert bus.version("user:1") == 3
+
+
+def test_resync_catches_up_known_keys_that_are_not_cached():
+    db = FakeDb(**{VERSIONS_COLLECTION: [{"_id": "entitlement:u1", "version": 2}]})
+    bus = InvalidationBus([VersionedCache()])
+    bus.db = db
+    assert not asyncio.run(bus.is_current("entitlement:u1", 1))
+    assert asyncio.run(bus.is_current("entitlement:u2", 0))
+    # Bumped by another worker whose message never arrived
+    db[VERSIONS_COLLECTION].seed({"_id": "entitlement:u2", "version": 1})
+    asyncio.run(bus.resync())
+    assert bus.version("entitlement:u2") == 1
+    assert db[VERSIONS_COLLECTION].calls["find_one"] == 2
+
+
+def test_versions_observed_while_tailing_need_no_lookup():
+    db = FakeDb(**{VERSIONS_COLLECTION: [{"_id": "entitlement:u1", "version": 2}]})
+    bus = InvalidationBus([], clock_skew=0)
+    bus.db = db
+    bus.synced_since = time.time() - 60
+    # Issued after the worker was following every bump: nothing can have been missed
+    assert asyncio.run(bus.is_current("entitlement:u2", 0, time.time()))
+    assert db[VERSIONS_COLLECTION].calls["find_one"] == 0
+    assert "entitlement:u2" not in bus.versions
+    # Issued before that, the authoritative version decides
+    assert not asyncio.run(bus.is_current("entitlement:u1", 1, time.time() - 120))
+    assert db[VERSIONS_COLLECTION].calls["find_one"] == 1
+
+
+def test_known_versions_are_bounded():
+    bus = InvalidationBus([], max_versions=2, clock_skew=0)
+    bus.db = FakeDb()
+    bus.synced_since = time.time() - 60
+    for user in ("u1", "u2", "u3"):
+        asyncio.run(bus.publish(f"entitlement:{user}"))
+    assert list(bus.versions) == ["entitlement:u2", "entitlement:u3"]
+    # u1's bump is forgotten, so claims from before the eviction are no longer trusted
+    assert bus.synced_since > time.time() - 1
+    assert not asyncio.run(bus.is_current("entitlement:u1", 0, time.time() - 30))
+
+
+def test_reopening_the_tail_after_it_wrapped_forces_a_resync():
+    db = FakeDb()
+    publisher, listener = InvalidationBus([]), InvalidationBus([VersionedCache()])
+    publisher.db = listener.db = db
+
+    async def scenario():
+        await publisher.publish("user:1")
+        await listener._open_tail()
+        listener._needs_resync = False
+        # The capped collection evicts everything the listener had seen
+        await publisher.publish("user:2")
+        await db[MESSAGES_COLLECTION].delete_many({"_id": {"$lte": listener._last_id}})
+        await listener._open_tail()
+
+    asyncio.run(scenario())
+    assert listener._needs_resync
+
+
+async def _with_db(test):
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client[f"test_invalidation_{uuid.uuid4().hex[:8]}"]
+    try:
+        await test(db)
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+async def _wait_until(predicate, timeout=5.0):
+    start = time.monotonic()
+    while not predicate():
+        if time.monotonic() - start > timeout:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+    return time.monotonic() - start
+
+
+@requires_mongo
+def test_invalidation_converges_across_workers():
+    async def test(db):
+        cache_a, cache_b = VersionedCache(), VersionedCache()
+        bus_a, bus_b = InvalidationBus([cache_a]), InvalidationBus([cache_b])
+        await bus_a.start(db)
+        await bus_b.start(db)
+        try:
+            cache_b.set("content:trigger_cards", ["stale"], bus_b.version("content:trigger_cards"))
+            await asyncio.sleep(0.2)
+            await bus_a.publish("content:trigger_cards")
+            elapsed = await _wait_until(lambda: cache_b.get("content:trigger_cards") is None)
+            assert elapsed < 2.0
+            assert bus_b.version("content:trigger_cards") == 1
+        finally:
+            await bus_a.stop()
+            await bus_b.stop()
+
+    asyncio.run(_with_db(test))
+
+
+@requires_mongo
+def test_missed_messages_are_recovered_by_resync():
+    async def test(db):
+        cache_a, cache_b = VersionedCache(), VersionedCache()
+        bus_a = InvalidationBus([cache_a], capped_max_documents=5)
+        bus_b = InvalidationBus([cache_b], capped_max_documents=5)
+        await bus_a.start(db)
+        await bus_b.start(db)
+        await asyncio.sleep(0.2)
+        await bus_b.stop()
+
+        cache_b.set("user:1", {"name": "stale"}, 0)
+        # Enough traffic to wrap the capped collection past bus_b's position
+        for i in range(20):
+            await bus_a.publish(f"user:{i}")
+
+        await bus_b.start(db)
+        try:
+            await _wait_until(lambda: cache_b.get("user:1") is None)
+            assert bus_b.stats["resyncs"] >= 1
+        finally:
+            await bus_a.stop()
+            await bus_b.stop()
+
+    asyncio.run(_with_db(test))
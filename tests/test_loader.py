@@ -0,0 +1,80 @@
+import asyncio
+
+import server
+from loader import RequestLoader
+
+
+class RecordingCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, projection):
+        self.queries.append(query)
+        collection = self
+
+        class Cursor:
+            async def to_list(self, length):
+                def matches(doc):
+                    for field, cond in query.items():
+                        allowed = cond["$in"] if isinstance(cond, dict) else [cond]
+                        if doc.get(field) not in allowed:
+                            return False
+                    return True
+                return [
+                    {k: v for k, v in doc.items() if k in projection}
+                    for doc in collection.docs if matches(doc)
+                ]
+
+        return Cursor()
+
+
+def test_lookups_in_one_tick_are_batched_and_memoized():
+    subscriptions = RecordingCollection([
+        {"user_id": "u1", "status": "active", "amount": 9.0},
+        {"user_id": "u2", "status": "cancelled", "amount": 9.0},
+    ])
+    loader = RequestLoader({"subscriptions": subscriptions})
+
+    async def run():
+        where = {"status": "active"}
+        first, second = await asyncio.gather(
+            loader.load("subscriptions", "user_id", "u1", ("status",), where=where),
+            loader.load("subscriptions", "user_id", "u2", ("status",), where=where),
+        )
+        again = await loader.load("subscriptions", "user_id", "u1", ("status",), where=where)
+        return first, second, again
+
+    first, second, again = asyncio.run(run())
+    assert first == {"user_id": "u1", "status": "active"}
+    assert second is None
+    assert again is first
+    assert subscriptions.queries == [{"status": "active", "user_id": {"$in": ["u1", "u2"]}}]
+
+
+def test_flush_tasks_are_held_until_they_finish():
+    loader = RequestLoader({"users": RecordingCollection([{"user_id": "u1"}])})
+
+    async def run():
+        lookup = loader.load("users", "user_id", "u1", ())
+        await asyncio.sleep(0)
+        in_flight = len(loader._flushes)
+        await lookup
+        await asyncio.sleep(0)
+        return in_flight
+
+    assert asyncio.run(run()) == 1
+    assert not loader._flushes
+
+
+def test_user_lookups_across_a_batch_share_one_query(api):
+    api.db.users.seed({"user_id": "u1", "email": "u1@example.com", "name": "Ann", "role": "user", "password_hash": "x"})
+    headers = {"Authorization": f"Bearer {server.create_jwt_token('u1')}"}
+    response = api.post("/api/batch", headers=headers, json={"requests": [
+        {"path": "/api/auth/me"}, {"path": "/api/bootstrap"},
+    ]})
+    me, bootstrap = response.json()["responses"]
+    assert me["status"] == bootstrap["status"] == 200
+    assert me["body"]["name"] == bootstrap["body"]["user"]["name"] == "Ann"
+    assert "password_hash" not in me["body"]
+    assert api.db.users.calls["find"] == 1
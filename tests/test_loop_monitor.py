@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+import loop_monitor
+
+
+def planted_blocking_call():
+    time.sleep(0.3)
+
+
+def test_watchdog_pinpoints_a_blocking_call():
+    async def scenario():
+        monitor = loop_monitor.LoopMonitor(interval_ms=10, threshold_ms=50)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        planted_blocking_call()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    [stall] = monitor.stalls
+    assert "planted_blocking_call" in stall["stack"][-1]
+    assert stall["lag_ms"] >= 250
+    stats = monitor.stats()
+    assert stats["histogram"]["le_500ms"] == 1
+    assert stats["max_ms"] >= 250
+
+
+def test_histogram_percentiles():
+    monitor = loop_monitor.LoopMonitor()
+    for lag in [0.5] * 98 + [30, 3000]:
+        monitor.record(lag)
+    assert monitor.percentile(0.5) == 1.0
+    assert monitor.percentile(0.99) == 50.0
+    assert monitor.percentile(1.0) == 3000
@@ -0,0 +1,164 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from outbound import CLOSED, HALF_OPEN, OPEN, Dependency, DependencyUnavailable, Policy, UpstreamError
+
+
+class FaultyUpstream:
+    """Stand-in service that plays back a script of faults: slow, down, 5xx, invalid or ok"""
+
+    def __init__(self, *script, delay=1.0):
+        self.script = list(script)
+        self.delay = delay
+        self.calls = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+    async def __call__(self):
+        self.calls += 1
+        fault = self.script.pop(0) if self.script else "ok"
+        self.concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        try:
+            if fault == "slow":
+                await asyncio.sleep(self.delay)
+            elif fault == "down":
+                raise ConnectionRefusedError("connection refused")
+            elif fault == "5xx":
+                raise UpstreamError("HTTP 503")
+            elif fault == "invalid":
+                raise ValueError("invalid session")
+            return "ok"
+        finally:
+            self.concurrent -= 1
+
+
+def fast_policy(**overrides):
+    return Policy(**{"timeout": 0.05, "deadline": 1.0, "retries": 2, "backoff": 0.001, "max_concurrency": 10,
+                     "queue_timeout": 0.01, "failure_threshold": 3, "reset_timeout": 0.1, **overrides})
+
+
+def test_slow_upstream_is_cut_off_at_the_timeout():
+    dependency = Dependency("slow", fast_policy(retries=0))
+    upstream = FaultyUpstream("slow", delay=5)
+    started = time.monotonic()
+    with pytest.raises(DependencyUnavailable):
+        asyncio.run(dependency.call(upstream))
+    assert time.monotonic() - started < 0.5
+    assert dependency.metrics["timeouts"] == 1
+
+
+def test_transient_failures_are_retried():
+    dependency = Dependency("flaky", fast_policy())
+    upstream = FaultyUpstream("down", "5xx", "ok")
+    assert asyncio.run(dependency.call(upstream)) == "ok"
+    assert upstream.calls == 3
+    assert dependency.metrics["retries"] == 2 and dependency.metrics["successes"] == 1
+
+
+def test_calls_not_safe_to_repeat_are_tried_once():
+    dependency = Dependency("checkout", fast_policy())
+    upstream = FaultyUpstream("down", "ok")
+    with pytest.raises(DependencyUnavailable):
+        asyncio.run(dependency.call(upstream, retries=0))
+    assert upstream.calls == 1
+
+
+def test_upstream_answers_are_raised_unchanged_and_keep_the_circuit_closed():
+    dependency = Dependency("auth", fast_policy(failure_threshold=1))
+    with pytest.raises(ValueError):
+        asyncio.run(dependency.call(FaultyUpstream("invalid")))
+    assert dependency.breaker.state == CLOSED
+
+
+def test_retries_stop_at_the_deadline():
+    dependency = Dependency("slow", fast_policy(retries=50, deadline=0.2, failure_threshold=100))
+    upstream = FaultyUpstream(*["slow"] * 50)
+    started = time.monotonic()
+    with pytest.raises(DependencyUnavailable):
+        asyncio.run(dependency.call(upstream))
+    assert time.monotonic() - started < 0.4
+    assert upstream.calls < 10
+
+
+def test_circuit_opens_then_lets_one_trial_through():
+    dependency = Dependency("down", fast_policy(retries=0))
+    upstream = FaultyUpstream("down", "down", "down")
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(DependencyUnavailable):
+                await dependency.call(upstream)
+        assert dependency.breaker.state == OPEN
+        with pytest.raises(DependencyUnavailable) as rejected:
+            await dependency.call(upstream)
+        assert rejected.value.reason == "circuit open" and rejected.value.retry_after > 0
+        assert upstream.calls == 3
+
+        await asyncio.sleep(0.12)
+        assert dependency.breaker.allow() and dependency.breaker.state == HALF_OPEN
+        # Only one trial at a time while half-open
+        assert not dependency.breaker.allow()
+        dependency.breaker.release_trial()
+        return await dependency.call(upstream)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert dependency.breaker.state == CLOSED
+    assert dependency.snapshot()["times_opened"] == 1
+
+
+def test_failed_trial_reopens_the_circuit():
+    dependency = Dependency("down", fast_policy(retries=0, failure_threshold=1))
+    upstream = FaultyUpstream("down", "down")
+
+    async def scenario():
+        with pytest.raises(DependencyUnavailable):
+            await dependency.call(upstream)
+        await asyncio.sleep(0.12)
+        with pytest.raises(DependencyUnavailable):
+            await dependency.call(upstream)
+
+    asyncio.run(scenario())
+    assert dependency.breaker.state == OPEN and upstream.calls == 2
+
+
+def test_calls_beyond_the_concurrency_cap_are_rejected():
+    dependency = Dependency("busy", fast_policy(timeout=0.2, retries=0, max_concurrency=2))
+    upstream = FaultyUpstream(*["slow"] * 5, delay=0.1)
+
+    async def scenario():
+        return await asyncio.gather(*(dependency.call(upstream) for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert results.count("ok") == 2
+    assert all(isinstance(r, DependencyUnavailable) for r in results if r != "ok")
+    assert upstream.max_concurrent == 2
+    assert dependency.metrics["rejected_saturated"] == 3
+    assert dependency.breaker.state == CLOSED
+
+
+def test_hanging_http_server_does_not_hold_the_caller():
+    dependency = Dependency("hanging", fast_policy(timeout=0.1, retries=1))
+
+    async def scenario():
+        # Accepts connections and never answers
+        server = await asyncio.start_server(lambda reader, writer: asyncio.sleep(10), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        async def fetch():
+            async with httpx.AsyncClient(timeout=5) as client:
+                return await client.get(f"http://127.0.0.1:{port}/session-data")
+
+        try:
+            started = time.monotonic()
+            with pytest.raises(DependencyUnavailable):
+                await dependency.call(fetch, retry_on=(httpx.TransportError,))
+            return time.monotonic() - started
+        finally:
+            server.close()
+
+    assert asyncio.run(scenario()) < 1.0
+    assert dependency.metrics["timeouts"] == 2
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import profiler
+
+
+def burn_cpu(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.fixture
+def store(tmp_path):
+    return profiler.CaptureStore(tmp_path, keep=2)
+
+
+@pytest.fixture
+def client(store):
+    app = FastAPI()
+
+    @app.get("/slow/{n}")
+    async def slow(n: int):
+        burn_cpu(0.15)
+        return {"n": n}
+
+    @app.get("/fast")
+    async def fast():
+        return {}
+
+    app.add_middleware(profiler.ProfilerMiddleware, sample_rate=1.0, slow_ms=100,
+                       sampler=profiler.StackSampler(interval_ms=1), store=store)
+    return TestClient(app)
+
+
+def test_slow_requests_are_captured_with_their_stacks(client, store):
+    assert client.get("/fast").status_code == 200
+    assert client.get("/slow/1").status_code == 200
+
+    [capture] = store.list()
+    assert capture["route"] == "/slow/{n}"
+    assert capture["status"] == 200
+    assert capture["duration_ms"] >= 100
+    folded = store.folded(capture["capture_id"])
+    hot = [line for line in folded.splitlines() if "test_profiler.burn_cpu" in line]
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in hot) > capture["samples"] / 2
+
+
+def test_captures_are_rotated(client, store):
+    for n in range(3):
+        client.get(f"/slow/{n}")
+    captures = store.list()
+    assert len(captures) == 2
+    assert len(list(store.directory.glob("*.folded"))) == 2
+
+
+def test_mongo_commands_are_attributed_to_the_current_capture():
+    capture = profiler.Capture("GET", "/x", None)
+    listener = profiler.MongoCommandProfiler()
+    event = type("Event", (), {"command_name": "find", "duration_micros": 1500})()
+    listener.succeeded(event)  # no capture active: ignored
+    token = profiler.current_capture.set(capture)
+    try:
+        listener.succeeded(event)
+        listener.failed(event)
+    finally:
+        profiler.current_capture.reset(token)
+    assert capture.mongo == {"find": {"count": 2, "total_ms": 3.0, "failed": 1}}
@@ -0,0 +1,66 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+import counters
+import provisioning
+from tests.conftest import FakeCollection, FakeDb
+
+
+class RacingUsers(FakeCollection):
+    """Someone else registers `race` emails between the duplicate check and the insert"""
+
+    def __init__(self, docs, race=()):
+        super().__init__("users", docs)
+        self.race = list(race)
+
+    def find(self, query=None, projection=None, **kwargs):
+        cursor = super().find(query, projection, **kwargs)
+        while self.race:
+            self._insert({"email": self.race.pop()})
+        return cursor
+
+
+async def _chunks(text, size=7):
+    data = text.encode()
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+CSV = (
+    "﻿Email,Name,Password\r\n"
+    "new@example.com,New Person,pw-1\r\n"
+    "taken@example.com,Taken,pw-2\r\n"
+    "not-an-email,Broken,pw-3\r\n"
+    "new@example.com,Again,pw-4\r\n"
+    "raced@example.com,Raced,pw-5\r\n"
+    "\"admin@example.com\",\"Admin, Jr\",pw-6\r\n"
+    "nopass@example.com,No Password,\r\n"
+)
+
+
+def test_rows_are_created_and_problems_reported_by_line():
+    db = FakeDb(counters=[{"_id": counters.counter_id("users"), "value": 0}])
+    db["users"] = RacingUsers([{"email": "taken@example.com"}], race=["raced@example.com"])
+
+    async def run():
+        await db.users.create_index("email", unique=True)
+        with ThreadPoolExecutor(2) as executor:
+            rows = provisioning.csv_rows(provisioning.decode_lines(_chunks(CSV)))
+            return await provisioning.provision_users(
+                db, rows, admin_emails=["admin@example.com"],
+                executor=executor, workers=2, chunk_size=3, rounds=4
+            )
+
+    report = asyncio.run(run())
+    assert (report["rows"], report["created"], report["duplicates"], report["invalid"]) == (7, 2, 3, 2)
+    assert db.counters.docs[counters.counter_id("users")]["value"] == 2
+    assert {(p["row"], p["status"]) for p in report["problems"]} == {
+        (3, "duplicate"), (4, "invalid"), (5, "duplicate"), (6, "duplicate"), (8, "invalid")
+    }
+    created = {doc["email"]: doc for doc in db.users.docs.values() if "password_hash" in doc}
+    assert set(created) == {"new@example.com", "admin@example.com"}
+    assert created["admin@example.com"]["role"] == "admin"
+    assert created["admin@example.com"]["name"] == "Admin, Jr"
+    assert bcrypt.checkpw(b"pw-1", created["new@example.com"]["password_hash"].encode())
@@ -0,0 +1,113 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import counters
+import server
+from leases import acquire_lease
+from reconciler import LEASE_NAME, PaymentReconciler
+from tests.conftest import FakeDb
+
+HOUR_AGO = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+
+
+def _txn(session_id, user_id, status="pending"):
+    return {"session_id": session_id, "user_id": user_id, "plan": "beta_monthly",
+            "payment_status": status, "created_at": HOUR_AGO}
+
+
+class FakeStripe:
+    """check_status stand-in answering from a script of session id -> outcome"""
+
+    def __init__(self, db, outcomes):
+        self.db = db
+        self.outcomes = outcomes
+        self.checked = []
+
+    async def __call__(self, session_id):
+        self.checked.append(session_id)
+        outcome = self.outcomes[session_id]
+        if outcome == "error":
+            raise ConnectionError("stripe unreachable")
+        if outcome == "paid_elsewhere":
+            # The webhook or a status poll resolved it while this call was in flight
+            await self.db.payment_transactions.update_one({"session_id": session_id},
+                                                          {"$set": {"payment_status": "paid"}})
+            outcome = "paid"
+        if outcome == "paid":
+            return SimpleNamespace(status="complete", payment_status="paid")
+        if outcome == "expired":
+            return SimpleNamespace(status="expired", payment_status="unpaid")
+        return SimpleNamespace(status="open", payment_status="unpaid")
+
+
+def _reconciler(db, outcomes):
+    activated = []
+
+    async def on_activated(user_id):
+        activated.append(user_id)
+
+    reconciler = PaymentReconciler(
+        db, check_status=FakeStripe(db, outcomes),
+        activation=lambda user_id, plan: {"user_id": user_id, "status": "active", "plan": plan},
+        on_activated=on_activated, batch_size=2,
+    )
+    return reconciler, activated
+
+
+def _transaction(db, session_id):
+    return next(d for d in db.payment_transactions.docs.values() if d["session_id"] == session_id)
+
+
+def test_pending_transactions_are_resolved():
+    db = FakeDb(
+        payment_transactions=[
+            _txn("cs_paid", "u1"), _txn("cs_expired", "u2"), _txn("cs_open", "u3"),
+            _txn("cs_raced", "u4"), _txn("cs_down", "u5"), _txn("cs_done", "u6", status="paid"),
+        ],
+        counters=[{"_id": counters.counter_id("subscriptions"), "value": 0}],
+    )
+    reconciler, activated = _reconciler(db, {
+        "cs_paid": "paid", "cs_expired": "expired", "cs_open": "open", "cs_raced": "paid_elsewhere", "cs_down": "error",
+    })
+
+    metrics = asyncio.run(reconciler.run_once())
+
+    assert "cs_done" not in reconciler.check_status.checked
+    assert (metrics["paid"], metrics["expired"], metrics["still_pending"]) == (1, 1, 1)
+    assert (metrics["already_resolved"], metrics["errors"]) == (1, 1)
+    # Only the transaction this run moved out of pending activates a subscription
+    assert activated == ["u1"]
+    assert [s["user_id"] for s in db.subscriptions.docs.values()] == ["u1"]
+    assert db.counters.docs[counters.counter_id("subscriptions")]["value"] == 1
+    assert _transaction(db, "cs_paid")["payment_status"] == "paid"
+    assert _transaction(db, "cs_expired")["payment_status"] == "expired"
+    # Unresolved and failed checks are retried later, not immediately
+    assert _transaction(db, "cs_open")["payment_status"] == "pending"
+    assert _transaction(db, "cs_down")["reconciled_at"]
+    again = asyncio.run(reconciler.run_once())
+    assert again["checked"] == metrics["checked"] and activated == ["u1"]
+
+
+def test_manual_runs_take_the_lease():
+    db = FakeDb(payment_transactions=[_txn("cs_paid", "u1")])
+    reconciler, activated = _reconciler(db, {"cs_paid": "paid"})
+
+    async def scenario():
+        assert await acquire_lease(db, LEASE_NAME, "other-worker", timedelta(minutes=5))
+        blocked = await reconciler.run_now()
+        await db.job_leases.delete_many({})
+        return blocked, await reconciler.run_now()
+
+    blocked, metrics = asyncio.run(scenario())
+    assert blocked is None
+    assert metrics["paid"] == 1 and activated == ["u1"]
+    # A one-off run hands the lease back
+    assert not db.job_leases.docs
+
+
+def test_admin_run_defers_to_the_worker_holding_the_lease(api):
+    asyncio.run(acquire_lease(api.db, LEASE_NAME, "other-worker", timedelta(minutes=5)))
+    headers = {"Authorization": f"Bearer {server.create_jwt_token('admin_1', role='admin')}"}
+    response = api.post("/api/admin/reconciler/run", headers=headers)
+    assert response.json() == {"status": "running elsewhere"}
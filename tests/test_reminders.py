@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+from reminders import FileSender, ReminderDispatcher, anti_join
+from tests.conftest import FakeCursor, FakeDb
+
+
+def make_db(subscribers, checked_in, date):
+    return FakeDb(
+        subscriptions=[{"user_id": u, "status": "active"} for u in subscribers],
+        daily_checkins=[{"user_id": u, "date": date} for u in checked_in],
+        users=[{"user_id": u, "email": f"{u}@example.com", "name": u} for u in subscribers],
+    )
+
+
+def test_anti_join_skips_users_who_checked_in():
+    async def collect():
+        subscriptions = FakeCursor([{"user_id": u} for u in ["a", "b", "c", "d", "f"]])
+        checkins = FakeCursor([{"user_id": u} for u in ["b", "d", "e"]])
+        return [user_id async for user_id in anti_join(subscriptions, checkins)]
+
+    assert asyncio.run(collect()) == ["a", "c", "f"]
+
+
+def test_run_sends_to_subscribers_without_a_checkin(tmp_path):
+    date = "2026-03-01"
+    subscribers = [f"user_{i:03d}" for i in range(25)]
+    db = make_db(subscribers, subscribers[::3], date)
+    outbox = tmp_path / "reminders.jsonl"
+    dispatcher = ReminderDispatcher(db, sender_factory=lambda: FileSender(outbox), batch_size=4, concurrency=3)
+
+    report = asyncio.run(dispatcher.run(date))
+
+    expected = [u for i, u in enumerate(subscribers) if i % 3]
+    sent = sorted(json.loads(line)["user_id"] for line in outbox.read_text().splitlines())
+    assert sent == expected
+    assert report["status"] == "completed" and report["sent"] == len(expected)
+    assert db.reminder_runs.docs[date]["last_user_id"] == expected[-1]
+    # A finished run is not repeated
+    asyncio.run(dispatcher.run(date))
+    assert len(outbox.read_text().splitlines()) == len(expected)
+
+
+def test_interrupted_run_resumes_after_the_checkpoint(tmp_path):
+    date = "2026-03-02"
+    subscribers = [f"user_{i:03d}" for i in range(10)]
+    db = make_db(subscribers, [], date)
+    db.reminder_runs.docs[date] = {"_id": date, "sent": 6, "failed": 0, "skipped": 0,
+                                   "last_user_id": "user_005", "status": "running"}
+    outbox = tmp_path / "reminders.jsonl"
+    dispatcher = ReminderDispatcher(db, sender_factory=lambda: FileSender(outbox), batch_size=3)
+
+    report = asyncio.run(dispatcher.run(date))
+
+    sent = [json.loads(line)["user_id"] for line in outbox.read_text().splitlines()]
+    assert sorted(sent) == subscribers[6:]
+    assert report["sent"] == 10 and report["resumed_from"] == "user_005"
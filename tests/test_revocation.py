@@ -0,0 +1,39 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from revocation import BloomFilter, RevocationList
+from tests.conftest import FakeDb
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=10000, fp_rate=0.01)
+    members = [uuid.uuid4().hex for _ in range(10000)]
+    for jti in members:
+        bloom.add(jti)
+    assert all(jti in bloom for jti in members)
+    strangers = [uuid.uuid4().hex for _ in range(20000)]
+    false_positives = sum(jti in bloom for jti in strangers)
+    assert false_positives / len(strangers) < 0.02
+
+
+def test_only_filter_hits_reach_the_database():
+    revocations = RevocationList(capacity=1000, fp_rate=0.001)
+    revocations.db = db = FakeDb()
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=15)
+
+    async def scenario():
+        await revocations.revoke("revoked-jti", "user_1", expires_at)
+        unrelated = [await revocations.is_revoked(uuid.uuid4().hex) for _ in range(200)]
+        return unrelated, await revocations.is_revoked("revoked-jti")
+
+    unrelated, revoked = asyncio.run(scenario())
+    assert revoked and not any(unrelated)
+    assert db.revoked_tokens.calls["find_one"] <= 2
+
+
+def test_expired_tokens_are_not_stored():
+    revocations = RevocationList()
+    revocations.db = db = FakeDb()
+    asyncio.run(revocations.revoke("old", "user_1", datetime.now(timezone.utc) - timedelta(seconds=1)))
+    assert not db.revoked_tokens.docs
@@ -0,0 +1,105 @@
+import socket
+from types import SimpleNamespace
+
+import pytest
+
+import serve
+
+
+def test_worker_count_is_at_least_one():
+    assert serve.available_cpus() >= 1
+
+
+def test_options_fall_back_without_uvloop_and_httptools(monkeypatch):
+    monkeypatch.setattr(serve.importlib.util, "find_spec", lambda name: None)
+    args = SimpleNamespace(host="127.0.0.1", port=8001, backlog=512, keep_alive=75, graceful_timeout=10,
+                           lifespan="auto")
+    options = serve.server_options(args)
+    assert options["loop"] == "asyncio" and options["http"] == "h11"
+    assert options["backlog"] == 512 and options["timeout_keep_alive"] == 75
+    assert options["timeout_graceful_shutdown"] == 10
+
+
+@pytest.mark.skipif(not serve.reuse_port_supported(), reason="SO_REUSEPORT not available")
+def test_workers_can_bind_the_same_port():
+    first = serve.bind_socket("127.0.0.1", 0, 16)
+    port = first.getsockname()[1]
+    try:
+        serve.bind_socket("127.0.0.1", port, 16).close()
+    finally:
+        first.close()
+
+
+@pytest.mark.skipif(not serve.reuse_port_supported(), reason="SO_REUSEPORT not available")
+def test_port_held_by_another_server_is_not_shared():
+    other = socket.socket()
+    other.bind(("127.0.0.1", 0))
+    other.listen()
+    try:
+        with pytest.raises(OSError):
+            serve.bind_socket("127.0.0.1", other.getsockname()[1], 16)
+    finally:
+        other.close()
+
+
+class FakeWorker:
+    def __init__(self, pid):
+        self.pid = pid
+        self.exitcode = None
+
+    def is_alive(self):
+        return self.exitcode is None
+
+
+def _supervisor(monkeypatch, clock):
+    supervisor = serve.Supervisor({"timeout_graceful_shutdown": 1}, workers=1, clock=lambda: clock[0])
+    spawned = []
+
+    def spawn():
+        spawned.append(FakeWorker(len(spawned) + 1))
+        return spawned[-1]
+
+    monkeypatch.setattr(supervisor, "_spawn", spawn)
+    supervisor._start_all()
+    return supervisor, spawned
+
+
+def test_workers_failing_to_boot_are_restarted_with_backoff(monkeypatch):
+    monkeypatch.setattr(serve, "SERVER_MAX_BOOT_FAILURES", 10)
+    clock = [100.0]
+    supervisor, spawned = _supervisor(monkeypatch, clock)
+    delays = []
+    for _ in range(4):
+        spawned[-1].exitcode = 3
+        assert supervisor.check_workers()
+        delays.append(supervisor.respawn_at[0] - clock[0])
+        count = len(spawned)
+        clock[0] = supervisor.respawn_at[0] - 0.01
+        supervisor.check_workers()
+        assert len(spawned) == count
+        clock[0] += 0.01
+        supervisor.check_workers()
+        assert len(spawned) == count + 1
+    assert delays == [0.5, 1.0, 2.0, 4.0]
+
+
+def test_worker_that_ran_for_a_while_is_restarted_at_once(monkeypatch):
+    clock = [100.0]
+    supervisor, spawned = _supervisor(monkeypatch, clock)
+    clock[0] += serve.SERVER_MIN_UPTIME + 1
+    spawned[0].exitcode = -9
+    assert supervisor.check_workers()
+    assert len(spawned) == 2 and supervisor.boot_failures == [0]
+
+
+def test_supervisor_gives_up_on_workers_that_never_boot(monkeypatch):
+    monkeypatch.setattr(serve, "SERVER_MAX_BOOT_FAILURES", 3)
+    monkeypatch.setattr(serve, "SERVER_RESPAWN_BACKOFF", 0)
+    clock = [100.0]
+    supervisor, spawned = _supervisor(monkeypatch, clock)
+    results = []
+    for _ in range(3):
+        spawned[-1].exitcode = 1
+        results.append(supervisor.check_workers())
+    assert results == [True, True, False]
+    assert len(spawned) == 3
@@ -0,0 +1,36 @@
+import asyncio
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+
+    async def create():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"session_id": "cs_1"}
+
+    async def run():
+        results = await asyncio.gather(*(flights.do(("user_1", "beta_monthly"), create) for _ in range(5)))
+        again = await flights.do(("user_1", "beta_monthly"), create)
+        return results, again
+
+    results, again = asyncio.run(run())
+    assert all(r is results[0] for r in results)
+    assert len(calls) == 2
+    assert len(flights) == 0
+
+
+def test_errors_propagate_to_every_waiter():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise RuntimeError("stripe down")
+
+    async def run():
+        return await asyncio.gather(*(flights.do("k", fail) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(run()))
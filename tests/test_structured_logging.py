@@ -0,0 +1,92 @@
+import io
+import json
+import logging
+import threading
+
+import pytest
+
+import structured_logging
+
+
+@pytest.fixture
+def log_stream():
+    stream = io.StringIO()
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    structured_logging.configure_logging(stream)
+    yield stream
+    structured_logging.stop_logging()
+    root.handlers[:], root.level = saved
+
+
+def _lines(stream):
+    structured_logging.stop_logging()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_records_are_json_with_request_id_and_extras(log_stream):
+    token = structured_logging.request_id_var.set("req-1")
+    try:
+        logging.getLogger("payments").info("Paid %s", "user_1", extra={"user_id": "user_1"})
+    finally:
+        structured_logging.request_id_var.reset(token)
+    [entry] = _lines(log_stream)
+    assert entry["message"] == "Paid user_1"
+    assert entry["request_id"] == "req-1"
+    assert entry["user_id"] == "user_1"
+    assert entry["logger"] == "payments"
+
+
+def test_exceptions_are_formatted_by_the_listener(log_stream):
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logging.getLogger("payments").exception("Webhook error")
+    [entry] = _lines(log_stream)
+    assert "ValueError: boom" in entry["exc_info"]
+
+
+def test_sampling_keeps_warnings():
+    sampler = structured_logging.SamplingFilter({"uvicorn.access": 0.0})
+    info = logging.makeLogRecord({"name": "uvicorn.access", "levelno": logging.INFO})
+    warning = logging.makeLogRecord({"name": "uvicorn.access", "levelno": logging.WARNING})
+    other = logging.makeLogRecord({"name": "server", "levelno": logging.INFO})
+    assert not sampler.filter(info)
+    assert sampler.filter(warning)
+    assert sampler.filter(other)
+    assert structured_logging.parse_sample_rates("uvicorn.access=0.05, reconciler=0.2") == {
+        "uvicorn.access": 0.05, "reconciler": 0.2
+    }
+
+
+def test_stopping_with_a_full_queue_flushes_it(monkeypatch):
+    class StalledStream(io.StringIO):
+        def __init__(self):
+            super().__init__()
+            self.writing = threading.Event()
+            self.gate = threading.Event()
+
+        def write(self, text):
+            self.writing.set()
+            self.gate.wait()
+            return super().write(text)
+
+    monkeypatch.setattr(structured_logging, "LOG_QUEUE_SIZE", 2)
+    stream = StalledStream()
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    handler = structured_logging.configure_logging(stream)
+    try:
+        logging.getLogger("payments").warning("record 0")
+        # The writer thread is stuck on the first record while the queue fills up
+        assert stream.writing.wait(1)
+        for i in range(1, 10):
+            logging.getLogger("payments").warning("record %s", i)
+        assert handler.queue.full()
+        threading.Timer(0.1, stream.gate.set).start()
+        entries = _lines(stream)
+    finally:
+        root.handlers[:], root.level = saved
+    assert [entry["message"] for entry in entries] == [
+        "record 0", "record 1", "record 2", "Dropped 7 log records while the queue was full"
+    ]